@@ -0,0 +1,271 @@
+"""asyncio runtime for the handlers in bot.py.
+
+The handlers stay synchronous and run unchanged on ASYNC_WORKERS threads
+(sharded by chat like the webhook dispatcher); SQLite calls are sub-millisecond
+and stay on those threads. What changes is the Telegram side: updates are
+fetched and API calls are made by one event loop with an aiohttp session
+(``AsyncTeleBot``), and the plain calls a handler makes (send/edit message,
+answer callback, ...) return at once instead of blocking the worker for a
+network round trip. Calls for the same chat still go out in order: a
+blocking call (uploads, media groups) first waits for the chat's deferred ones.
+"""
+import asyncio
+import concurrent.futures
+import threading
+
+import aiohttp
+from telebot import apihelper, asyncio_helper
+from telebot.async_telebot import AsyncTeleBot
+
+from config import (
+    BOT_TOKEN,
+    TELEGRAM_API_URL,
+    WEBHOOK_URL,
+    WEBHOOK_LISTEN,
+    WEBHOOK_PORT,
+    WEBHOOK_PATH,
+    WEBHOOK_SECRET,
+    WEBHOOK_MAX_CONNECTIONS,
+    WEBHOOK_QUEUE_SIZE,
+    ASYNC_WORKERS,
+    ASYNC_MAX_CONNECTIONS,
+    ASYNC_MAX_PENDING,
+)
+from metrics import count_api_call
+from outbound import OutboundSender, TRANSIENT_ERRORS
+from webhook import UpdateDispatcher, WebhookServer, update_chat_id
+
+# Calls a handler does not need the answer of; anything else (uploads, media groups) stays blocking,
+# after the chat's deferred calls
+DEFERRED_METHODS = (
+    'send_message',
+    'edit_message_text',
+    'edit_message_reply_markup',
+    'answer_callback_query',
+    'send_location',
+    'send_chat_action',
+    'delete_message',
+)
+
+ASYNC_TRANSIENT_ERRORS = TRANSIENT_ERRORS + (aiohttp.ClientError, asyncio_helper.RequestTimeout)
+
+
+class SkippedCall(Exception):
+    """A deferred call that was not made because an earlier one of the same handler failed."""
+
+
+class PendingCall:
+    """Result of a deferred API call; reading an attribute waits for it (and raises its error)."""
+
+    __slots__ = ('_future',)
+
+    def __init__(self, future):
+        self._future = future
+
+    def result(self, timeout=None):
+        return self._future.result(timeout)
+
+    def __getattr__(self, name):
+        return getattr(self._future.result(), name)
+
+
+class ApiBridge:
+    """Routes a TeleBot's API calls made inside update handlers to an AsyncTeleBot on `loop`.
+
+    ``install`` shadows the DEFERRED_METHODS on the bot instance. Outside a
+    handler (broadcast workers, media pool, scheduler) the original blocking
+    call is used, so exceptions and return values behave exactly as before.
+    Inside a handler the call is queued behind the previous one for the same
+    chat and a PendingCall is returned; at most `max_pending` calls are in
+    flight before handlers start to wait. Deferred calls follow `outbound`'s
+    flood wait, retry and breaker policy.
+
+    Any other (blocking) request a handler makes first waits for its chat's
+    deferred calls, so a photo never overtakes an earlier message. When a
+    deferred call fails, the handler's later calls are not made and the
+    handler gets the error from its next API call, as it would from the
+    blocking call; a failure after the handler returned is logged.
+    """
+
+    def __init__(self, async_bot, loop, outbound, max_pending=ASYNC_MAX_PENDING):
+        self.async_bot = async_bot
+        self.loop = loop
+        self.outbound = outbound
+        self._context = threading.local()
+        self._tails = {}
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._pending = 0
+        self._idle = threading.Condition(self._lock)
+
+    def install(self, bot):
+        for name in DEFERRED_METHODS:
+            blocking = getattr(bot, name)
+            setattr(bot, name, self._method(name, blocking))
+        make_request = apihelper._make_request
+
+        def request(*args, **kwargs):
+            self._flush()
+            return make_request(*args, **kwargs)
+
+        apihelper._make_request = request
+
+    def handle(self, handler, update):
+        """Run `handler(update)` with API calls deferred and ordered per chat."""
+        self._context.chat = update_chat_id(update)
+        self._context.calls = []
+        try:
+            handler(update)
+        finally:
+            self._context.chat = None
+            self._context.calls = None
+
+    def join(self, timeout=None):
+        """Wait until every deferred call has completed."""
+        with self._idle:
+            return self._idle.wait_for(lambda: self._pending == 0, timeout)
+
+    def _method(self, name, blocking):
+        def call(*args, **kwargs):
+            chat = getattr(self._context, 'chat', None)
+            if chat is None:
+                return blocking(*args, **kwargs)
+            return self._defer(chat, name, args, kwargs)
+        call.__name__ = name
+        return call
+
+    def _flush(self):
+        """In a handler: wait for the chat's deferred calls and raise the first error of the handler's own."""
+        chat = getattr(self._context, 'chat', None)
+        if chat is None:
+            return
+        with self._lock:
+            tail = self._tails.get(chat)
+        if tail is not None:
+            concurrent.futures.wait([tail])
+        self._raise_failed()
+
+    def _raise_failed(self):
+        calls = self._context.calls
+        for future in calls:
+            if future.done() and not future.cancelled() and future.exception() is not None:
+                # reported once, like the error of a blocking call; the calls queued after it stay skipped
+                del calls[:]
+                raise future.exception()
+
+    def _defer(self, chat, name, args, kwargs):
+        self._raise_failed()
+        count_api_call()
+        self._slots.acquire()
+        calls = self._context.calls
+        with self._lock:
+            self._pending += 1
+            previous = self._tails.get(chat)
+            # after a failure the rest of the same handler's calls are skipped, like code after a raise
+            own = previous is not None and calls and calls[-1] is previous
+            future = asyncio.run_coroutine_threadsafe(self._run_after(previous, own, name, args, kwargs), self.loop)
+            self._tails[chat] = future
+        calls.append(future)
+        future.add_done_callback(lambda f: self._done(chat, name, f))
+        return PendingCall(future)
+
+    async def _run_after(self, previous, own, name, args, kwargs):
+        if previous is not None:
+            try:
+                await asyncio.wrap_future(previous)
+            except Exception as e:
+                if own:
+                    raise e if isinstance(e, SkippedCall) else SkippedCall(e)
+        method = getattr(self.async_bot, name)
+        chat = kwargs.get('chat_id', args[0] if name != 'answer_callback_query' and args else None)
+        return await self.outbound.acall(lambda: method(*args, **kwargs), chat, ASYNC_TRANSIENT_ERRORS)
+
+    def _done(self, chat, name, future):
+        with self._lock:
+            if self._tails.get(chat) is future:
+                del self._tails[chat]
+            self._pending -= 1
+            if self._pending == 0:
+                self._idle.notify_all()
+        self._slots.release()
+        error = None if future.cancelled() else future.exception()
+        if error is not None and not isinstance(error, SkippedCall):
+            print(f"Ошибка {name} для чата {chat}: {error}")
+
+
+class AsyncRuntime:
+    """Event loop side: AsyncTeleBot session, update intake and the worker dispatcher."""
+
+    def __init__(self, bot, outbound=None, workers=ASYNC_WORKERS, queue_size=WEBHOOK_QUEUE_SIZE):
+        if TELEGRAM_API_URL:
+            asyncio_helper.API_URL = TELEGRAM_API_URL.rstrip('/') + '/bot{0}/{1}'
+            asyncio_helper.FILE_URL = TELEGRAM_API_URL.rstrip('/') + '/file/bot{0}/{1}'
+        asyncio_helper.REQUEST_LIMIT = ASYNC_MAX_CONNECTIONS
+        self.bot = bot
+        self.outbound = outbound or OutboundSender()
+        self.async_bot = AsyncTeleBot(BOT_TOKEN)
+        self.workers = workers
+        self.queue_size = queue_size
+        self.bridge = None
+        self.dispatcher = None
+
+    def start(self, loop):
+        """Bind to the running `loop`, patch the bot and start the handler workers."""
+        self.bridge = ApiBridge(self.async_bot, loop, self.outbound)
+        self.bridge.install(self.bot)
+        # handlers run in our per-chat workers, not in telebot's own thread pool
+        self.bot.threaded = False
+        handler = lambda update: self.bot.process_new_updates([update])
+        # put_timeout=0: a full shard is reported at once instead of blocking the event loop
+        self.dispatcher = UpdateDispatcher(
+            lambda update: self.bridge.handle(handler, update),
+            workers=self.workers,
+            queue_size=self.queue_size,
+            put_timeout=0,
+        )
+        self.dispatcher.start()
+
+    async def submit(self, update):
+        while not self.dispatcher.submit(update):
+            await asyncio.sleep(0.05)
+
+    async def poll(self, timeout=20):
+        await self.async_bot.delete_webhook()
+        offset = None
+        while True:
+            try:
+                updates = await self.async_bot.get_updates(offset=offset, timeout=timeout)
+            except Exception as e:
+                print(f"Ошибка получения обновлений: {e}")
+                await asyncio.sleep(3)
+                continue
+            for update in updates:
+                offset = update.update_id + 1
+                await self.submit(update)
+
+    async def serve_webhook(self):
+        # the stdlib server feeds the same dispatcher from its own threads
+        server = WebhookServer((WEBHOOK_LISTEN, WEBHOOK_PORT), self.dispatcher)
+        threading.Thread(target=server.serve_forever, name='webhook', daemon=True).start()
+        await self.async_bot.remove_webhook()
+        await self.async_bot.set_webhook(
+            url=WEBHOOK_URL.rstrip('/') + WEBHOOK_PATH,
+            secret_token=WEBHOOK_SECRET,
+            max_connections=WEBHOOK_MAX_CONNECTIONS,
+        )
+        print(f"Webhook (asyncio) слушает {WEBHOOK_LISTEN}:{WEBHOOK_PORT}{WEBHOOK_PATH}")
+        await asyncio.Event().wait()
+
+    async def run(self, mode):
+        self.start(asyncio.get_running_loop())
+        try:
+            if mode == 'webhook':
+                await self.serve_webhook()
+            else:
+                await self.poll()
+        finally:
+            await self.async_bot.close_session()
+
+
+def run_async(bot, mode, outbound=None):
+    asyncio.run(AsyncRuntime(bot, outbound).run(mode))
@@ -0,0 +1,100 @@
+"""Compare the threaded and the asyncio runtime on callback-heavy traffic.
+
+fake_telegram.py answers every API call after `latency` seconds, standing in
+for the round trip to Telegram. The same callback updates are handled first
+by the threaded dispatcher (WEBHOOK_WORKERS workers blocking on each call),
+then by async_runtime.py (ASYNC_WORKERS workers, calls made by the event
+loop). Reports throughput and checks that every chat's messages were edited
+in update order. Run from the project root:
+
+    python benchmarks/bench_async.py [updates] [chats] [latency_ms]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+# keep the benchmark away from the real event_bot.db
+os.chdir(tempfile.mkdtemp(prefix='bench_async_'))
+
+import config  # noqa: E402
+from fake_telegram import FakeTelegram  # noqa: E402
+
+fake = FakeTelegram(port=0).start()
+config.TELEGRAM_API_URL = fake.url
+
+import bot as app  # noqa: E402
+from telebot import types  # noqa: E402
+from async_runtime import AsyncRuntime  # noqa: E402
+from webhook import UpdateDispatcher  # noqa: E402
+
+
+def make_updates(total, chats):
+    # message_id grows per update so the edits show the order they were made in
+    return [
+        types.Update.de_json(fake.callback_update(1000 + i % chats, 'back_main', message_id=i + 1))
+        for i in range(total)
+    ]
+
+
+def out_of_order():
+    edits = defaultdict(list)
+    for params in fake.calls_to('editMessageText'):
+        edits[params['chat_id']].append(int(params['message_id']))
+    return sum(1 for ids in edits.values() if ids != sorted(ids))
+
+
+def submit_all(dispatcher, updates):
+    for update in updates:
+        while not dispatcher.submit(update):
+            time.sleep(0.01)
+
+
+def run_threads(updates):
+    app.bot.threaded = False
+    dispatcher = UpdateDispatcher(lambda update: app.bot.process_new_updates([update]))
+    dispatcher.start()
+    start = time.perf_counter()
+    submit_all(dispatcher, updates)
+    dispatcher.join()
+    return time.perf_counter() - start
+
+
+def run_asyncio(updates):
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, name='bench-loop', daemon=True).start()
+    runtime = AsyncRuntime(app.bot, app.outbound)
+    runtime.start(loop)
+    start = time.perf_counter()
+    submit_all(runtime.dispatcher, updates)
+    runtime.dispatcher.join()
+    runtime.bridge.join()
+    elapsed = time.perf_counter() - start
+    asyncio.run_coroutine_threadsafe(runtime.async_bot.close_session(), loop).result()
+    loop.call_soon_threadsafe(loop.stop)
+    return elapsed
+
+
+def main(total=2000, chats=500, latency_ms=50):
+    app.init_database()
+    fake.latency = latency_ms / 1000
+    print(f"updates: {total}, chats: {chats}, API latency: {latency_ms} ms")
+    for name, run, workers in (
+        ('threads', run_threads, config.WEBHOOK_WORKERS),
+        ('asyncio', run_asyncio, config.ASYNC_WORKERS),
+    ):
+        del fake.calls[:]
+        elapsed = run(make_updates(total, chats))
+        print(f"{name:8} workers: {workers:3}  {elapsed:6.2f}s ({total / elapsed:5.0f} updates/s), "
+              f"API calls: {len(fake.calls)}, chats out of order: {out_of_order()}")
+
+
+if __name__ == '__main__':
+    args = [int(arg) for arg in sys.argv[1:4]]
+    main(*args)
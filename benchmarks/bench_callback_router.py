@@ -0,0 +1,160 @@
+"""Compare callback dispatch cost: legacy predicate chain vs CallbackRouter.
+
+Run from the project root:
+
+    python benchmarks/bench_callback_router.py
+"""
+import os
+import sys
+import timeit
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from bot import callbacks  # noqa: E402
+
+# Filters exactly as they were registered with bot.callback_query_handler,
+# in registration order; telebot stops at the first one that matches.
+LEGACY_FILTERS = [
+    lambda call: call.data.startswith('lang_'),
+    lambda call: call.data == 'back_main',
+    lambda call: call.data == 'back_meetings',
+    lambda call: call.data.startswith('meeting_') and not call.data.startswith('meeting_details'),
+    lambda call: call.data.startswith('agenda_') and not call.data.startswith('agenda_item_') and not call.data.startswith('agenda_alert_toggle_') and not call.data.startswith('agenda_skip_desc'),
+    lambda call: call.data.startswith('agenda_item_'),
+    lambda call: call.data.startswith('agenda_alert_toggle_'),
+    lambda call: call.data.startswith('wifi_'),
+    lambda call: call.data.startswith('pdf_'),
+    lambda call: call.data.startswith('qna_'),
+    lambda call: call.data.startswith('people_'),
+    lambda call: call.data.startswith('follow_'),
+    lambda call: call.data.startswith('unfollow_'),
+    lambda call: call.data.startswith('rate_'),
+    lambda call: call.data.startswith('feedback_yes_'),
+    lambda call: call.data.startswith('feedback_no_'),
+    lambda call: call.data.startswith('photos_'),
+    lambda call: call.data.startswith('map_'),
+    lambda call: call.data == 'admin_add_meeting',
+    lambda call: call.data == 'admin_manage',
+    lambda call: call.data == 'admin_feedback_main',
+    lambda call: call.data.startswith('admin_feedback_view_'),
+    lambda call: call.data.startswith('admin_meeting_'),
+    lambda call: call.data.startswith('admin_edit_name_'),
+    lambda call: call.data.startswith('admin_edit_date_'),
+    lambda call: call.data.startswith('admin_edit_location_'),
+    lambda call: call.data.startswith('admin_feedback_'),
+    lambda call: call.data.startswith('admin_questions_meeting_'),
+    lambda call: call.data.startswith('view_finished_'),
+    lambda call: call.data.startswith('back_survey_'),
+    lambda call: call.data.startswith('admin_finish_'),
+    lambda call: call.data.startswith('finish_confirm_'),
+    lambda call: call.data.startswith('finish_yes_'),
+    lambda call: call.data.startswith('admin_wifi_'),
+    lambda call: call.data.startswith('admin_wifi_edit_'),
+    lambda call: call.data.startswith('admin_wifi_edit_name_'),
+    lambda call: call.data.startswith('admin_wifi_edit_password_'),
+    lambda call: call.data.startswith('admin_wifi_clear_'),
+    lambda call: call.data.startswith('admin_photos_') and not call.data.startswith('admin_photos_add_') and not call.data.startswith('admin_photos_clear_'),
+    lambda call: call.data.startswith('admin_photos_add_'),
+    lambda call: call.data.startswith('admin_pdf_') and not call.data.startswith('admin_pdf_add_') and not call.data.startswith('admin_pdf_edit_') and not call.data.startswith('admin_pdf_clear_') and len(call.data.split('_')) == 3,
+    lambda call: call.data.startswith('admin_pdf_add_'),
+    lambda call: call.data.startswith('admin_pdf_edit_'),
+    lambda call: call.data.startswith('admin_pdf_clear_'),
+    lambda call: call.data.startswith('admin_pdf_delete_confirm_yes_'),
+    lambda call: call.data.startswith('admin_photos_clear_'),
+    lambda call: call.data.startswith('admin_geo_') and not call.data.startswith('admin_geo_edit_') and not call.data.startswith('admin_geo_clear_'),
+    lambda call: call.data.startswith('admin_geo_edit_'),
+    lambda call: call.data.startswith('admin_geo_clear_'),
+    lambda call: call.data.startswith('admin_agenda_') and not call.data.startswith('admin_agenda_add_') and not call.data.startswith('admin_agenda_clear_') and not call.data.startswith('admin_agenda_item_'),
+    lambda call: call.data.startswith('admin_agenda_add_'),
+    lambda call: call.data.startswith('admin_agenda_clear_'),
+    lambda call: call.data.startswith('admin_agenda_item_delete_'),
+    lambda call: call.data.startswith('admin_agenda_item_delete_confirm_'),
+    lambda call: call.data.startswith('admin_agenda_item_edit_') and not call.data.startswith('admin_agenda_item_edit_title_') and not call.data.startswith('admin_agenda_item_edit_start_') and not call.data.startswith('admin_agenda_item_edit_end_') and not call.data.startswith('admin_agenda_item_edit_desc_'),
+    lambda call: call.data.startswith('admin_agenda_item_edit_title_'),
+    lambda call: call.data.startswith('admin_agenda_item_people_'),
+    lambda call: call.data.startswith('admin_agenda_item_edit_start_'),
+    lambda call: call.data.startswith('admin_agenda_item_edit_end_'),
+    lambda call: call.data.startswith('admin_agenda_item_edit_desc_'),
+    lambda call: call.data.startswith('admin_agenda_item_') and not call.data.startswith('admin_agenda_item_edit_') and not call.data.startswith('admin_agenda_item_delete_'),
+    lambda call: call.data == 'agenda_skip_desc',
+    lambda call: call.data.startswith('admin_delete_'),
+    lambda call: call.data.startswith('confirm_delete_'),
+    lambda call: call.data.startswith('add_wifi_'),
+    lambda call: call.data.startswith('add_photos_'),
+    lambda call: call.data == 'admin_questions',
+    lambda call: call.data == 'admin_notify',
+    lambda call: call.data == 'notify_all',
+    lambda call: call.data.startswith('notify_meeting_'),
+    lambda call: call.data == 'notify_none',
+    lambda call: call.data == 'back_admin',
+    lambda call: call.data == 'admin_exit',
+    lambda call: call.data == 'edit_profile',
+    lambda call: call.data == 'edit_name',
+    lambda call: call.data == 'edit_phone',
+    lambda call: call.data == 'edit_company',
+    lambda call: call.data == 'fill_profile',
+    lambda call: call.data.startswith('add_geo_'),
+    lambda call: call.data.startswith('delete_meeting_'),
+]
+
+SAMPLES = [
+    'lang_ru', 'back_main', 'back_meetings', 'meeting_17', 'agenda_17',
+    'agenda_item_42_17', 'agenda_alert_toggle_42_17', 'wifi_17', 'pdf_17',
+    'qna_17', 'people_17', 'follow_17', 'unfollow_17', 'rate_17_good',
+    'feedback_yes_17', 'feedback_no_17', 'photos_17', 'map_17',
+    'admin_add_meeting', 'admin_manage', 'admin_feedback_main',
+    'admin_feedback_view_17', 'admin_meeting_17', 'admin_edit_name_17',
+    'admin_edit_date_17', 'admin_edit_location_17', 'admin_feedback_17',
+    'admin_questions_meeting_17', 'view_finished_17', 'back_survey_17',
+    'admin_finish_17', 'finish_confirm_17', 'finish_yes_17', 'admin_wifi_17',
+    'admin_wifi_edit_17', 'admin_wifi_edit_name_17',
+    'admin_wifi_edit_password_17', 'admin_wifi_clear_17', 'admin_photos_17',
+    'admin_photos_add_17', 'admin_pdf_17', 'admin_pdf_add_17',
+    'admin_pdf_edit_17', 'admin_pdf_clear_17',
+    'admin_pdf_delete_confirm_yes_17', 'admin_photos_clear_17', 'admin_geo_17',
+    'admin_geo_edit_17', 'admin_geo_clear_17', 'admin_agenda_17',
+    'admin_agenda_add_17', 'admin_agenda_clear_17',
+    'admin_agenda_item_delete_42_17', 'admin_agenda_item_delete_confirm_42_17',
+    'admin_agenda_item_edit_42_17', 'admin_agenda_item_edit_title_42_17',
+    'admin_agenda_item_people_42_17', 'admin_agenda_item_edit_start_42_17',
+    'admin_agenda_item_edit_end_42_17', 'admin_agenda_item_edit_desc_42_17',
+    'admin_agenda_item_42_17', 'agenda_skip_desc', 'admin_delete_17',
+    'confirm_delete_17', 'add_wifi_17', 'add_photos_17', 'admin_questions',
+    'admin_notify', 'notify_all', 'notify_meeting_17', 'notify_none',
+    'back_admin', 'admin_exit', 'edit_profile', 'edit_name', 'edit_phone',
+    'edit_company', 'fill_profile', 'add_geo_17', 'delete_meeting_17',
+]
+
+
+def legacy_dispatch(call):
+    for index, predicate in enumerate(LEGACY_FILTERS):
+        if predicate(call):
+            return index
+    return None
+
+
+def router_dispatch(call):
+    return callbacks.resolve(call.data)
+
+
+def main(number=20000):
+    unresolved = [data for data in SAMPLES if callbacks.resolve(data) is None]
+    if unresolved:
+        raise SystemExit(f"Router does not resolve: {unresolved}")
+
+    print(f"{'callback_data':42} {'legacy ns':>10} {'router ns':>10} {'x':>6}")
+    total_legacy = total_router = 0.0
+    for data in SAMPLES:
+        call = SimpleNamespace(data=data)
+        legacy = timeit.timeit(lambda: legacy_dispatch(call), number=number) / number * 1e9
+        routed = timeit.timeit(lambda: router_dispatch(call), number=number) / number * 1e9
+        total_legacy += legacy
+        total_router += routed
+        print(f"{data:42} {legacy:10.0f} {routed:10.0f} {legacy / routed:6.1f}")
+    n = len(SAMPLES)
+    print(f"{'mean':42} {total_legacy / n:10.0f} {total_router / n:10.0f} {total_legacy / total_router:6.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""Push updates through the webhook runtime against the fake Telegram API.
+
+Everything runs locally: fake_telegram.py answers the bot's API calls and
+delivers updates to the webhook server, which hands them to the per-chat
+workers. Reports throughput and checks that every chat saw its updates in
+order. Run from the project root:
+
+    python benchmarks/bench_webhook.py [updates] [chats]
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+# keep the benchmark away from the real event_bot.db
+os.chdir(tempfile.mkdtemp(prefix='bench_webhook_'))
+
+import config  # noqa: E402
+from fake_telegram import FakeTelegram  # noqa: E402
+
+fake = FakeTelegram(port=0).start()
+config.TELEGRAM_API_URL = fake.url
+
+import bot as app  # noqa: E402
+from webhook import create_webhook_server  # noqa: E402
+
+
+def main(total=2000, chats=200):
+    app.init_database()
+    server = create_webhook_server(app.bot, listen='127.0.0.1', port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address[:2]
+    app.bot.set_webhook(url=f'http://{host}:{port}{config.WEBHOOK_PATH}', secret_token='bench')
+
+    dispatcher = server.dispatcher
+    arrived = defaultdict(list)
+    handled = defaultdict(list)
+    submit, handler = dispatcher.submit, dispatcher.handler
+    lock = threading.Lock()
+
+    def recording_submit(update):
+        # record arrival under the lock so it matches the order updates are queued
+        with lock:
+            accepted = submit(update)
+            if accepted:
+                arrived[update.message.chat.id].append(update.update_id)
+        return accepted
+
+    def recording_handler(update):
+        handler(update)
+        handled[update.message.chat.id].append(update.update_id)
+
+    dispatcher.submit, dispatcher.handler = recording_submit, recording_handler
+
+    # a few senders per chat in flight, like Telegram with max_connections > 1
+    updates = [fake.message_update(1000 + i % chats, '/start') for i in range(total)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        statuses = list(pool.map(fake.push_update, updates))
+    accepted = time.perf_counter() - start
+    dispatcher.join()
+    elapsed = time.perf_counter() - start
+
+    rejected = sum(1 for status in statuses if status != 200)
+    out_of_order = sum(1 for chat_id, ids in arrived.items() if handled[chat_id] != ids)
+    print(f"updates: {total}, chats: {chats}, workers: {config.WEBHOOK_WORKERS}")
+    print(f"accepted in {accepted:.2f}s, handled in {elapsed:.2f}s ({total / elapsed:.0f} updates/s)")
+    print(f"rejected (503): {rejected}, API calls: {len(fake.calls)}")
+    print(f"chats with out-of-order handling: {out_of_order}")
+
+
+if __name__ == '__main__':
+    args = [int(arg) for arg in sys.argv[1:3]]
+    main(*args)
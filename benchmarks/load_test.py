@@ -0,0 +1,224 @@
+"""Replay event-day traffic against the fake Telegram API, fully offline.
+
+Phases run one after another on a throwaway database, each with every user
+active at once:
+
+- start:   /start, language, profile (name, phone, company)
+- browse:  meeting list, meeting card, agenda, an agenda item, people, WiFi
+- follow:  follow the meeting and subscribe to the first agenda item's alert
+- alerts:  the "starting soon" alert for that item goes out via the outbox
+- survey:  the meeting ends, the survey goes out, users rate and comment
+
+Updates go through the same per-chat dispatcher as the webhook runtime. For
+every phase it reports handler latency and, from the bot's own handler
+metrics (metrics.py), database.py calls, SQL statements and Bot API calls per
+update; broadcast phases report delivery time instead. The slowest routes
+are listed at the end, as the admin /stats command shows them. The
+fake API can add latency and refuse a share of calls with 429. Run from the
+project root:
+
+    python benchmarks/load_test.py --users 300 --latency-ms 20 --flood-rate 0.01
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+# keep the load test away from the real event_bot.db
+os.chdir(tempfile.mkdtemp(prefix='load_test_'))
+
+import config  # noqa: E402
+from fake_telegram import FakeTelegram  # noqa: E402
+
+fake = FakeTelegram(port=0, seed=1).start()
+config.TELEGRAM_API_URL = fake.url
+
+import bot as app  # noqa: E402
+import database  # noqa: E402
+from telebot import types  # noqa: E402
+from texts import get_text  # noqa: E402
+from webhook import UpdateDispatcher  # noqa: E402
+
+FIRST_USER = 10000
+
+
+def seed_meeting():
+    """One running meeting today whose first agenda item starts inside the alert lead."""
+    start = datetime.now() + timedelta(minutes=5)
+    with database.transaction() as conn:
+        meeting_id = conn.execute(
+            "INSERT INTO meetings (name, location, date, wifi_network, wifi_password, latitude, longitude) "
+            "VALUES ('Load test', 'Hall A', ?, 'event', 'secret', 41.31, 69.28)",
+            (start.strftime('%d.%m.%Y'),),
+        ).lastrowid
+        agenda_ids = [
+            conn.execute(
+                "INSERT INTO agenda (meeting_id, title, start_time, end_time, description) VALUES (?, ?, ?, ?, ?)",
+                (meeting_id, f'Talk {i}', start.strftime('%H:%M') if i == 0 else '23:59', None, 'Room 1'),
+            ).lastrowid
+            for i in range(8)
+        ]
+    return meeting_id, agenda_ids[0]
+
+
+def sessions(phase, users, meeting_id, agenda_id, lang='en'):
+    """Per-user update sequences for `phase`; (kind, payload) pairs."""
+    result = []
+    for user_id in users:
+        if phase == 'start':
+            steps = [('message', '/start'), ('callback', f'lang_{lang}'), ('callback', 'fill_profile'),
+                     ('message', f'User {user_id}'), ('message', f'+998{user_id}'), ('message', 'ACME')]
+        elif phase == 'browse':
+            steps = [('message', get_text(lang, 'select_meeting')), ('callback', f'meeting_{meeting_id}'),
+                     ('callback', f'agenda_{meeting_id}'), ('callback', f'agenda_item_{agenda_id}_{meeting_id}'),
+                     ('callback', f'people_{meeting_id}'), ('callback', f'wifi_{meeting_id}'),
+                     ('callback', 'back_meetings')]
+        elif phase == 'follow':
+            steps = [('callback', f'follow_{meeting_id}'),
+                     ('callback', f'agenda_alert_toggle_{agenda_id}_{meeting_id}')]
+        else:
+            steps = [('callback', f'rate_{meeting_id}_good'), ('callback', f'feedback_yes_{meeting_id}'),
+                     ('message', 'Great event, more coffee please')]
+        result.append([(user_id, kind, payload) for kind, payload in steps])
+    return result
+
+
+def make_update(user_id, kind, payload):
+    if kind == 'message':
+        data = fake.message_update(user_id, payload)
+    else:
+        data = fake.callback_update(user_id, payload)
+    return types.Update.de_json(data)
+
+
+class Recorder:
+    """Dispatcher handler that times each update."""
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.latencies = []
+        self._lock = threading.Lock()
+
+    def __call__(self, update):
+        start = time.perf_counter()
+        try:
+            self.handler(update)
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.latencies.append(elapsed)
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+def run_updates(dispatcher, recorder, plan):
+    """Submit step 1 of every session, then step 2, ... so all users are active at once."""
+    recorder.latencies = []
+    before = app.handler_metrics.totals()
+    start = time.perf_counter()
+    for step in range(max(len(s) for s in plan)):
+        for session in plan:
+            if step < len(session):
+                update = make_update(*session[step])
+                while not dispatcher.submit(update):
+                    time.sleep(0.01)
+    dispatcher.join()
+    elapsed = time.perf_counter() - start
+    after = app.handler_metrics.totals()
+    delta = {key: after[key] - before[key] for key in after}
+    latencies = [seconds * 1000 for seconds in recorder.latencies]
+    total = len(latencies)
+    return (
+        f"{total:6} updates {total / elapsed:6.0f}/s  "
+        f"p50 {percentile(latencies, 50):6.1f}  p95 {percentile(latencies, 95):6.1f}  "
+        f"p99 {percentile(latencies, 99):6.1f} ms  "
+        f"API {delta['api_calls'] / total:4.2f}  db calls {delta['db_calls'] / total:4.1f}  "
+        f"SQL {delta['statements'] / total:4.1f} per update  errors {delta['errors']}"
+    )
+
+
+def wait_outbox(started, expected):
+    """Wait until `expected` messages were queued and none is left to send."""
+    conn = database.get_connection()
+    while True:
+        queued, open_ = conn.execute(
+            "SELECT COUNT(*), COUNT(*) FILTER (WHERE status IN ('pending', 'sending')) FROM outbox WHERE id > ?",
+            (started,),
+        ).fetchone()
+        if queued >= expected and not open_:
+            break
+        time.sleep(0.05)
+    sent, failed = conn.execute(
+        "SELECT COUNT(*) FILTER (WHERE status = 'sent'), COUNT(*) FILTER (WHERE status = 'failed') FROM outbox WHERE id > ?",
+        (started,),
+    ).fetchone()
+    return sent, failed
+
+
+def run_broadcast(trigger, expected):
+    started = database.get_connection().execute("SELECT COALESCE(MAX(id), 0) FROM outbox").fetchone()[0]
+    calls = len(fake.calls)
+    begin = time.perf_counter()
+    trigger()
+    sent, failed = wait_outbox(started, expected)
+    elapsed = time.perf_counter() - begin
+    return (
+        f"{expected:6} messages in {elapsed:5.1f}s ({sent / elapsed:5.1f}/s)  "
+        f"sent {sent}  failed {failed}  API calls {len(fake.calls) - calls}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--latency-ms', type=float, default=20, help='fake Bot API response time')
+    parser.add_argument('--flood-rate', type=float, default=0, help='share of sending calls answered with 429')
+    parser.add_argument('--retry-after', type=int, default=1)
+    parser.add_argument('--workers', type=int, default=config.WEBHOOK_WORKERS)
+    args = parser.parse_args()
+
+    app.init_database()
+    meeting_id, agenda_id = seed_meeting()
+    app.bot.threaded = False
+    app.broadcasts.start()
+    recorder = Recorder(lambda update: app.bot.process_new_updates([update]))
+    dispatcher = UpdateDispatcher(recorder, workers=args.workers)
+    dispatcher.start()
+    users = range(FIRST_USER, FIRST_USER + args.users)
+
+    print(f"users: {args.users}, workers: {args.workers}, API latency: {args.latency_ms:g} ms, "
+          f"429 rate: {args.flood_rate:g}, broadcast rate: {config.BROADCAST_GLOBAL_RATE}/s")
+    fake.latency = args.latency_ms / 1000
+    fake.flood_rate = args.flood_rate
+    fake.retry_after = args.retry_after
+    for phase in ('start', 'browse', 'follow'):
+        print(f"{phase:7} {run_updates(dispatcher, recorder, sessions(phase, users, meeting_id, agenda_id))}")
+
+    subscribers = database.get_connection().execute(
+        "SELECT COUNT(*) FROM agenda_alerts WHERE agenda_id = ?", (agenda_id,)).fetchone()[0]
+    # the item starts inside AGENDA_ALERT_LEAD, so the alert is due as soon as the scheduler runs
+    print(f"{'alerts':7} {run_broadcast(app.scheduler.start, subscribers)}")
+
+    participants = len(database.get_participant_languages(meeting_id))
+    database.mark_meeting_ended(meeting_id)
+    print(f"{'survey':7} {run_broadcast(lambda: app.send_satisfaction_survey(meeting_id), participants)}")
+    print(f"{'survey':7} {run_updates(dispatcher, recorder, sessions('survey', users, meeting_id, agenda_id))}")
+    print(f"429 answers: {fake.floods}, API calls: {len(fake.calls)}")
+
+    print("\nslowest routes (updates, p50/p95/max ms, db calls / SQL / API per update):")
+    for route, count, errors, p50, p95, slowest, db_calls, statements, api_calls in app.handler_metrics.summary()[:10]:
+        print(f"  {route:28} {count:6}  {p50 * 1000:6.1f} {p95 * 1000:6.1f} {slowest * 1000:6.1f}  "
+              f"{db_calls:4.1f} {statements:4.1f} {api_calls:4.1f}  errors {errors}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,12 +1,63 @@
 import telebot
-from config import BOT_TOKEN, ADMIN_PASSWORD
+from concurrent.futures import ThreadPoolExecutor
+from telebot import apihelper
+from config import BOT_TOKEN, ADMIN_PASSWORD, PHOTOS_PAGE_SIZE, PEOPLE_PAGE_SIZE, QUESTIONS_PAGE_SIZE, FEEDBACK_PAGE_SIZE, SEARCH_RESULTS_LIMIT, MEDIA_WORKERS, BOT_MODE, BOT_RUNTIME, TELEGRAM_API_URL, MEETING_DELETE_MODE, METRICS_ENABLED, METRICS_LISTEN, METRICS_PORT
 from database import *
 from texts import get_text
 from keyboards import *
+from router import CallbackRouter
+from broadcast import BroadcastEngine
+from state_store import create_state_store
+from scheduler import Scheduler, AgendaAlerts, DeadlineWatcher, MeetingPurger, parse_deadline, format_deadline
+from media import ALBUM_SIZE, MediaWarmer, send_album, send_media_photo, send_media_document
+from media_store import MediaCollector
+from metrics import HandlerMetrics, MetricsMiddleware, MetricsServer, count_api_requests
+from outbound import OutboundSender
+
+if TELEGRAM_API_URL:
+    apihelper.API_URL = TELEGRAM_API_URL.rstrip('/') + '/bot{0}/{1}'
+    apihelper.FILE_URL = TELEGRAM_API_URL.rstrip('/') + '/file/bot{0}/{1}'
+if METRICS_ENABLED:
+    count_api_requests(apihelper)
+# retries, flood waits and the circuit breaker for every request (each attempt is counted above)
+outbound = OutboundSender()
+outbound.install(apihelper)
+
+bot = telebot.TeleBot(BOT_TOKEN, use_class_middlewares=METRICS_ENABLED)
+handler_metrics = HandlerMetrics()
+callbacks = CallbackRouter()
+broadcasts = BroadcastEngine(bot, outbound)
+media_pool = ThreadPoolExecutor(max_workers=MEDIA_WORKERS, thread_name_prefix='media')
+media_warmer = MediaWarmer(bot)
+scheduler = Scheduler()
+agenda_alerts = AgendaAlerts(scheduler, broadcasts)
+deadlines = DeadlineWatcher(scheduler, lambda meeting_id: send_satisfaction_survey(meeting_id))
+meeting_purger = MeetingPurger(scheduler)
+media_collector = MediaCollector(scheduler)
+
+user_states = create_state_store()
+
+
+def remove_meeting(meeting_id):
+    """Удаление встречи: сразу целиком или архивом с фоновой очисткой (MEETING_DELETE_MODE)"""
+    if MEETING_DELETE_MODE == 'archive':
+        archive_meeting(meeting_id)
+        meeting_purger.purge(meeting_id)
+    else:
+        delete_meeting(meeting_id)
+
+
+def clip_text(text, limit=350):
+    """Обрезает длинный текст, чтобы страница списка не вышла за лимит 4096 символов"""
+    if text is None or len(text) <= limit:
+        return text
+    return text[:limit] + '…'
 
-bot = telebot.TeleBot(BOT_TOKEN)
 
-user_states = {}
+@bot.callback_query_handler(func=lambda call: True)
+def dispatch_callback(call):
+    """Все inline-кнопки: разбор callback_data и вызов обработчика"""
+    callbacks.dispatch(call)
 
 
 @bot.message_handler(commands=['start'])
@@ -23,7 +74,7 @@ def start_command(message):
             reply_markup=language_keyboard()
         )
     else:
-        lang = user[1]  
+        lang = user.language  
         bot.send_message(
             message.chat.id,
             get_text(lang, 'welcome'),
@@ -35,7 +86,7 @@ def admin_command(message):
     """Команда /admin - вход в админку"""
     user_id = message.from_user.id
     user = get_user(user_id)
-    lang = user[1] if user else 'en'
+    lang = user.language if user else 'en'
     
     if is_admin(user_id):
         bot.send_message(
@@ -51,7 +102,7 @@ def check_admin_password(message):
     """Проверка пароля администратора"""
     user_id = message.from_user.id
     user = get_user(user_id)
-    lang = user[1] if user else 'en'
+    lang = user.language if user else 'en'
     
     if message.text == ADMIN_PASSWORD:
         set_admin(user_id)
@@ -64,11 +115,90 @@ def check_admin_password(message):
         bot.send_message(message.chat.id, get_text(lang, 'wrong_password'))
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('lang_'))
-def language_callback(call):
+@bot.message_handler(commands=['deadline'])
+def deadline_command(message):
+    """Команда /deadline <id> <ГГГГ-ММ-ДД ЧЧ:ММ | off> - автозавершение встречи"""
+    user_id = message.from_user.id
+    user = get_user(user_id)
+    lang = user.language if user else 'en'
+    if not is_admin(user_id):
+        bot.send_message(message.chat.id, get_text(lang, 'admin_only'))
+        return
+    parts = message.text.split(maxsplit=2)
+    meeting = get_meeting(int(parts[1])) if len(parts) == 3 and parts[1].isdigit() else None
+    if not meeting:
+        bot.send_message(message.chat.id, get_text(lang, 'deadline_usage'))
+        return
+    if parts[2].strip().lower() == 'off':
+        clear_meeting_deadline(meeting.id)
+        deadlines.refresh()
+        bot.send_message(message.chat.id, get_text(lang, 'deadline_cleared', meeting=meeting.name))
+        return
+    moment = parse_deadline(parts[2])
+    if moment is None:
+        bot.send_message(message.chat.id, get_text(lang, 'deadline_usage'))
+        return
+    set_meeting_deadline(meeting.id, format_deadline(moment))
+    deadlines.refresh()
+    bot.send_message(message.chat.id, get_text(lang, 'deadline_scheduled', meeting=meeting.name, deadline=format_deadline(moment)))
+
+
+@bot.message_handler(commands=['search'])
+def search_command(message):
+    """Команда /search <слова> - полнотекстовый поиск по вопросам и отзывам"""
+    user_id = message.from_user.id
+    user = get_user(user_id)
+    lang = user.language if user else 'en'
+    if not is_admin(user_id):
+        bot.send_message(message.chat.id, get_text(lang, 'admin_only'))
+        return
+    parts = message.text.split(maxsplit=1)
+    query = parts[1].strip() if len(parts) == 2 else ''
+    if not fts_query(query):
+        bot.send_message(message.chat.id, get_text(lang, 'search_usage'))
+        return
+    questions = search_questions(query, SEARCH_RESULTS_LIMIT)
+    feedback = search_feedback(query, SEARCH_RESULTS_LIMIT)
+    if not questions and not feedback:
+        bot.send_message(message.chat.id, get_text(lang, 'search_no_results', query=query))
+        return
+    text = f"🔎 {query}\n"
+    if questions:
+        text += f"\n{get_text(lang, 'search_questions')}\n"
+        for q in questions:
+            text += f"• [{q.meeting_id}] {clip_text(q.question, 200)} ({q.date})\n"
+    if feedback:
+        text += f"\n{get_text(lang, 'search_feedback')}\n"
+        for f in feedback:
+            text += f"• [{f.meeting_id}] {clip_text(f.feedback, 200)} ({f.date})\n"
+    bot.send_message(message.chat.id, text)
+
+
+@bot.message_handler(commands=['stats'])
+def stats_command(message):
+    """Команда /stats - время обработчиков и число запросов по маршрутам за последние минуты"""
+    user_id = message.from_user.id
+    user = get_user(user_id)
+    lang = user.language if user else 'en'
+    if not is_admin(user_id):
+        bot.send_message(message.chat.id, get_text(lang, 'admin_only'))
+        return
+    minutes = handler_metrics.window // 60
+    rows = handler_metrics.summary()
+    if not rows:
+        bot.send_message(message.chat.id, get_text(lang, 'stats_empty', minutes=minutes))
+        return
+    text = get_text(lang, 'stats_title', minutes=minutes) + "\n"
+    # самые затратные маршруты, чтобы сообщение уложилось в лимит 4096 символов
+    for route, count, errors, p50, p95, slowest, db_calls, statements, api_calls in rows[:25]:
+        text += f"\n{route} ×{count}" + (f" ⚠️{errors}" if errors else '')
+        text += f"\n   {p50 * 1000:.0f}/{p95 * 1000:.0f}/{slowest * 1000:.0f} · {db_calls:.1f} · {statements:.1f} · {api_calls:.1f}"
+    bot.send_message(message.chat.id, text)
+
+@callbacks.route('lang_<lang>')
+def language_callback(call, lang):
     """Выбор языка"""
     user_id = call.from_user.id
-    lang = call.data.split('_')[1]
     
     update_user_language(user_id, lang)
     
@@ -83,12 +213,12 @@ def language_callback(call):
         reply_markup=main_menu_keyboard(lang)
     )
 
-@bot.callback_query_handler(func=lambda call: call.data == 'back_main')
+@callbacks.route('back_main')
 def back_to_main(call):
     """Возврат в главное меню"""
     user_id = call.from_user.id
     user = get_user(user_id)
-    lang = user[1] if user else 'en'
+    lang = user.language if user else 'en'
     
     bot.edit_message_text(
         get_text(lang, 'main_menu'),
@@ -96,12 +226,12 @@ def back_to_main(call):
         call.message.message_id
     )
 
-@bot.callback_query_handler(func=lambda call: call.data == 'back_meetings')
+@callbacks.route('back_meetings')
 def back_to_meetings(call):
     """Возврат к списку встреч"""
     user_id = call.from_user.id
     user = get_user(user_id)
-    lang = user[1] if user else 'en'
+    lang = user.language if user else 'en'
     
     meetings = get_all_meetings()
     if meetings:
@@ -112,66 +242,70 @@ def back_to_meetings(call):
             reply_markup=meetings_keyboard(meetings, lang)
         )
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('meeting_') and not call.data.startswith('meeting_details'))
-def meeting_callback(call):
+def meeting_view_keyboard(view, lang):
+    return meeting_details_keyboard(
+        view['meeting'].id, lang,
+        has_agenda=view['has_agenda'],
+        has_people=view['has_people'],
+        has_photos=view['has_photos'],
+        has_wifi=view['has_wifi'],
+        has_map=view['has_map'],
+        is_following=view['is_following']
+    )
+
+@callbacks.route('meeting_<int:meeting_id>')
+def meeting_callback(call, meeting_id):
     """Показать детали встречи"""
     user_id = call.from_user.id
     user = get_user(user_id)
-    lang = user[1] if user else 'en'
+    lang = user.language if user else 'en'
     
-    meeting_id = int(call.data.split('_')[1])
-    meeting = get_meeting(meeting_id)
+    view = get_meeting_view(meeting_id, user_id)
     
-    if meeting:
-        is_following = is_participant(meeting_id, user_id)
-        text = get_text(lang, 'meeting_details', name=meeting[1], location=meeting[2] or 'N/A', date=meeting[3] or 'N/A')
-        wifi_network = meeting[4] if len(meeting) > 4 else None
-        wifi_password = meeting[5] if len(meeting) > 5 else None
+    if view:
+        meeting = view['meeting']
+        text = get_text(lang, 'meeting_details', name=meeting.name, location=meeting.location or 'N/A', date=meeting.date or 'N/A')
+        wifi_network = meeting.wifi_network
+        wifi_password = meeting.wifi_password
         if wifi_network or wifi_password:
             text += f"\n\n📶 WiFi\nSSID: {wifi_network or 'N/A'}\nPassword: {wifi_password or 'N/A'}"
-        participants = get_participants(meeting_id)
+        participants = view['participants']
         if participants:
-            text += f"\n\n👥 Participants ({len(participants)}):\n"
-            for p in participants[:5]:
-                name = p[1] or 'N/A'
-                phone = p[2] or ''
-                company = p[3] or ''
+            text += f"\n\n👥 Participants ({view['participant_count']}):\n"
+            for p in participants:
+                name = p.name or 'N/A'
+                phone = p.phone or ''
+                company = p.company or ''
                 extra = " ".join([x for x in [phone, company] if x])
                 text += f"• {name}" + (f" — {extra}" if extra else "") + "\n"
-            if len(participants) > 5:
+            if view['participant_count'] > len(participants):
                 text += "..."
-        photos = get_photos(meeting_id)
-        if photos:
-            photo = photos[0]
+        photo = view['first_photo']
+        if photo:
             try:
-                if isinstance(photo, str) and photo.startswith('file://'):
-                    path = photo[len('file://'):]
-                    with open(path, 'rb') as f:
-                        bot.send_photo(call.message.chat.id, f, caption=text, reply_markup=meeting_details_keyboard(meeting_id, lang, is_following=is_following))
-                else:
-                    bot.send_photo(call.message.chat.id, photo, caption=text, reply_markup=meeting_details_keyboard(meeting_id, lang, is_following=is_following))
+                send_media_photo(bot, call.message.chat.id, photo, caption=text, reply_markup=meeting_view_keyboard(view, lang))
                 return
-            except:
-                pass
+            except Exception as e:
+                # the text-only view below is the fallback
+                print(f"Ошибка отправки фото встречи {meeting_id}: {e}")
         bot.edit_message_text(
             text,
             call.message.chat.id,
             call.message.message_id,
-            reply_markup=meeting_details_keyboard(meeting_id, lang, is_following=is_following)
+            reply_markup=meeting_view_keyboard(view, lang)
         )
         try:
             bot.send_message(call.message.chat.id, " ", reply_markup=telebot.types.ReplyKeyboardRemove())
-        except:
-            pass
+        except Exception as e:
+            print(f"Ошибка скрытия клавиатуры: {e}")
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('agenda_') and not call.data.startswith('agenda_item_') and not call.data.startswith('agenda_alert_toggle_') and not call.data.startswith('agenda_skip_desc'))
-def agenda_callback(call):
+@callbacks.route('agenda_<int:meeting_id>')
+def agenda_callback(call, meeting_id):
     """Показать повестку дня"""
     user_id = call.from_user.id
     user = get_user(user_id)
-    lang = user[1] if user else 'en'
+    lang = user.language if user else 'en'
     
-    meeting_id = int(call.data.split('_')[1])
     agenda_items = get_agenda(meeting_id)
     
     text = f"📋 {get_text(lang, 'agenda')}\n"
@@ -182,21 +316,18 @@ def agenda_callback(call):
         reply_markup=user_agenda_list_keyboard(meeting_id, agenda_items or [], lang)
     )
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('agenda_item_'))
-def agenda_item_view_callback(call):
+@callbacks.route('agenda_item_<int:agenda_id>_<int:meeting_id>')
+def agenda_item_view_callback(call, agenda_id, meeting_id):
     user_id = call.from_user.id
     user = get_user(user_id)
-    lang = user[1] if user else 'en'
-    parts = call.data.split('_')
-    agenda_id = int(parts[2])
-    meeting_id = int(parts[3])
+    lang = user.language if user else 'en'
     items = get_agenda(meeting_id)
-    item = next((i for i in items if i[0] == agenda_id), None)
+    item = next((i for i in items if i.id == agenda_id), None)
     if item:
-        title = item[2] or ''
-        start = item[3] or ''
-        end = item[4] or ''
-        desc = item[5] or ''
+        title = item.title or ''
+        start = item.start_time or ''
+        end = item.end_time or ''
+        desc = item.description or ''
         text = f"🕐 {start}–{end} • {title}\n" + (f"{desc}" if desc else '')
     else:
         text = get_text(lang, 'error')
@@ -208,27 +339,25 @@ def agenda_item_view_callback(call):
         reply_markup=user_agenda_item_keyboard(agenda_id, meeting_id, subscribed, lang)
     )
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('agenda_alert_toggle_'))
-def agenda_alert_toggle_callback(call):
+@callbacks.route('agenda_alert_toggle_<int:agenda_id>_<int:meeting_id>')
+def agenda_alert_toggle_callback(call, agenda_id, meeting_id):
     user_id = call.from_user.id
     user = get_user(user_id)
-    lang = user[1] if user else 'en'
-    parts = call.data.split('_')
-    agenda_id = int(parts[3])
-    meeting_id = int(parts[4])
+    lang = user.language if user else 'en'
     if is_agenda_alerted(agenda_id, user_id):
         remove_agenda_alert(agenda_id, user_id)
-        bot.answer_callback_query(call.id, get_text(lang, 'alert_off'))
+        outbound.later(bot.answer_callback_query, call.id, get_text(lang, 'alert_off'))
     else:
         add_agenda_alert(agenda_id, user_id)
-        bot.answer_callback_query(call.id, get_text(lang, 'alert_on'))
+        outbound.later(bot.answer_callback_query, call.id, get_text(lang, 'alert_on'))
+    agenda_alerts.refresh(agenda_id)
     items = get_agenda(meeting_id)
-    item = next((i for i in items if i[0] == agenda_id), None)
+    item = next((i for i in items if i.id == agenda_id), None)
     if item:
-        title = item[2] or ''
-        start = item[3] or ''
-        end = item[4] or ''
-        desc = item[5] or ''
+        title = item.title or ''
+        start = item.start_time or ''
+        end = item.end_time or ''
+        desc = item.description or ''
         text = f"🕐 {start}–{end} • {title}\n" + (f"{desc}" if desc else '')
     else:
         text = get_text(lang, 'error')
@@ -240,22 +369,21 @@ def agenda_alert_toggle_callback(call):
         reply_markup=user_agenda_item_keyboard(agenda_id, meeting_id, subscribed, lang)
     )
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('wifi_'))
-def wifi_callback(call):
+@callbacks.route('wifi_<int:meeting_id>')
+def wifi_callback(call, meeting_id):
     """Показать WiFi пароль"""
     user_id = call.from_user.id
     user = get_user(user_id)
-    lang = user[1] if user else 'en'
+    lang = user.language if user else 'en'
     
-    meeting_id = int(call.data.split('_')[1])
     meeting = get_meeting(meeting_id)
     
-    if meeting and meeting[4]:
+    if meeting and meeting.wifi_network:
         text = get_text(
             lang,
             'wifi_info',
-            network=meeting[4],
-            password=meeting[5] or 'N/A'
+            network=meeting.wifi_network,
+            password=meeting.wifi_password or 'N/A'
         )
     else:
         text = get_text(lang, 'no_wifi_info')
@@ -267,30 +395,28 @@ def wifi_callback(call):
         reply_markup=back_to_meeting_keyboard(meeting_id, lang)
     )
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('pdf_'))
-def pdf_callback(call):
+@callbacks.route('pdf_<int:meeting_id>')
+def pdf_callback(call, meeting_id):
     user_id = call.from_user.id
     user = get_user(user_id)
-    lang = user[1] if user else 'en'
-    meeting_id = int(call.data.split('_')[1])
+    lang = user.language if user else 'en'
     file_id = get_meeting_pdf(meeting_id)
     if file_id:
         try:
-            bot.send_document(call.message.chat.id, file_id)
-        except:
-            pass
+            send_media_document(bot, call.message.chat.id, file_id)
+        except Exception as e:
+            print(f"Ошибка отправки PDF встречи {meeting_id}: {e}")
         bot.send_message(call.message.chat.id, get_text(lang, 'pdf_info'), reply_markup=back_to_meeting_keyboard(meeting_id, lang))
     else:
         bot.edit_message_text(get_text(lang, 'no_pdf_user'), call.message.chat.id, call.message.message_id, reply_markup=back_to_meeting_keyboard(meeting_id, lang))
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('qna_'))
-def qna_callback(call):
+@callbacks.route('qna_<int:meeting_id>')
+def qna_callback(call, meeting_id):
     """Q&A секция"""
     user_id = call.from_user.id
     user = get_user(user_id)
-    lang = user[1] if user else 'en'
+    lang = user.language if user else 'en'
     
-    meeting_id = int(call.data.split('_')[1])
     user_states[user_id] = {'state': 'asking_question', 'meeting_id': meeting_id}
     
     bot.edit_message_text(
@@ -299,77 +425,76 @@ def qna_callback(call):
         call.message.message_id
     )
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('people_'))
-def people_callback(call):
-    """Список участников"""
+@callbacks.route('people_<int:meeting_id>')
+@callbacks.route('people_next_<int:meeting_id>_<int:after>')
+@callbacks.route('people_prev_<int:meeting_id>_<int:before>')
+def people_callback(call, meeting_id, after=None, before=None):
+    """Список участников, по PEOPLE_PAGE_SIZE на страницу"""
     user_id = call.from_user.id
     user = get_user(user_id)
-    lang = user[1] if user else 'en'
+    lang = user.language if user else 'en'
     
-    meeting_id = int(call.data.split('_')[1])
-    participants = get_participants(meeting_id)
+    participants, has_prev, has_next = get_participants_page(meeting_id, PEOPLE_PAGE_SIZE, after, before)
     
     text = f"👥 {get_text(lang, 'people')}\n\n"
     if participants:
         for p in participants:
-            name = p[1] if p[1] else 'No name'
-            phone = p[2] if p[2] else 'N/A'
-            company = p[3] if p[3] else 'N/A'
+            name = p.name if p.name else 'No name'
+            phone = p.phone if p.phone else 'N/A'
+            company = p.company if p.company else 'N/A'
             text += f"👤 {name}\n📞 {phone}\n🏢 {company}\n\n"
     else:
         text += get_text(lang, 'no_participants')
     
+    first, last = (participants[0].user_id, participants[-1].user_id) if participants else (None, None)
     bot.edit_message_text(
         text,
         call.message.chat.id,
         call.message.message_id,
-        reply_markup=back_to_meeting_keyboard(meeting_id, lang)
+        reply_markup=people_page_keyboard(meeting_id, lang, first, last, has_prev, has_next)
     )
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('follow_'))
-def follow_callback(call):
+@callbacks.route('follow_<int:meeting_id>')
+def follow_callback(call, meeting_id):
     user_id = call.from_user.id
     user = get_user(user_id)
-    lang = user[1] if user else 'en'
-    meeting_id = int(call.data.split('_')[1])
-    if not user or not user[2] or not user[3] or not user[4]:
-        bot.answer_callback_query(call.id)
+    lang = user.language if user else 'en'
+    if not user or not user.name or not user.phone or not user.company:
+        outbound.later(bot.answer_callback_query, call.id)
         bot.send_message(call.message.chat.id, get_text(lang, 'fill_profile_first'), reply_markup=fill_profile_first_keyboard(lang))
         return
     add_participant(meeting_id, user_id)
-    meeting = get_meeting(meeting_id)
-    text = get_text(lang, 'meeting_details', name=meeting[1], location=meeting[2] or 'N/A', date=meeting[3] or 'N/A')
+    view = get_meeting_view(meeting_id, user_id)
+    meeting = view['meeting']
+    text = get_text(lang, 'meeting_details', name=meeting.name, location=meeting.location or 'N/A', date=meeting.date or 'N/A')
     bot.edit_message_text(
         text,
         call.message.chat.id,
         call.message.message_id,
-        reply_markup=meeting_details_keyboard(meeting_id, lang, is_following=True)
+        reply_markup=meeting_view_keyboard(view, lang)
     )
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('unfollow_'))
-def unfollow_callback(call):
+@callbacks.route('unfollow_<int:meeting_id>')
+def unfollow_callback(call, meeting_id):
     user_id = call.from_user.id
     user = get_user(user_id)
-    lang = user[1] if user else 'en'
-    meeting_id = int(call.data.split('_')[1])
+    lang = user.language if user else 'en'
     remove_participant(meeting_id, user_id)
-    meeting = get_meeting(meeting_id)
-    text = get_text(lang, 'meeting_details', name=meeting[1], location=meeting[2] or 'N/A', date=meeting[3] or 'N/A')
+    view = get_meeting_view(meeting_id, user_id)
+    meeting = view['meeting']
+    text = get_text(lang, 'meeting_details', name=meeting.name, location=meeting.location or 'N/A', date=meeting.date or 'N/A')
     bot.edit_message_text(
         text,
         call.message.chat.id,
         call.message.message_id,
-        reply_markup=meeting_details_keyboard(meeting_id, lang, is_following=False)
+        reply_markup=meeting_view_keyboard(view, lang)
     )
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('rate_'))
-def rate_callback(call):
+@callbacks.route('rate_<int:meeting_id>_<rating>')
+def rate_callback(call, meeting_id, rating):
     user_id = call.from_user.id
     user = get_user(user_id)
-    lang = user[1] if user else 'en'
-    parts = call.data.split('_')
-    meeting_id = int(parts[1])
-    rating = parts[2]
+    lang = user.language if user else 'en'
     add_feedback(meeting_id, user_id, rating)
     bot.edit_message_text(
         get_text(lang, 'feedback_prompt'),
@@ -378,12 +503,11 @@ def rate_callback(call):
         reply_markup=yes_no_keyboard(meeting_id, lang)
     )
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('feedback_yes_'))
-def feedback_yes_callback(call):
+@callbacks.route('feedback_yes_<int:meeting_id>')
+def feedback_yes_callback(call, meeting_id):
     user_id = call.from_user.id
     user = get_user(user_id)
-    lang = user[1] if user else 'en'
-    meeting_id = int(call.data.split('_')[2])
+    lang = user.language if user else 'en'
     user_states[user_id] = {'state': 'meeting_feedback', 'meeting_id': meeting_id}
     bot.edit_message_text(
         get_text(lang, 'enter_feedback'),
@@ -391,46 +515,56 @@ def feedback_yes_callback(call):
         call.message.message_id
     )
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('feedback_no_'))
-def feedback_no_callback(call):
+@callbacks.route('feedback_no_<int:meeting_id>')
+def feedback_no_callback(call, meeting_id):
     user_id = call.from_user.id
     user = get_user(user_id)
-    lang = user[1] if user else 'en'
-    meeting_id = int(call.data.split('_')[2])
+    lang = user.language if user else 'en'
     bot.edit_message_text(
         get_text(lang, 'thank_you'),
         call.message.chat.id,
         call.message.message_id
     )
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('photos_'))
-def photos_callback(call):
+def send_photo_gallery(chat_id, meeting_id, lang, page=0, admin=False):
+    """Одна страница галереи альбомами по 10 фото; первый альбом сразу, остальные в фоне"""
+    total = count_photos(meeting_id)
+    if not total:
+        return False
+    pages = (total + PHOTOS_PAGE_SIZE - 1) // PHOTOS_PAGE_SIZE
+    page = min(max(page, 0), pages - 1)
+    photos = get_photos(meeting_id, page * PHOTOS_PAGE_SIZE, PHOTOS_PAGE_SIZE)
+    albums = [photos[i:i + ALBUM_SIZE] for i in range(0, len(photos), ALBUM_SIZE)]
+    caption = f"📸 {get_text(lang, 'photos')} ({total})"
+    if pages > 1:
+        caption += f" · {page + 1}/{pages}"
+    if admin:
+        markup = admin_photos_view_keyboard(meeting_id, lang, True, page, pages)
+    else:
+        markup = photos_page_keyboard(meeting_id, lang, page, pages)
+
+    send_album(bot, chat_id, albums[0])
+
+    def send_rest():
+        try:
+            for album in albums[1:]:
+                send_album(bot, chat_id, album)
+            bot.send_message(chat_id, caption, reply_markup=markup)
+        except Exception as e:
+            print(f"Ошибка отправки галереи встречи {meeting_id}: {e}")
+
+    media_pool.submit(send_rest)
+    return True
+
+@callbacks.route('photos_<int:meeting_id>')
+@callbacks.route('photos_page_<int:meeting_id>_<int:page>')
+def photos_callback(call, meeting_id, page=0):
     """Фотографии"""
     user_id = call.from_user.id
     user = get_user(user_id)
-    lang = user[1] if user else 'en'
+    lang = user.language if user else 'en'
     
-    meeting_id = int(call.data.split('_')[1])
-    photos = get_photos(meeting_id)
-    
-    if photos:
-        # Отправляем фотографии
-        for photo in photos:
-            try:
-                if isinstance(photo, str) and photo.startswith('file://'):
-                    path = photo[len('file://'):]
-                    with open(path, 'rb') as f:
-                        bot.send_photo(call.message.chat.id, f)
-                else:
-                    bot.send_photo(call.message.chat.id, photo)
-            except:
-                pass
-        bot.send_message(
-            call.message.chat.id,
-            f"📸 {get_text(lang, 'photos')} ({len(photos)})",
-            reply_markup=back_to_meeting_keyboard(meeting_id, lang)
-        )
-    else:
+    if not send_photo_gallery(call.message.chat.id, meeting_id, lang, page):
         text = f"📸 {get_text(lang, 'photos')}\n\n"
         text += get_text(lang, 'no_photos_user')
         bot.edit_message_text(
@@ -440,18 +574,17 @@ def photos_callback(call):
             reply_markup=back_to_meeting_keyboard(meeting_id, lang)
         )
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('map_'))
-def map_callback(call):
+@callbacks.route('map_<int:meeting_id>')
+def map_callback(call, meeting_id):
     """Карта"""
     user_id = call.from_user.id
     user = get_user(user_id)
-    lang = user[1] if user else 'en'
+    lang = user.language if user else 'en'
     
-    meeting_id = int(call.data.split('_')[1])
     meeting = get_meeting(meeting_id)
     
-    if meeting and meeting[6] and meeting[7]:  # latitude and longitude
-        bot.send_location(call.message.chat.id, meeting[6], meeting[7])
+    if meeting and meeting.latitude and meeting.longitude:  # latitude and longitude
+        bot.send_location(call.message.chat.id, meeting.latitude, meeting.longitude)
         bot.send_message(
             call.message.chat.id,
             f"🗺 {get_text(lang, 'live_map')}",
@@ -468,22 +601,22 @@ def map_callback(call):
         )
 
 
-@bot.callback_query_handler(func=lambda call: call.data == 'admin_add_meeting')
+@callbacks.route('admin_add_meeting')
 def admin_add_meeting_callback(call):
     """Добавление встречи"""
     user_id = call.from_user.id
     user = get_user(user_id)
-    lang = user[1] if user else 'en'
+    lang = user.language if user else 'en'
     
     user_states[user_id] = {'state': 'creating_meeting', 'step': 'name'}
     bot.send_message(call.message.chat.id, get_text(lang, 'enter_meeting_name'), reply_markup=telebot.types.ReplyKeyboardRemove())
 
-@bot.callback_query_handler(func=lambda call: call.data == 'admin_manage')
+@callbacks.route('admin_manage')
 def admin_manage_callback(call):
     """Управление встречами"""
     user_id = call.from_user.id
     user = get_user(user_id)
-    lang = user[1] if user else 'en'
+    lang = user.language if user else 'en'
     
     meetings = get_all_meetings()
     if meetings:
@@ -494,13 +627,13 @@ def admin_manage_callback(call):
             reply_markup=admin_meetings_keyboard(meetings, lang)
         )
     else:
-        bot.answer_callback_query(call.id, get_text(lang, 'no_meetings'))
+        outbound.later(bot.answer_callback_query, call.id, get_text(lang, 'no_meetings'))
 
-@bot.callback_query_handler(func=lambda call: call.data == 'admin_feedback_main')
+@callbacks.route('admin_feedback_main')
 def admin_feedback_main_callback(call):
     user_id = call.from_user.id
     user = get_user(user_id)
-    lang = user[1] if user else 'en'
+    lang = user.language if user else 'en'
     meetings = get_finished_meetings()
     header = get_text(lang, 'finished_meetings')
     if meetings:
@@ -520,43 +653,40 @@ def admin_feedback_main_callback(call):
 
     
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('admin_feedback_view_'))
-def admin_feedback_view_callback(call):
+@callbacks.route('admin_feedback_view_<int:meeting_id>')
+@callbacks.route('admin_feedback_view_next_<int:meeting_id>_<int:after>')
+@callbacks.route('admin_feedback_view_prev_<int:meeting_id>_<int:before>')
+def admin_feedback_view_callback(call, meeting_id, after=None, before=None):
     user_id = call.from_user.id
     user = get_user(user_id)
-    lang = user[1] if user else 'en'
-    parts = call.data.split('_')
-    meeting_id = int(parts[3])
-    feedbacks = get_feedback_for_meeting(meeting_id)
-    count_bad = sum(1 for f in feedbacks if f[1] == 'bad')
-    count_good = sum(1 for f in feedbacks if f[1] == 'good')
-    count_neutral = sum(1 for f in feedbacks if f[1] == 'neutral')
+    lang = user.language if user else 'en'
+    stats = get_feedback_stats(meeting_id)
+    comments, has_prev, has_next = get_feedback_comments_page(meeting_id, FEEDBACK_PAGE_SIZE, after, before)
     text = f"💬 {get_text(lang, 'view_feedback')}\n\n"
-    text += f"😡: {count_bad}  🤩: {count_good}  😐: {count_neutral}\n\n"
-    detailed = [f for f in feedbacks if f[2]]
-    if detailed:
-        text += "📝 " + get_text(lang, 'view_feedback') + "\n"
-        for f in detailed[:50]:
-            text += f"• {f[2]}\n"
+    text += f"😡: {stats.bad}  🤩: {stats.good}  😐: {stats.neutral}\n\n"
+    if comments:
+        text += "📝 " + get_text(lang, 'view_feedback') + f" ({stats.detailed})\n"
+        for f in comments:
+            text += f"• {clip_text(f.feedback)}\n"
+    first, last = (comments[0].id, comments[-1].id) if comments else (None, None)
     bot.edit_message_text(
         text,
         call.message.chat.id,
         call.message.message_id,
-        reply_markup=admin_feedback_back_to_list_keyboard(lang)
+        reply_markup=admin_feedback_back_to_list_keyboard(lang, meeting_id, first, last, has_prev, has_next)
     )
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('admin_meeting_'))
-def admin_meeting_manage_callback(call):
+@callbacks.route('admin_meeting_<int:meeting_id>')
+def admin_meeting_manage_callback(call, meeting_id):
     """Управление конкретной встречей"""
     user_id = call.from_user.id
     user = get_user(user_id)
-    lang = user[1] if user else 'en'
+    lang = user.language if user else 'en'
     
-    meeting_id = int(call.data.split('_')[2])
     meeting = get_meeting(meeting_id)
     
     if meeting:
-        text = f"⚙️ {meeting[1]}\n\n{get_text(lang, 'choose_action')}"
+        text = f"⚙️ {meeting.name}\n\n{get_text(lang, 'choose_action')}"
         bot.edit_message_text(
             text,
             call.message.chat.id,
@@ -564,96 +694,92 @@ def admin_meeting_manage_callback(call):
             reply_markup=admin_meeting_manage_keyboard(meeting_id, lang)
         )
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('admin_edit_name_'))
-def admin_edit_name_callback(call):
+@callbacks.route('admin_edit_name_<int:meeting_id>')
+def admin_edit_name_callback(call, meeting_id):
     user_id = call.from_user.id
     user = get_user(user_id)
-    lang = user[1] if user else 'en'
-    meeting_id = int(call.data.split('_')[3])
+    lang = user.language if user else 'en'
     user_states[user_id] = {'state': 'admin_edit_meeting', 'meeting_id': meeting_id, 'field': 'name'}
     bot.send_message(call.message.chat.id, get_text(lang, 'enter_meeting_name'), reply_markup=telebot.types.ReplyKeyboardRemove())
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('admin_edit_date_'))
-def admin_edit_date_callback(call):
+@callbacks.route('admin_edit_date_<int:meeting_id>')
+def admin_edit_date_callback(call, meeting_id):
     user_id = call.from_user.id
     user = get_user(user_id)
-    lang = user[1] if user else 'en'
-    meeting_id = int(call.data.split('_')[3])
+    lang = user.language if user else 'en'
     user_states[user_id] = {'state': 'admin_edit_meeting', 'meeting_id': meeting_id, 'field': 'date'}
     bot.send_message(call.message.chat.id, get_text(lang, 'enter_date'), reply_markup=telebot.types.ReplyKeyboardRemove())
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('admin_edit_location_'))
-def admin_edit_location_callback(call):
+@callbacks.route('admin_edit_location_<int:meeting_id>')
+def admin_edit_location_callback(call, meeting_id):
     user_id = call.from_user.id
     user = get_user(user_id)
-    lang = user[1] if user else 'en'
-    meeting_id = int(call.data.split('_')[3])
+    lang = user.language if user else 'en'
     user_states[user_id] = {'state': 'admin_edit_meeting', 'meeting_id': meeting_id, 'field': 'location'}
     bot.send_message(call.message.chat.id, get_text(lang, 'enter_location'), reply_markup=telebot.types.ReplyKeyboardRemove())
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('admin_feedback_'))
-def admin_feedback_callback(call):
+@callbacks.route('admin_feedback_<int:meeting_id>')
+@callbacks.route('admin_feedback_next_<int:meeting_id>_<int:after>')
+@callbacks.route('admin_feedback_prev_<int:meeting_id>_<int:before>')
+def admin_feedback_callback(call, meeting_id, after=None, before=None):
     user_id = call.from_user.id
     user = get_user(user_id)
-    lang = user[1] if user else 'en'
-    meeting_id = int(call.data.split('_')[2])
-    feedbacks = get_feedback_for_meeting(meeting_id)
-    count_bad = sum(1 for f in feedbacks if f[1] == 'bad')
-    count_good = sum(1 for f in feedbacks if f[1] == 'good')
-    count_neutral = sum(1 for f in feedbacks if f[1] == 'neutral')
+    lang = user.language if user else 'en'
+    stats = get_feedback_stats(meeting_id)
+    comments, has_prev, has_next = get_feedback_comments_page(meeting_id, FEEDBACK_PAGE_SIZE, after, before)
     text = "💬 Отзывы\n\n"
-    text += f"😡: {count_bad}  🤩: {count_good}  😐: {count_neutral}\n\n"
-    detailed = [f for f in feedbacks if f[2]]
-    if detailed:
-        text += "📝 Детальные отзывы:\n"
-        for f in detailed[:50]:
-            text += f"• {f[2]}\n"
+    text += f"😡: {stats.bad}  🤩: {stats.good}  😐: {stats.neutral}\n\n"
+    if comments:
+        text += f"📝 Детальные отзывы ({stats.detailed}):\n"
+        for f in comments:
+            text += f"• {clip_text(f.feedback)}\n"
     else:
         text += "📝 Пока нет детальных отзывов"
+    first, last = (comments[0].id, comments[-1].id) if comments else (None, None)
     bot.edit_message_text(
         text,
         call.message.chat.id,
         call.message.message_id,
-        reply_markup=admin_feedback_keyboard(meeting_id, lang)
+        reply_markup=admin_feedback_keyboard(meeting_id, lang, first, last, has_prev, has_next)
     )
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('admin_questions_meeting_'))
-def admin_questions_meeting_callback(call):
+@callbacks.route('admin_questions_meeting_<int:meeting_id>')
+@callbacks.route('admin_questions_meeting_next_<int:meeting_id>_<int:after>')
+@callbacks.route('admin_questions_meeting_prev_<int:meeting_id>_<int:before>')
+def admin_questions_meeting_callback(call, meeting_id, after=None, before=None):
     user_id = call.from_user.id
     user = get_user(user_id)
-    lang = user[1] if user else 'en'
-    meeting_id = int(call.data.split('_')[3])
-    questions = get_questions(meeting_id)
+    lang = user.language if user else 'en'
+    questions, has_prev, has_next = get_questions_page(meeting_id, QUESTIONS_PAGE_SIZE, after, before)
     text = f"❓ {get_text(lang, 'view_questions')}\n\n"
     if questions:
         for q in questions:
-            text += f"• {q[3]} ({q[4]})\n"
+            text += f"• {clip_text(q.question)} ({q.date})\n"
     else:
         text += get_text(lang, 'no_questions')
+    first, last = (questions[0].id, questions[-1].id) if questions else (None, None)
     bot.edit_message_text(
         text,
         call.message.chat.id,
         call.message.message_id,
-        reply_markup=admin_questions_back_keyboard(lang)
+        reply_markup=admin_questions_back_keyboard(lang, meeting_id, first, last, has_prev, has_next)
     )
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('view_finished_'))
-def view_finished_meeting_callback(call):
+@callbacks.route('view_finished_<int:meeting_id>')
+def view_finished_meeting_callback(call, meeting_id):
     user_id = call.from_user.id
     user = get_user(user_id)
-    lang = user[1] if user else 'en'
-    meeting_id = int(call.data.split('_')[2])
+    lang = user.language if user else 'en'
     meeting = get_meeting(meeting_id)
     if meeting:
-        text = get_text(lang, 'meeting_details', name=meeting[1], location=meeting[2] or 'N/A', date=meeting[3] or 'N/A')
+        text = get_text(lang, 'meeting_details', name=meeting.name, location=meeting.location or 'N/A', date=meeting.date or 'N/A')
         bot.edit_message_text(text, call.message.chat.id, call.message.message_id, reply_markup=finished_meeting_back_to_survey_keyboard(meeting_id, lang))
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('back_survey_'))
-def back_survey_callback(call):
+@callbacks.route('back_survey_<int:meeting_id>')
+def back_survey_callback(call, meeting_id):
     user_id = call.from_user.id
     user = get_user(user_id)
-    lang = user[1] if user else 'en'
-    meeting_id = int(call.data.split('_')[2])
+    lang = user.language if user else 'en'
     bot.edit_message_text(
         get_text(lang, 'satisfaction_prompt'),
         call.message.chat.id,
@@ -661,12 +787,11 @@ def back_survey_callback(call):
         reply_markup=satisfaction_keyboard(meeting_id, lang)
     )
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('admin_finish_'))
-def admin_finish_entry_callback(call):
+@callbacks.route('admin_finish_<int:meeting_id>')
+def admin_finish_entry_callback(call, meeting_id):
     user_id = call.from_user.id
     user = get_user(user_id)
-    lang = user[1] if user else 'en'
-    meeting_id = int(call.data.split('_')[2])
+    lang = user.language if user else 'en'
     bot.edit_message_text(
         get_text(lang, 'confirm_finish_meeting'),
         call.message.chat.id,
@@ -674,12 +799,11 @@ def admin_finish_entry_callback(call):
         reply_markup=finish_confirm_keyboard(meeting_id, lang)
     )
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('finish_confirm_'))
-def finish_confirm_callback(call):
+@callbacks.route('finish_confirm_<int:meeting_id>')
+def finish_confirm_callback(call, meeting_id):
     user_id = call.from_user.id
     user = get_user(user_id)
-    lang = user[1] if user else 'en'
-    meeting_id = int(call.data.split('_')[2])
+    lang = user.language if user else 'en'
     bot.edit_message_text(
         get_text(lang, 'confirm_finish_meeting'),
         call.message.chat.id,
@@ -688,24 +812,25 @@ def finish_confirm_callback(call):
     )
 
 def send_satisfaction_survey(meeting_id):
-    participants = get_participant_user_ids(meeting_id)
-    for uid in participants:
-        try:
-            user = get_user(uid)
-            lang = user[1] if user else 'en'
-            bot.send_message(uid, get_text(lang, 'satisfaction_prompt'), reply_markup=satisfaction_keyboard(meeting_id, lang))
-        except Exception as e:
-            print(f"Ошибка отправки опроса пользователю {uid}: {e}")
-
-@bot.callback_query_handler(func=lambda call: call.data.startswith('finish_yes_'))
-def finish_yes_callback(call):
-    user_id = call.from_user.id
-    user = get_user(user_id)
-    lang = user[1] if user else 'en'
-    meeting_id = int(call.data.split('_')[2])
-    mark_meeting_ended(meeting_id)
-    send_satisfaction_survey(meeting_id)
-    bot.answer_callback_query(call.id, get_text(lang, 'finish_meeting'))
+    markups = {}
+    messages = []
+    for uid, lang in get_participant_languages(meeting_id):
+        lang = lang or 'en'
+        if lang not in markups:
+            markups[lang] = satisfaction_keyboard(meeting_id, lang).to_json()
+        messages.append((uid, get_text(lang, 'satisfaction_prompt'), markups[lang]))
+    if messages:
+        broadcasts.submit('survey', messages)
+
+@callbacks.route('finish_yes_<int:meeting_id>')
+def finish_yes_callback(call, meeting_id):
+    user_id = call.from_user.id
+    user = get_user(user_id)
+    lang = user.language if user else 'en'
+    with transaction():
+        if mark_meeting_ended(meeting_id):
+            send_satisfaction_survey(meeting_id)
+    outbound.later(bot.answer_callback_query, call.id, get_text(lang, 'finish_meeting'))
     meetings = get_all_meetings()
     bot.edit_message_text(
         get_text(lang, 'manage_meetings'),
@@ -715,16 +840,15 @@ def finish_yes_callback(call):
     )
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('admin_wifi_'))
-def admin_wifi_view_callback(call):
+@callbacks.route('admin_wifi_<int:meeting_id>')
+def admin_wifi_view_callback(call, meeting_id):
     user_id = call.from_user.id
     user = get_user(user_id)
-    lang = user[1] if user else 'en'
-    meeting_id = int(call.data.split('_')[2])
+    lang = user.language if user else 'en'
     meeting = get_meeting(meeting_id)
-    has_wifi = bool(meeting and meeting[4])
+    has_wifi = bool(meeting and meeting.wifi_network)
     if has_wifi:
-        text = get_text(lang, 'wifi_info', network=meeting[4], password=meeting[5] or 'N/A')
+        text = get_text(lang, 'wifi_info', network=meeting.wifi_network, password=meeting.wifi_password or 'N/A')
     else:
         text = get_text(lang, 'no_wifi_info')
     bot.edit_message_text(
@@ -734,39 +858,35 @@ def admin_wifi_view_callback(call):
         reply_markup=admin_wifi_view_keyboard(meeting_id, lang, has_wifi)
     )
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('admin_wifi_edit_'))
-def admin_wifi_edit_callback(call):
+@callbacks.route('admin_wifi_edit_<int:meeting_id>')
+def admin_wifi_edit_callback(call, meeting_id):
     user_id = call.from_user.id
     user = get_user(user_id)
-    lang = user[1] if user else 'en'
-    meeting_id = int(call.data.split('_')[3])
+    lang = user.language if user else 'en'
     user_states[user_id] = {'state': 'editing_wifi', 'meeting_id': meeting_id, 'step': 'name'}
     bot.send_message(call.message.chat.id, get_text(lang, 'enter_wifi_name'), reply_markup=telebot.types.ReplyKeyboardRemove())
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('admin_wifi_edit_name_'))
-def admin_wifi_edit_name_callback(call):
+@callbacks.route('admin_wifi_edit_name_<int:meeting_id>')
+def admin_wifi_edit_name_callback(call, meeting_id):
     user_id = call.from_user.id
     user = get_user(user_id)
-    lang = user[1] if user else 'en'
-    meeting_id = int(call.data.split('_')[4])
+    lang = user.language if user else 'en'
     user_states[user_id] = {'state': 'editing_wifi_single', 'meeting_id': meeting_id, 'field': 'name'}
     bot.send_message(call.message.chat.id, get_text(lang, 'enter_wifi_name'), reply_markup=telebot.types.ReplyKeyboardRemove())
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('admin_wifi_edit_password_'))
-def admin_wifi_edit_password_callback(call):
+@callbacks.route('admin_wifi_edit_password_<int:meeting_id>')
+def admin_wifi_edit_password_callback(call, meeting_id):
     user_id = call.from_user.id
     user = get_user(user_id)
-    lang = user[1] if user else 'en'
-    meeting_id = int(call.data.split('_')[4])
+    lang = user.language if user else 'en'
     user_states[user_id] = {'state': 'editing_wifi_single', 'meeting_id': meeting_id, 'field': 'password'}
     bot.send_message(call.message.chat.id, get_text(lang, 'enter_wifi_password'), reply_markup=telebot.types.ReplyKeyboardRemove())
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('admin_wifi_clear_'))
-def admin_wifi_clear_callback(call):
+@callbacks.route('admin_wifi_clear_<int:meeting_id>')
+def admin_wifi_clear_callback(call, meeting_id):
     user_id = call.from_user.id
     user = get_user(user_id)
-    lang = user[1] if user else 'en'
-    meeting_id = int(call.data.split('_')[3])
+    lang = user.language if user else 'en'
     clear_wifi(meeting_id)
     bot.edit_message_text(
         get_text(lang, 'wifi_cleared'),
@@ -775,31 +895,13 @@ def admin_wifi_clear_callback(call):
         reply_markup=admin_wifi_view_keyboard(meeting_id, lang, False)
     )
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('admin_photos_') and not call.data.startswith('admin_photos_add_') and not call.data.startswith('admin_photos_clear_'))
-def admin_photos_view_callback(call):
+@callbacks.route('admin_photos_<int:meeting_id>')
+@callbacks.route('admin_photos_page_<int:meeting_id>_<int:page>')
+def admin_photos_view_callback(call, meeting_id, page=0):
     user_id = call.from_user.id
     user = get_user(user_id)
-    lang = user[1] if user else 'en'
-    meeting_id = int(call.data.split('_')[2])
-    photos = get_photos(meeting_id)
-    has_photos = bool(photos)
-    if has_photos:
-        for photo in photos:
-            try:
-                if isinstance(photo, str) and photo.startswith('file://'):
-                    path = photo[len('file://'):]
-                    with open(path, 'rb') as f:
-                        bot.send_photo(call.message.chat.id, f)
-                else:
-                    bot.send_photo(call.message.chat.id, photo)
-            except:
-                pass
-        bot.send_message(
-            call.message.chat.id,
-            f"📸 {get_text(lang, 'photos')} ({len(photos)})",
-            reply_markup=admin_photos_view_keyboard(meeting_id, lang, has_photos)
-        )
-    else:
+    lang = user.language if user else 'en'
+    if not send_photo_gallery(call.message.chat.id, meeting_id, lang, page, admin=True):
         bot.edit_message_text(
             get_text(lang, 'no_photos_admin'),
             call.message.chat.id,
@@ -807,78 +909,66 @@ def admin_photos_view_callback(call):
             reply_markup=admin_photos_view_keyboard(meeting_id, lang, False)
         )
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('admin_photos_add_'))
-def admin_photos_add_callback(call):
+@callbacks.route('admin_photos_add_<int:meeting_id>')
+def admin_photos_add_callback(call, meeting_id):
     user_id = call.from_user.id
     user = get_user(user_id)
-    lang = user[1] if user else 'en'
-    meeting_id = int(call.data.split('_')[3])
+    lang = user.language if user else 'en'
     user_states[user_id] = {'state': 'adding_photos', 'meeting_id': meeting_id}
     bot.send_message(call.message.chat.id, get_text(lang, 'send_photos'), reply_markup=telebot.types.ReplyKeyboardRemove())
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('admin_pdf_') and not call.data.startswith('admin_pdf_add_') and not call.data.startswith('admin_pdf_edit_') and not call.data.startswith('admin_pdf_clear_') and len(call.data.split('_')) == 3)
-def admin_pdf_view_callback(call):
+@callbacks.route('admin_pdf_<int:meeting_id>')
+def admin_pdf_view_callback(call, meeting_id):
     user_id = call.from_user.id
     user = get_user(user_id)
-    lang = user[1] if user else 'en'
-    meeting_id = int(call.data.split('_')[-1])
+    lang = user.language if user else 'en'
     file_id = get_meeting_pdf(meeting_id)
     has_pdf = bool(file_id)
     if has_pdf:
         try:
-            if isinstance(file_id, str) and file_id.startswith('file://'):
-                path = file_id[len('file://'):]
-                with open(path, 'rb') as f:
-                    bot.send_document(call.message.chat.id, f)
-            else:
-                bot.send_document(call.message.chat.id, file_id)
-        except:
-            pass
+            send_media_document(bot, call.message.chat.id, file_id)
+        except Exception as e:
+            print(f"Ошибка отправки PDF встречи {meeting_id}: {e}")
         bot.send_message(call.message.chat.id, get_text(lang, 'pdf_info'), reply_markup=admin_pdf_view_keyboard(meeting_id, lang, True))
     else:
         bot.edit_message_text(get_text(lang, 'no_pdf_admin'), call.message.chat.id, call.message.message_id, reply_markup=admin_pdf_view_keyboard(meeting_id, lang, False))
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('admin_pdf_add_'))
-def admin_pdf_add_callback(call):
+@callbacks.route('admin_pdf_add_<int:meeting_id>')
+def admin_pdf_add_callback(call, meeting_id):
     user_id = call.from_user.id
     user = get_user(user_id)
-    lang = user[1] if user else 'en'
-    meeting_id = int(call.data.split('_')[3])
+    lang = user.language if user else 'en'
     user_states[user_id] = {'state': 'adding_pdf', 'meeting_id': meeting_id}
     bot.send_message(call.message.chat.id, get_text(lang, 'send_pdf'), reply_markup=telebot.types.ReplyKeyboardRemove())
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('admin_pdf_edit_'))
-def admin_pdf_edit_callback(call):
+@callbacks.route('admin_pdf_edit_<int:meeting_id>')
+def admin_pdf_edit_callback(call, meeting_id):
     user_id = call.from_user.id
     user = get_user(user_id)
-    lang = user[1] if user else 'en'
-    meeting_id = int(call.data.split('_')[3])
+    lang = user.language if user else 'en'
     user_states[user_id] = {'state': 'editing_pdf', 'meeting_id': meeting_id}
     bot.send_message(call.message.chat.id, get_text(lang, 'send_pdf'), reply_markup=telebot.types.ReplyKeyboardRemove())
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('admin_pdf_clear_'))
-def admin_pdf_clear_callback(call):
+@callbacks.route('admin_pdf_clear_<int:meeting_id>')
+def admin_pdf_clear_callback(call, meeting_id):
     user_id = call.from_user.id
     user = get_user(user_id)
-    lang = user[1] if user else 'en'
-    meeting_id = int(call.data.split('_')[3])
+    lang = user.language if user else 'en'
     bot.edit_message_text(get_text(lang, 'confirm_delete_pdf'), call.message.chat.id, call.message.message_id, reply_markup=admin_pdf_delete_confirm_keyboard(meeting_id, lang))
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('admin_pdf_delete_confirm_yes_'))
-def admin_pdf_delete_confirm_yes_callback(call):
+@callbacks.route('admin_pdf_delete_confirm_yes_<int:meeting_id>')
+def admin_pdf_delete_confirm_yes_callback(call, meeting_id):
     user_id = call.from_user.id
     user = get_user(user_id)
-    lang = user[1] if user else 'en'
-    meeting_id = int(call.data.split('_')[-1])
+    lang = user.language if user else 'en'
     clear_pdf(meeting_id)
     bot.edit_message_text(get_text(lang, 'pdf_deleted'), call.message.chat.id, call.message.message_id, reply_markup=admin_pdf_view_keyboard(meeting_id, lang, False))
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('admin_photos_clear_'))
-def admin_photos_clear_callback(call):
+@callbacks.route('admin_photos_clear_<int:meeting_id>')
+def admin_photos_clear_callback(call, meeting_id):
     user_id = call.from_user.id
     user = get_user(user_id)
-    lang = user[1] if user else 'en'
-    meeting_id = int(call.data.split('_')[3])
+    lang = user.language if user else 'en'
     clear_photos(meeting_id)
     bot.edit_message_text(
         get_text(lang, 'photos_cleared'),
@@ -887,16 +977,15 @@ def admin_photos_clear_callback(call):
         reply_markup=admin_photos_view_keyboard(meeting_id, lang, False)
     )
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('admin_geo_') and not call.data.startswith('admin_geo_edit_') and not call.data.startswith('admin_geo_clear_'))
-def admin_geo_view_callback(call):
+@callbacks.route('admin_geo_<int:meeting_id>')
+def admin_geo_view_callback(call, meeting_id):
     user_id = call.from_user.id
     user = get_user(user_id)
-    lang = user[1] if user else 'en'
-    meeting_id = int(call.data.split('_')[2])
+    lang = user.language if user else 'en'
     meeting = get_meeting(meeting_id)
-    has_geo = bool(meeting and meeting[6] and meeting[7])
+    has_geo = bool(meeting and meeting.latitude and meeting.longitude)
     if has_geo:
-        bot.send_location(call.message.chat.id, meeting[6], meeting[7])
+        bot.send_location(call.message.chat.id, meeting.latitude, meeting.longitude)
         bot.send_message(
             call.message.chat.id,
             get_text(lang, 'live_map'),
@@ -910,21 +999,19 @@ def admin_geo_view_callback(call):
             reply_markup=admin_geo_view_keyboard(meeting_id, lang, False)
         )
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('admin_geo_edit_'))
-def admin_geo_edit_callback(call):
+@callbacks.route('admin_geo_edit_<int:meeting_id>')
+def admin_geo_edit_callback(call, meeting_id):
     user_id = call.from_user.id
     user = get_user(user_id)
-    lang = user[1] if user else 'en'
-    meeting_id = int(call.data.split('_')[3])
+    lang = user.language if user else 'en'
     user_states[user_id] = {'state': 'adding_geo', 'meeting_id': meeting_id}
     bot.send_message(call.message.chat.id, get_text(lang, 'enter_geo_admin'), reply_markup=telebot.types.ReplyKeyboardRemove())
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('admin_geo_clear_'))
-def admin_geo_clear_callback(call):
+@callbacks.route('admin_geo_clear_<int:meeting_id>')
+def admin_geo_clear_callback(call, meeting_id):
     user_id = call.from_user.id
     user = get_user(user_id)
-    lang = user[1] if user else 'en'
-    meeting_id = int(call.data.split('_')[3])
+    lang = user.language if user else 'en'
     clear_geo(meeting_id)
     bot.edit_message_text(
         get_text(lang, 'geo_cleared'),
@@ -933,21 +1020,20 @@ def admin_geo_clear_callback(call):
         reply_markup=admin_geo_view_keyboard(meeting_id, lang, False)
     )
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('admin_agenda_') and not call.data.startswith('admin_agenda_add_') and not call.data.startswith('admin_agenda_clear_') and not call.data.startswith('admin_agenda_item_'))
-def admin_agenda_view_callback(call):
+@callbacks.route('admin_agenda_<int:meeting_id>')
+def admin_agenda_view_callback(call, meeting_id):
     user_id = call.from_user.id
     user = get_user(user_id)
-    lang = user[1] if user else 'en'
-    meeting_id = int(call.data.split('_')[2])
+    lang = user.language if user else 'en'
     items = get_agenda(meeting_id)
     text = f"📋 {get_text(lang, 'agenda')}\n\n"
     has_items = bool(items)
     if has_items:
         for item in items:
-            title = item[2] or ''
-            start = item[3] or ''
-            end = item[4] or ''
-            desc = item[5] or ''
+            title = item.title or ''
+            start = item.start_time or ''
+            end = item.end_time or ''
+            desc = item.description or ''
             line = f"🕐 {start}–{end} • {title}".strip()
             text += line + (f"\n{desc}\n" if desc else "\n")
     else:
@@ -959,21 +1045,19 @@ def admin_agenda_view_callback(call):
         reply_markup=admin_agenda_items_list_keyboard(meeting_id, items, lang)
     )
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('admin_agenda_add_'))
-def admin_agenda_add_callback(call):
+@callbacks.route('admin_agenda_add_<int:meeting_id>')
+def admin_agenda_add_callback(call, meeting_id):
     user_id = call.from_user.id
     user = get_user(user_id)
-    lang = user[1] if user else 'en'
-    meeting_id = int(call.data.split('_')[3])
+    lang = user.language if user else 'en'
     user_states[user_id] = {'state': 'adding_agenda', 'meeting_id': meeting_id, 'step': 'title'}
     bot.send_message(call.message.chat.id, get_text(lang, 'agenda_title'), reply_markup=telebot.types.ReplyKeyboardRemove())
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('admin_agenda_clear_'))
-def admin_agenda_clear_callback(call):
+@callbacks.route('admin_agenda_clear_<int:meeting_id>')
+def admin_agenda_clear_callback(call, meeting_id):
     user_id = call.from_user.id
     user = get_user(user_id)
-    lang = user[1] if user else 'en'
-    meeting_id = int(call.data.split('_')[3])
+    lang = user.language if user else 'en'
     clear_agenda(meeting_id)
     bot.edit_message_text(
         get_text(lang, 'agenda_cleared'),
@@ -982,14 +1066,11 @@ def admin_agenda_clear_callback(call):
         reply_markup=admin_agenda_items_list_keyboard(meeting_id, [], lang)
     )
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('admin_agenda_item_delete_'))
-def admin_agenda_item_delete_callback(call):
+@callbacks.route('admin_agenda_item_delete_<int:agenda_id>_<int:meeting_id>')
+def admin_agenda_item_delete_callback(call, agenda_id, meeting_id):
     user_id = call.from_user.id
     user = get_user(user_id)
-    lang = user[1] if user else 'en'
-    parts = call.data.split('_')
-    agenda_id = int(parts[4])
-    meeting_id = int(parts[5])
+    lang = user.language if user else 'en'
     bot.edit_message_text(
         get_text(lang, 'delete_agenda_confirm'),
         call.message.chat.id,
@@ -997,23 +1078,21 @@ def admin_agenda_item_delete_callback(call):
         reply_markup=admin_agenda_item_delete_confirm_keyboard(agenda_id, meeting_id, lang)
     )
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('admin_agenda_item_delete_confirm_'))
-def admin_agenda_item_delete_confirm_callback(call):
+@callbacks.route('admin_agenda_item_delete_confirm_<int:agenda_id>_<int:meeting_id>')
+def admin_agenda_item_delete_confirm_callback(call, agenda_id, meeting_id):
     user_id = call.from_user.id
     user = get_user(user_id)
-    lang = user[1] if user else 'en'
-    parts = call.data.split('_')
-    agenda_id = int(parts[5])
-    meeting_id = int(parts[6])
+    lang = user.language if user else 'en'
     delete_agenda_item(agenda_id)
+    agenda_alerts.refresh(agenda_id)
     items = get_agenda(meeting_id)
     text = f"📋 {get_text(lang, 'agenda')}\n\n{get_text(lang, 'agenda_item_deleted')}\n\n"
     if items:
         for item in items:
-            title = item[2] or ''
-            start = item[3] or ''
-            end = item[4] or ''
-            desc = item[5] or ''
+            title = item.title or ''
+            start = item.start_time or ''
+            end = item.end_time or ''
+            desc = item.description or ''
             line = f"🕐 {start}–{end} • {title}".strip()
             text += line + (f"\n{desc}\n" if desc else "\n")
     else:
@@ -1025,14 +1104,11 @@ def admin_agenda_item_delete_confirm_callback(call):
         reply_markup=admin_agenda_items_list_keyboard(meeting_id, items, lang)
     )
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('admin_agenda_item_edit_') and not call.data.startswith('admin_agenda_item_edit_title_') and not call.data.startswith('admin_agenda_item_edit_start_') and not call.data.startswith('admin_agenda_item_edit_end_') and not call.data.startswith('admin_agenda_item_edit_desc_'))
-def admin_agenda_item_edit_menu_callback(call):
+@callbacks.route('admin_agenda_item_edit_<int:agenda_id>_<int:meeting_id>')
+def admin_agenda_item_edit_menu_callback(call, agenda_id, meeting_id):
     user_id = call.from_user.id
     user = get_user(user_id)
-    lang = user[1] if user else 'en'
-    parts = call.data.split('_')
-    agenda_id = int(parts[4])
-    meeting_id = int(parts[5])
+    lang = user.language if user else 'en'
     bot.edit_message_text(
         get_text(lang, 'edit_agenda'),
         call.message.chat.id,
@@ -1040,78 +1116,64 @@ def admin_agenda_item_edit_menu_callback(call):
         reply_markup=admin_agenda_item_edit_keyboard(agenda_id, meeting_id, lang)
     )
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('admin_agenda_item_edit_title_'))
-def admin_agenda_item_edit_title_callback(call):
+@callbacks.route('admin_agenda_item_edit_title_<int:agenda_id>_<int:meeting_id>')
+def admin_agenda_item_edit_title_callback(call, agenda_id, meeting_id):
     user_id = call.from_user.id
     user = get_user(user_id)
-    lang = user[1] if user else 'en'
-    parts = call.data.split('_')
-    agenda_id = int(parts[5])
-    meeting_id = int(parts[6])
+    lang = user.language if user else 'en'
     user_states[user_id] = {'state': 'editing_agenda_item', 'agenda_id': agenda_id, 'meeting_id': meeting_id, 'field': 'title'}
     bot.edit_message_text(get_text(lang, 'edit_agenda_title'), call.message.chat.id, call.message.message_id)
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('admin_agenda_item_people_'))
-def admin_agenda_item_people_callback(call):
+@callbacks.route('admin_agenda_item_people_<int:agenda_id>_<int:meeting_id>')
+@callbacks.route('admin_agenda_item_people_next_<int:agenda_id>_<int:meeting_id>_<int:after>')
+@callbacks.route('admin_agenda_item_people_prev_<int:agenda_id>_<int:meeting_id>_<int:before>')
+def admin_agenda_item_people_callback(call, agenda_id, meeting_id, after=None, before=None):
     user_id = call.from_user.id
     user = get_user(user_id)
-    lang = user[1] if user else 'en'
-    parts = call.data.split('_')
-    agenda_id = int(parts[4])
-    meeting_id = int(parts[5])
-    rows = get_agenda_alert_users(agenda_id)
+    lang = user.language if user else 'en'
+    rows, has_prev, has_next = get_agenda_alert_users_page(agenda_id, PEOPLE_PAGE_SIZE, after, before)
     text = f"👥 {get_text(lang, 'people')}\n\n"
     if rows:
         for p in rows:
-            name = p[1] if p[1] else 'No name'
-            phone = p[2] if p[2] else 'N/A'
-            company = p[3] if p[3] else 'N/A'
+            name = p.name if p.name else 'No name'
+            phone = p.phone if p.phone else 'N/A'
+            company = p.company if p.company else 'N/A'
             text += f"👤 {name}\n📞 {phone}\n🏢 {company}\n\n"
     else:
         text += get_text(lang, 'no_alert_subscribers')
-    bot.edit_message_text(text, call.message.chat.id, call.message.message_id, reply_markup=admin_agenda_people_back_keyboard(meeting_id, lang))
+    first, last = (rows[0].user_id, rows[-1].user_id) if rows else (None, None)
+    markup = admin_agenda_people_back_keyboard(meeting_id, lang, agenda_id, first, last, has_prev, has_next)
+    bot.edit_message_text(text, call.message.chat.id, call.message.message_id, reply_markup=markup)
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('admin_agenda_item_edit_start_'))
-def admin_agenda_item_edit_start_callback(call):
+@callbacks.route('admin_agenda_item_edit_start_<int:agenda_id>_<int:meeting_id>')
+def admin_agenda_item_edit_start_callback(call, agenda_id, meeting_id):
     user_id = call.from_user.id
     user = get_user(user_id)
-    lang = user[1] if user else 'en'
-    parts = call.data.split('_')
-    agenda_id = int(parts[5])
-    meeting_id = int(parts[6])
+    lang = user.language if user else 'en'
     user_states[user_id] = {'state': 'editing_agenda_item', 'agenda_id': agenda_id, 'meeting_id': meeting_id, 'field': 'start_time'}
     bot.edit_message_text(get_text(lang, 'edit_agenda_start'), call.message.chat.id, call.message.message_id)
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('admin_agenda_item_edit_end_'))
-def admin_agenda_item_edit_end_callback(call):
+@callbacks.route('admin_agenda_item_edit_end_<int:agenda_id>_<int:meeting_id>')
+def admin_agenda_item_edit_end_callback(call, agenda_id, meeting_id):
     user_id = call.from_user.id
     user = get_user(user_id)
-    lang = user[1] if user else 'en'
-    parts = call.data.split('_')
-    agenda_id = int(parts[5])
-    meeting_id = int(parts[6])
+    lang = user.language if user else 'en'
     user_states[user_id] = {'state': 'editing_agenda_item', 'agenda_id': agenda_id, 'meeting_id': meeting_id, 'field': 'end_time'}
     bot.edit_message_text(get_text(lang, 'edit_agenda_end'), call.message.chat.id, call.message.message_id)
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('admin_agenda_item_edit_desc_'))
-def admin_agenda_item_edit_desc_callback(call):
+@callbacks.route('admin_agenda_item_edit_desc_<int:agenda_id>_<int:meeting_id>')
+def admin_agenda_item_edit_desc_callback(call, agenda_id, meeting_id):
     user_id = call.from_user.id
     user = get_user(user_id)
-    lang = user[1] if user else 'en'
-    parts = call.data.split('_')
-    agenda_id = int(parts[5])
-    meeting_id = int(parts[6])
+    lang = user.language if user else 'en'
     user_states[user_id] = {'state': 'editing_agenda_item', 'agenda_id': agenda_id, 'meeting_id': meeting_id, 'field': 'description'}
     bot.edit_message_text(get_text(lang, 'edit_agenda_desc'), call.message.chat.id, call.message.message_id)
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('admin_agenda_item_') and not call.data.startswith('admin_agenda_item_edit_') and not call.data.startswith('admin_agenda_item_delete_'))
-def admin_agenda_item_select_callback(call):
+@callbacks.route('admin_agenda_item_<int:agenda_id>_<int:meeting_id>')
+def admin_agenda_item_select_callback(call, agenda_id, meeting_id):
     user_id = call.from_user.id
     user = get_user(user_id)
-    lang = user[1] if user else 'en'
-    parts = call.data.split('_')
-    agenda_id = int(parts[3])
-    meeting_id = int(parts[4])
+    lang = user.language if user else 'en'
     bot.edit_message_text(
         get_text(lang, 'edit_agenda'),
         call.message.chat.id,
@@ -1119,11 +1181,11 @@ def admin_agenda_item_select_callback(call):
         reply_markup=admin_agenda_item_actions_keyboard(agenda_id, meeting_id, lang)
     )
 
-@bot.callback_query_handler(func=lambda call: call.data == 'agenda_skip_desc')
+@callbacks.route('agenda_skip_desc')
 def agenda_skip_desc_callback(call):
     user_id = call.from_user.id
     user = get_user(user_id)
-    lang = user[1] if user else 'en'
+    lang = user.language if user else 'en'
     state = user_states.get(user_id) or {}
     if state.get('state') == 'adding_agenda' and state.get('step') == 'description':
         meeting_id = state.get('meeting_id')
@@ -1134,22 +1196,21 @@ def agenda_skip_desc_callback(call):
         text_block = f"📋 {get_text(lang, 'agenda')}\n\n"
         if items:
             for item in items:
-                title = item[2] or ''
-                start = item[3] or ''
-                end = item[4] or ''
-                desc = item[5] or ''
+                title = item.title or ''
+                start = item.start_time or ''
+                end = item.end_time or ''
+                desc = item.description or ''
                 line = f"🕐 {start}–{end} • {title}".strip()
                 text_block += line + (f"\n{desc}\n" if desc else "\n")
         else:
             text_block += get_text(lang, 'no_agenda_admin')
         bot.send_message(call.message.chat.id, text_block, reply_markup=admin_agenda_items_list_keyboard(meeting_id, items, lang))
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('admin_delete_'))
-def admin_delete_callback(call):
+@callbacks.route('admin_delete_<int:meeting_id>')
+def admin_delete_callback(call, meeting_id):
     user_id = call.from_user.id
     user = get_user(user_id)
-    lang = user[1] if user else 'en'
-    meeting_id = int(call.data.split('_')[2])
+    lang = user.language if user else 'en'
     bot.edit_message_text(
         get_text(lang, 'confirm_delete_meeting'),
         call.message.chat.id,
@@ -1157,13 +1218,12 @@ def admin_delete_callback(call):
         reply_markup=admin_delete_confirm_keyboard(meeting_id, lang)
     )
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('confirm_delete_'))
-def admin_confirm_delete_callback(call):
+@callbacks.route('confirm_delete_<int:meeting_id>')
+def admin_confirm_delete_callback(call, meeting_id):
     user_id = call.from_user.id
     user = get_user(user_id)
-    lang = user[1] if user else 'en'
-    meeting_id = int(call.data.split('_')[2])
-    delete_meeting(meeting_id)
+    lang = user.language if user else 'en'
+    remove_meeting(meeting_id)
     meetings = get_all_meetings()
     if meetings:
         bot.edit_message_text(
@@ -1179,36 +1239,34 @@ def admin_confirm_delete_callback(call):
             call.message.message_id,
             reply_markup=admin_meetings_keyboard([], lang)
         )
-@bot.callback_query_handler(func=lambda call: call.data.startswith('add_wifi_'))
-def add_wifi_callback(call):
+@callbacks.route('add_wifi_<int:meeting_id>')
+def add_wifi_callback(call, meeting_id):
     """Добавить WiFi"""
     user_id = call.from_user.id
     user = get_user(user_id)
-    lang = user[1] if user else 'en'
+    lang = user.language if user else 'en'
     
-    meeting_id = int(call.data.split('_')[2])
     user_states[user_id] = {'state': 'adding_wifi', 'meeting_id': meeting_id, 'step': 'name'}
     
     bot.send_message(call.message.chat.id, get_text(lang, 'enter_wifi_name'), reply_markup=telebot.types.ReplyKeyboardRemove())
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('add_photos_'))
-def add_photos_callback(call):
+@callbacks.route('add_photos_<int:meeting_id>')
+def add_photos_callback(call, meeting_id):
     """Добавить фотографии"""
     user_id = call.from_user.id
     user = get_user(user_id)
-    lang = user[1] if user else 'en'
+    lang = user.language if user else 'en'
     
-    meeting_id = int(call.data.split('_')[2])
     user_states[user_id] = {'state': 'adding_photos', 'meeting_id': meeting_id}
     
     text = f"{get_text(lang, 'send_photos')}"
     bot.send_message(call.message.chat.id, text, reply_markup=telebot.types.ReplyKeyboardRemove())
 
-@bot.callback_query_handler(func=lambda call: call.data == 'admin_questions')
+@callbacks.route('admin_questions')
 def admin_questions_callback(call):
     user_id = call.from_user.id
     user = get_user(user_id)
-    lang = user[1] if user else 'en'
+    lang = user.language if user else 'en'
     meetings = get_all_meetings()
     bot.edit_message_text(
         get_text(lang, 'view_questions'),
@@ -1217,11 +1275,11 @@ def admin_questions_callback(call):
         reply_markup=admin_questions_meetings_keyboard(meetings, lang)
     )
 
-@bot.callback_query_handler(func=lambda call: call.data == 'admin_notify')
+@callbacks.route('admin_notify')
 def admin_notify_callback(call):
     user_id = call.from_user.id
     user = get_user(user_id)
-    lang = user[1] if user else 'en'
+    lang = user.language if user else 'en'
     meetings = get_all_meetings()
     bot.edit_message_text(
         get_text(lang, 'send_notification'),
@@ -1230,36 +1288,33 @@ def admin_notify_callback(call):
         reply_markup=admin_notifications_keyboard(meetings, lang)
     )
 
-@bot.callback_query_handler(func=lambda call: call.data == 'notify_all')
+@callbacks.route('notify_all')
 def notify_all_callback(call):
     user_id = call.from_user.id
     user = get_user(user_id)
-    lang = user[1] if user else 'en'
+    lang = user.language if user else 'en'
     user_states[user_id] = {'state': 'sending_notification', 'scope': 'all'}
     bot.send_message(call.message.chat.id, get_text(lang, 'enter_notification'))
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('notify_meeting_'))
-def notify_meeting_callback(call):
+@callbacks.route('notify_meeting_<int:meeting_id>')
+def notify_meeting_callback(call, meeting_id):
     user_id = call.from_user.id
     user = get_user(user_id)
-    lang = user[1] if user else 'en'
-    meeting_id = int(call.data.split('_')[2])
+    lang = user.language if user else 'en'
     user_states[user_id] = {'state': 'sending_notification', 'scope': 'meeting', 'meeting_id': meeting_id}
     bot.send_message(call.message.chat.id, get_text(lang, 'enter_notification'))
 
-@bot.callback_query_handler(func=lambda call: call.data == 'notify_none')
+@callbacks.route('notify_none')
 def notify_none_callback(call):
-    try:
-        bot.answer_callback_query(call.id, get_text(get_user(call.from_user.id)[1] if get_user(call.from_user.id) else 'en', 'no_meetings'))
-    except:
-        pass
+    user = get_user(call.from_user.id)
+    outbound.later(bot.answer_callback_query, call.id, get_text(user.language if user else 'en', 'no_meetings'))
 
-@bot.callback_query_handler(func=lambda call: call.data == 'back_admin')
+@callbacks.route('back_admin')
 def back_to_admin(call):
     """Возврат в админ панель"""
     user_id = call.from_user.id
     user = get_user(user_id)
-    lang = user[1] if user else 'en'
+    lang = user.language if user else 'en'
     
     bot.edit_message_text(
         get_text(lang, 'admin_welcome'),
@@ -1268,11 +1323,11 @@ def back_to_admin(call):
         reply_markup=admin_keyboard(lang)
     )
 
-@bot.callback_query_handler(func=lambda call: call.data == 'admin_exit')
+@callbacks.route('admin_exit')
 def admin_exit_callback(call):
     user_id = call.from_user.id
     user = get_user(user_id)
-    lang = user[1] if user else 'en'
+    lang = user.language if user else 'en'
     unset_admin(user_id)
     bot.edit_message_text(
         get_text(lang, 'main_menu'),
@@ -1285,46 +1340,46 @@ def admin_exit_callback(call):
         reply_markup=main_menu_keyboard(lang)
     )
 
-@bot.callback_query_handler(func=lambda call: call.data == 'edit_profile')
+@callbacks.route('edit_profile')
 def edit_profile_callback(call):
     user_id = call.from_user.id
     user = get_user(user_id)
-    lang = user[1] if user else 'en'
+    lang = user.language if user else 'en'
     bot.send_message(call.message.chat.id, get_text(lang, 'edit_profile'), reply_markup=profile_edit_options_keyboard(lang))
     try:
         bot.send_message(call.message.chat.id, " ", reply_markup=telebot.types.ReplyKeyboardRemove())
-    except:
-        pass
+    except Exception as e:
+        print(f"Ошибка скрытия клавиатуры: {e}")
 
-@bot.callback_query_handler(func=lambda call: call.data == 'edit_name')
+@callbacks.route('edit_name')
 def edit_name_button_callback(call):
     user_id = call.from_user.id
     user = get_user(user_id)
-    lang = user[1] if user else 'en'
+    lang = user.language if user else 'en'
     user_states[user_id] = {'state': 'editing_profile', 'step': 'name'}
     bot.send_message(call.message.chat.id, get_text(lang, 'enter_name'), reply_markup=telebot.types.ReplyKeyboardRemove())
 
-@bot.callback_query_handler(func=lambda call: call.data == 'edit_phone')
+@callbacks.route('edit_phone')
 def edit_phone_button_callback(call):
     user_id = call.from_user.id
     user = get_user(user_id)
-    lang = user[1] if user else 'en'
+    lang = user.language if user else 'en'
     user_states[user_id] = {'state': 'editing_profile', 'step': 'phone'}
     bot.send_message(call.message.chat.id, get_text(lang, 'enter_phone'), reply_markup=contact_request_keyboard(lang))
 
-@bot.callback_query_handler(func=lambda call: call.data == 'edit_company')
+@callbacks.route('edit_company')
 def edit_company_button_callback(call):
     user_id = call.from_user.id
     user = get_user(user_id)
-    lang = user[1] if user else 'en'
+    lang = user.language if user else 'en'
     user_states[user_id] = {'state': 'editing_profile', 'step': 'company'}
     bot.send_message(call.message.chat.id, get_text(lang, 'enter_company'), reply_markup=telebot.types.ReplyKeyboardRemove())
 
-@bot.callback_query_handler(func=lambda call: call.data == 'fill_profile')
+@callbacks.route('fill_profile')
 def fill_profile_button_callback(call):
     user_id = call.from_user.id
     user = get_user(user_id)
-    lang = user[1] if user else 'en'
+    lang = user.language if user else 'en'
     user_states[user_id] = {'state': 'filling_profile', 'step': 'name'}
     bot.send_message(call.message.chat.id, get_text(lang, 'enter_name'), reply_markup=telebot.types.ReplyKeyboardRemove())
 
@@ -1334,11 +1389,11 @@ def handle_text(message):
     """Обработка текстовых сообщений"""
     user_id = message.from_user.id
     user = get_user(user_id)
-    lang = user[1] if user else 'en'
+    lang = user.language if user else 'en'
     text = message.text
     
-    if user_id in user_states:
-        state = user_states[user_id]
+    state = user_states.get(user_id)
+    if state:
         
         if state.get('state') == 'asking_question':
             meeting_id = state.get('meeting_id')
@@ -1351,20 +1406,17 @@ def handle_text(message):
             step = state.get('step')
             
             if step == 'name':
-                state['name'] = text
-                state['step'] = 'location'
+                user_states.update(user_id, name=text, step='location')
                 bot.send_message(message.chat.id, get_text(lang, 'enter_location'), reply_markup=telebot.types.ReplyKeyboardRemove())
                 return
             
             elif step == 'location':
-                state['location'] = text
-                state['step'] = 'date'
+                user_states.update(user_id, location=text, step='date')
                 bot.send_message(message.chat.id, get_text(lang, 'enter_date'), reply_markup=telebot.types.ReplyKeyboardRemove())
                 return
             
             elif step == 'date':
-                state['date'] = text
-                meeting_id = create_meeting(state['name'], state['location'], state['date'])
+                meeting_id = create_meeting(state['name'], state['location'], text)
                 del user_states[user_id]
                 bot.send_message(message.chat.id, get_text(lang, 'meeting_created'), reply_markup=main_menu_keyboard(lang))
                 return
@@ -1374,8 +1426,7 @@ def handle_text(message):
             meeting_id = state.get('meeting_id')
             
             if step == 'name':
-                state['wifi_name'] = text
-                state['step'] = 'password'
+                user_states.update(user_id, wifi_name=text, step='password')
                 bot.send_message(message.chat.id, get_text(lang, 'enter_wifi_password'), reply_markup=telebot.types.ReplyKeyboardRemove())
                 return
             
@@ -1393,8 +1444,7 @@ def handle_text(message):
             step = state.get('step')
             meeting_id = state.get('meeting_id')
             if step == 'name':
-                state['wifi_name'] = text
-                state['step'] = 'password'
+                user_states.update(user_id, wifi_name=text, step='password')
                 bot.send_message(message.chat.id, get_text(lang, 'enter_wifi_password'), reply_markup=telebot.types.ReplyKeyboardRemove())
                 return
             elif step == 'password':
@@ -1407,8 +1457,8 @@ def handle_text(message):
             meeting_id = state.get('meeting_id')
             field = state.get('field')
             meeting = get_meeting(meeting_id)
-            current_name = meeting[4] if meeting else None
-            current_password = meeting[5] if meeting else None
+            current_name = meeting.wifi_network if meeting else None
+            current_password = meeting.wifi_password if meeting else None
             if field == 'name':
                 update_wifi(meeting_id, text, current_password or '')
             elif field == 'password':
@@ -1426,6 +1476,7 @@ def handle_text(message):
                 update_agenda_title(agenda_id, text)
             elif field == 'start_time':
                 update_agenda_start_time(agenda_id, text)
+                agenda_alerts.refresh(agenda_id)
             elif field == 'end_time':
                 update_agenda_end_time(agenda_id, text)
             elif field == 'description':
@@ -1435,10 +1486,10 @@ def handle_text(message):
             text_block = f"📋 {get_text(lang, 'agenda')}\n\n"
             if items:
                 for item in items:
-                    title = item[2] or ''
-                    start = item[3] or ''
-                    end = item[4] or ''
-                    desc = item[5] or ''
+                    title = item.title or ''
+                    start = item.start_time or ''
+                    end = item.end_time or ''
+                    desc = item.description or ''
                     line = f"🕐 {start}–{end} • {title}".strip()
                     text_block += line + (f"\n{desc}\n" if desc else "\n")
             else:
@@ -1450,18 +1501,15 @@ def handle_text(message):
             step = state.get('step')
             meeting_id = state.get('meeting_id')
             if step == 'title':
-                state['title'] = text
-                state['step'] = 'start_time'
+                user_states.update(user_id, title=text, step='start_time')
                 bot.send_message(message.chat.id, get_text(lang, 'agenda_start_time'), reply_markup=telebot.types.ReplyKeyboardRemove())
                 return
             elif step == 'start_time':
-                state['start_time'] = text
-                state['step'] = 'end_time'
+                user_states.update(user_id, start_time=text, step='end_time')
                 bot.send_message(message.chat.id, get_text(lang, 'agenda_end_time'), reply_markup=telebot.types.ReplyKeyboardRemove())
                 return
             elif step == 'end_time':
-                state['end_time'] = text
-                state['step'] = 'description'
+                user_states.update(user_id, end_time=text, step='description')
                 bot.send_message(message.chat.id, get_text(lang, 'agenda_description_optional'), reply_markup=skip_keyboard(lang))
                 return
             elif step == 'description':
@@ -1473,10 +1521,10 @@ def handle_text(message):
                 text_block = f"📋 {get_text(lang, 'agenda')}\n\n"
                 if items:
                     for item in items:
-                        title = item[2] or ''
-                        start = item[3] or ''
-                        end = item[4] or ''
-                        desc = item[5] or ''
+                        title = item.title or ''
+                        start = item.start_time or ''
+                        end = item.end_time or ''
+                        desc = item.description or ''
                         line = f"🕐 {start}–{end} • {title}".strip()
                         text_block += line + (f"\n{desc}\n" if desc else "\n")
                 else:
@@ -1491,17 +1539,9 @@ def handle_text(message):
                 meeting_id = state.get('meeting_id')
                 recipients = get_participant_user_ids(meeting_id)
             else:
-                users = get_all_users()
-                recipients = [u[0] for u in users]
-            sent_count = 0
-            for uid in recipients:
-                try:
-                    bot.send_message(uid, f"📢 {text}")
-                    sent_count += 1
-                except Exception as e:
-                    print(f"Ошибка отправки пользователю {uid}: {e}")
+                recipients = get_all_users()
             del user_states[user_id]
-            bot.send_message(message.chat.id, f"{get_text(lang, 'notification_sent')}\n✅ Отправлено: {sent_count}")
+            broadcasts.submit('notification', [(uid, f"📢 {text}", None) for uid in recipients], admin_chat_id=message.chat.id, lang=lang)
             return
 
         if state.get('state') == 'meeting_feedback':
@@ -1518,12 +1558,13 @@ def handle_text(message):
                 update_meeting_name(meeting_id, text)
             elif field == 'date':
                 update_meeting_date(meeting_id, text)
+                agenda_alerts.refresh_meeting(meeting_id)
             elif field == 'location':
                 update_meeting_location(meeting_id, text)
             del user_states[user_id]
             bot.send_message(message.chat.id, get_text(lang, 'meeting_updated'))
             meeting = get_meeting(meeting_id)
-            header = f"⚙️ {meeting[1]}\n\n{get_text(lang, 'choose_action')}"
+            header = f"⚙️ {meeting.name}\n\n{get_text(lang, 'choose_action')}"
             bot.send_message(message.chat.id, header, reply_markup=admin_meeting_manage_keyboard(meeting_id, lang))
             return
 
@@ -1531,14 +1572,12 @@ def handle_text(message):
             step = state.get('step')
             
             if step == 'name':
-                state['name'] = text
-                state['step'] = 'phone'
+                user_states.update(user_id, name=text, step='phone')
                 bot.send_message(message.chat.id, get_text(lang, 'enter_phone'), reply_markup=contact_request_keyboard(lang))
                 return
             
             elif step == 'phone':
-                state['phone'] = text
-                state['step'] = 'company'
+                user_states.update(user_id, phone=text, step='company')
                 bot.send_message(message.chat.id, get_text(lang, 'enter_company'), reply_markup=telebot.types.ReplyKeyboardRemove())
                 return
             
@@ -1551,9 +1590,9 @@ def handle_text(message):
         if state.get('state') == 'editing_profile':
             step = state.get('step')
             current = get_user(user_id)
-            current_name = current[2] if current else None
-            current_phone = current[3] if current else None
-            current_company = current[4] if current else None
+            current_name = current.name if current else None
+            current_phone = current.phone if current else None
+            current_company = current.company if current else None
             if step == 'name':
                 update_user_profile(user_id, text, current_phone, current_company)
                 del user_states[user_id]
@@ -1582,13 +1621,13 @@ def handle_text(message):
             bot.send_message(message.chat.id, get_text(lang, 'no_meetings'))
     
     elif text == get_text(lang, 'my_profile'):
-        if user and user[2]: 
+        if user and user.name: 
             profile_text = get_text(
                 lang,
                 'your_profile',
-                name=user[2] or 'N/A',
-                phone=user[3] or 'N/A',
-                company=user[4] or 'N/A'
+                name=user.name or 'N/A',
+                phone=user.phone or 'N/A',
+                company=user.company or 'N/A'
             )
             bot.send_message(message.chat.id, profile_text, reply_markup=profile_actions_keyboard(lang))
         else:
@@ -1610,10 +1649,10 @@ def handle_location(message):
     """Обработка геолокации"""
     user_id = message.from_user.id
     user = get_user(user_id)
-    lang = user[1] if user else 'en'
+    lang = user.language if user else 'en'
     
-    if user_id in user_states:
-        state = user_states[user_id]
+    state = user_states.get(user_id)
+    if state:
         
         if state.get('state') == 'adding_geo':
             meeting_id = state.get('meeting_id')
@@ -1625,20 +1664,19 @@ def handle_location(message):
 def handle_contact(message):
     user_id = message.from_user.id
     user = get_user(user_id)
-    lang = user[1] if user else 'en'
-    if user_id in user_states:
-        state = user_states[user_id]
+    lang = user.language if user else 'en'
+    state = user_states.get(user_id)
+    if state:
         if state.get('state') in ['filling_profile', 'editing_profile'] and state.get('step') == 'phone':
             phone = message.contact.phone_number
             if state.get('state') == 'filling_profile':
-                state['phone'] = phone
-                state['step'] = 'company'
+                user_states.update(user_id, phone=phone, step='company')
                 bot.send_message(message.chat.id, get_text(lang, 'enter_company'), reply_markup=telebot.types.ReplyKeyboardRemove())
                 return
             else:
                 current = get_user(user_id)
-                current_name = current[2] if current else None
-                current_company = current[4] if current else None
+                current_name = current.name if current else None
+                current_company = current.company if current else None
                 update_user_profile(user_id, current_name, phone, current_company)
                 del user_states[user_id]
                 bot.send_message(message.chat.id, get_text(lang, 'profile_saved'), reply_markup=main_menu_keyboard(lang))
@@ -1649,10 +1687,10 @@ def handle_photo(message):
     """Обработка фотографий"""
     user_id = message.from_user.id
     user = get_user(user_id)
-    lang = user[1] if user else 'en'
+    lang = user.language if user else 'en'
     
-    if user_id in user_states:
-        state = user_states[user_id]
+    state = user_states.get(user_id)
+    if state:
         
         if state.get('state') == 'adding_photos':
             meeting_id = state.get('meeting_id')
@@ -1665,9 +1703,9 @@ def handle_photo(message):
 def handle_document(message):
     user_id = message.from_user.id
     user = get_user(user_id)
-    lang = user[1] if user else 'en'
-    if user_id in user_states:
-        state = user_states[user_id]
+    lang = user.language if user else 'en'
+    state = user_states.get(user_id)
+    if state:
         if state.get('state') in ['adding_pdf', 'editing_pdf']:
             doc = message.document
             if doc and (doc.mime_type == 'application/pdf' or (doc.file_name or '').lower().endswith('.pdf')):
@@ -1683,30 +1721,28 @@ def handle_document(message):
 def handle_non_photo_in_photo_mode(message):
     user_id = message.from_user.id
     user = get_user(user_id)
-    lang = user[1] if user else 'en'
-    if user_id in user_states:
-        state = user_states[user_id]
+    lang = user.language if user else 'en'
+    state = user_states.get(user_id)
+    if state:
         if state.get('state') == 'adding_photos':
             bot.send_message(message.chat.id, f"{get_text(lang, 'invalid_photo_format')}\n{get_text(lang, 'send_photos')}")
             return
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('add_geo_'))
-def add_geo_callback(call):
+@callbacks.route('add_geo_<int:meeting_id>')
+def add_geo_callback(call, meeting_id):
     user_id = call.from_user.id
     user = get_user(user_id)
-    lang = user[1] if user else 'en'
-    meeting_id = int(call.data.split('_')[2])
+    lang = user.language if user else 'en'
     user_states[user_id] = {'state': 'adding_geo', 'meeting_id': meeting_id}
     bot.send_message(call.message.chat.id, get_text(lang, 'enter_geo_admin'))
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('delete_meeting_'))
-def delete_meeting_callback(call):
+@callbacks.route('delete_meeting_<int:meeting_id>')
+def delete_meeting_callback(call, meeting_id):
     user_id = call.from_user.id
     user = get_user(user_id)
-    lang = user[1] if user else 'en'
-    meeting_id = int(call.data.split('_')[2])
-    delete_meeting(meeting_id)
+    lang = user.language if user else 'en'
+    remove_meeting(meeting_id)
     meetings = get_all_meetings()
     if meetings:
         bot.edit_message_text(
@@ -1724,7 +1760,43 @@ def delete_meeting_callback(call):
         )
 
 
+_COMMANDS = {command for handler in bot.message_handlers for command in handler['filters'].get('commands') or ()}
+
+def metrics_route(update):
+    """Метка маршрута для метрик: префикс шаблона callback, команда или тип сообщения"""
+    if isinstance(update, telebot.types.CallbackQuery):
+        match = callbacks.resolve(update.data)
+        if match is None:
+            return 'callback:unknown'
+        route = match[0]
+        return route.prefix + '_' if route.params else route.prefix
+    text = update.text or ''
+    if text.startswith('/'):
+        command = text.split()[0][1:].split('@')[0]
+        if command in _COMMANDS:
+            return '/' + command
+    return 'message:' + update.content_type
+
+if METRICS_ENABLED:
+    bot.setup_middleware(MetricsMiddleware(handler_metrics, metrics_route))
+
+
 if __name__ == '__main__':
     init_database()
-    init_feedback_table()
-    bot.infinity_polling()
+    broadcasts.start()
+    media_warmer.start()
+    agenda_alerts.load()
+    deadlines.refresh()
+    meeting_purger.load()
+    media_collector.load()
+    scheduler.start()
+    if METRICS_ENABLED and METRICS_PORT:
+        MetricsServer((METRICS_LISTEN, METRICS_PORT), handler_metrics).start()
+    if BOT_RUNTIME == 'asyncio':
+        from async_runtime import run_async
+        run_async(bot, BOT_MODE, outbound)
+    elif BOT_MODE == 'webhook':
+        from webhook import run_webhook
+        run_webhook(bot)
+    else:
+        bot.infinity_polling()
@@ -0,0 +1,163 @@
+import queue
+import threading
+import time
+
+from config import (
+    BROADCAST_WORKERS,
+    BROADCAST_GLOBAL_RATE,
+    BROADCAST_PER_CHAT_RATE,
+    BROADCAST_PROGRESS_INTERVAL,
+)
+from database import (
+    create_broadcast,
+    set_broadcast_progress_message,
+    get_unfinished_broadcasts,
+    finish_broadcast,
+    get_broadcast_counts,
+    claim_outbox,
+    next_outbox_due,
+    mark_outbox_sent,
+    mark_outbox_failed,
+    reset_inflight_outbox,
+)
+from texts import get_text
+
+
+class TokenBucket:
+    """`rate` tokens per second with bursts up to `capacity`."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity or rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """Take a token and return how many seconds to wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def acquire(self):
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    def idle_since(self):
+        return self._updated
+
+
+class BroadcastEngine:
+    """Persistent outbox drained by a worker pool under global and per-chat rate limits.
+
+    Messages are written to the ``outbox`` table before anything is sent, so a
+    restart resumes where the previous process stopped. Flood waits, retries and
+    outages are left to `outbound` (workers are its background threads, so a
+    send waits as long as it takes); a message it gives up on is marked failed.
+    Admin broadcasts get a progress message that is edited while sending and a
+    final delivered/failed summary.
+    """
+
+    def __init__(self, bot, outbound, workers=BROADCAST_WORKERS, global_rate=BROADCAST_GLOBAL_RATE,
+                 per_chat_rate=BROADCAST_PER_CHAT_RATE, progress_interval=BROADCAST_PROGRESS_INTERVAL):
+        self.bot = bot
+        self.outbound = outbound
+        self.workers = workers
+        self.per_chat_rate = per_chat_rate
+        self.progress_interval = progress_interval
+        self._global = TokenBucket(global_rate)
+        self._chats = {}
+        self._chats_lock = threading.Lock()
+        self._queue = queue.Queue(maxsize=workers * 4)
+        self._wake = threading.Event()
+        self._progress_text = {}
+        self._started = False
+
+    def start(self):
+        if self._started:
+            return
+        self._started = True
+        reset_inflight_outbox()
+        threading.Thread(target=self._dispatch_loop, name='broadcast-dispatch', daemon=True).start()
+        for i in range(self.workers):
+            threading.Thread(target=self._worker_loop, name=f'broadcast-worker-{i}', daemon=True).start()
+        threading.Thread(target=self._progress_loop, name='broadcast-progress', daemon=True).start()
+
+    def submit(self, kind, messages, admin_chat_id=None, lang='en'):
+        """Queue messages [(chat_id, text, reply_markup_json), ...] and return the broadcast id."""
+        messages = list(messages)
+        broadcast_id = create_broadcast(kind, messages, admin_chat_id, lang)
+        if admin_chat_id is not None:
+            try:
+                msg = self.bot.send_message(admin_chat_id, get_text(lang, 'broadcast_progress', sent=0, failed=0, total=len(messages)))
+                set_broadcast_progress_message(broadcast_id, msg.message_id)
+            except Exception as e:
+                print(f"Ошибка отправки прогресса рассылки {broadcast_id}: {e}")
+        self._wake.set()
+        return broadcast_id
+
+    def _dispatch_loop(self):
+        while True:
+            rows = claim_outbox(self._queue.maxsize, time.time())
+            if rows:
+                for row in rows:
+                    self._queue.put(row)
+                continue
+            due = next_outbox_due()
+            timeout = 5.0 if due is None else min(5.0, max(0.05, due - time.time()))
+            self._wake.wait(timeout)
+            self._wake.clear()
+
+    def _chat_bucket(self, chat_id):
+        with self._chats_lock:
+            bucket = self._chats.get(chat_id)
+            if bucket is None:
+                if len(self._chats) > 10000:
+                    cutoff = time.monotonic() - 60
+                    self._chats = {k: b for k, b in self._chats.items() if b.idle_since() > cutoff}
+                bucket = self._chats[chat_id] = TokenBucket(self.per_chat_rate, 1)
+            return bucket
+
+    def _worker_loop(self):
+        self.outbound.background()
+        while True:
+            outbox_id, broadcast_id, chat_id, text, reply_markup, attempts = self._queue.get()
+            self._chat_bucket(chat_id).acquire()
+            self._global.acquire()
+            try:
+                self.bot.send_message(chat_id, text, reply_markup=reply_markup)
+            except Exception as e:
+                mark_outbox_failed(outbox_id, str(e))
+            else:
+                mark_outbox_sent(outbox_id)
+
+    def _progress_loop(self):
+        while True:
+            time.sleep(self.progress_interval)
+            for broadcast_id, kind, admin_chat_id, message_id, lang in get_unfinished_broadcasts():
+                try:
+                    self._report(broadcast_id, admin_chat_id, message_id, lang or 'en')
+                except Exception as e:
+                    print(f"Ошибка отчёта по рассылке {broadcast_id}: {e}")
+
+    def _report(self, broadcast_id, admin_chat_id, message_id, lang):
+        counts = get_broadcast_counts(broadcast_id)
+        done = counts['pending'] == 0 and counts['sending'] == 0
+        if done:
+            finish_broadcast(broadcast_id)
+            self._progress_text.pop(broadcast_id, None)
+        if admin_chat_id is None:
+            return
+        if done:
+            self.bot.send_message(admin_chat_id, get_text(lang, 'broadcast_done', sent=counts['sent'], failed=counts['failed']))
+            return
+        text = get_text(lang, 'broadcast_progress', sent=counts['sent'], failed=counts['failed'], total=counts['total'])
+        if message_id and self._progress_text.get(broadcast_id) != text:
+            self._progress_text[broadcast_id] = text
+            self.bot.edit_message_text(text, admin_chat_id, message_id)
@@ -2,3 +2,87 @@ BOT_TOKEN = "8568797215:AAErQo4EwvOFAGuxqzIsVBn5Ll8zzFu4qBU"
 ADMIN_PASSWORD = "admin123"
 DATABASE_NAME = "event_bot.db"
 ADMIN_CONTACT_EMAIL = "admin@example.com"
+
+DB_BUSY_TIMEOUT_MS = 5000
+DB_STATEMENT_CACHE_SIZE = 128
+
+USER_CACHE_SIZE = 100000
+USER_CACHE_TTL = 300
+
+BROADCAST_WORKERS = 8
+BROADCAST_GLOBAL_RATE = 25
+BROADCAST_PER_CHAT_RATE = 1
+BROADCAST_PROGRESS_INTERVAL = 3
+
+PHOTOS_PAGE_SIZE = 30
+PEOPLE_PAGE_SIZE = 20
+QUESTIONS_PAGE_SIZE = 10
+FEEDBACK_PAGE_SIZE = 10
+SEARCH_RESULTS_LIMIT = 8
+MEDIA_WORKERS = 4
+
+# Private chat/channel where the bot pre-uploads web admin media; None disables it
+MEDIA_WARMUP_CHAT_ID = None
+MEDIA_WARMUP_INTERVAL = 60
+
+# Web admin uploads nothing refers to are deleted every MEDIA_GC_INTERVAL seconds
+# once untouched for MEDIA_GC_GRACE seconds; None disables it
+MEDIA_GC_INTERVAL = 3600
+MEDIA_GC_GRACE = 86400
+
+# 'polling' or 'webhook'
+BOT_MODE = 'polling'
+# Set to the fake_telegram.py address to run without Telegram; None = api.telegram.org
+TELEGRAM_API_URL = None
+
+# Public HTTPS base URL Telegram posts to (TLS ends at the proxy / load balancer)
+WEBHOOK_URL = 'https://example.com'
+WEBHOOK_LISTEN = '0.0.0.0'
+WEBHOOK_PORT = 8080
+WEBHOOK_PATH = '/telegram/webhook'
+WEBHOOK_SECRET = None
+WEBHOOK_MAX_CONNECTIONS = 40
+WEBHOOK_WORKERS = 16
+WEBHOOK_QUEUE_SIZE = 1024
+
+# 'threads' (telebot's blocking calls) or 'asyncio' (async_runtime.py: handlers on ASYNC_WORKERS threads,
+# their Telegram calls made by an aiohttp event loop without blocking them); works with either BOT_MODE
+BOT_RUNTIME = 'threads'
+ASYNC_WORKERS = 8
+ASYNC_MAX_CONNECTIONS = 100
+ASYNC_MAX_PENDING = 10000
+
+# Every Bot API request: up to OUTBOUND_MAX_ATTEMPTS tries with jittered backoff (seconds) on network errors/5xx,
+# 429 retry_after honoured per chat (globally once OUTBOUND_GLOBAL_FLOOD_CHATS chats are flooded within a second);
+# blocking callers wait at most OUTBOUND_MAX_WAIT. The breaker opens after OUTBOUND_BREAKER_FAILURES errors in a row
+# for OUTBOUND_BREAKER_RESET seconds. Fire-and-forget calls run on OUTBOUND_WORKERS threads.
+OUTBOUND_MAX_ATTEMPTS = 4
+OUTBOUND_BACKOFF_BASE = 0.5
+OUTBOUND_BACKOFF_MAX = 10
+OUTBOUND_MAX_WAIT = 15
+OUTBOUND_GLOBAL_FLOOD_CHATS = 3
+OUTBOUND_BREAKER_FAILURES = 5
+OUTBOUND_BREAKER_RESET = 30
+OUTBOUND_WORKERS = 4
+OUTBOUND_QUEUE_SIZE = 1000
+
+# Per-route handler metrics: Prometheus text on http://METRICS_LISTEN:METRICS_PORT/metrics (None = no endpoint)
+# and the admin /stats view over the last METRICS_WINDOW seconds
+METRICS_ENABLED = True
+METRICS_LISTEN = '127.0.0.1'
+METRICS_PORT = 9108
+METRICS_WINDOW = 15 * 60
+METRICS_SAMPLES_PER_ROUTE = 2000
+
+# Conversation state of unfinished flows: 'memory' (per process) or 'sqlite' (shared, survives restarts)
+STATE_BACKEND = 'memory'
+STATE_TTL = 6 * 3600
+STATE_MAX_USERS = 100000
+
+# Agenda alerts go out this many seconds before an item's start_time
+AGENDA_ALERT_LEAD = 10 * 60
+
+# 'archive' hides a deleted meeting at once and purges its rows MEETING_PURGE_BATCH at a time;
+# 'cascade' deletes everything in one transaction
+MEETING_DELETE_MODE = 'archive'
+MEETING_PURGE_BATCH = 500
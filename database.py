@@ -1,528 +1,674 @@
+import json
+import re
 import sqlite3
-from config import DATABASE_NAME
-
-def init_database():
-    conn = sqlite3.connect(DATABASE_NAME)
-    c = conn.cursor()
-
-    c.execute('''CREATE TABLE IF NOT EXISTS users (
-                    user_id INTEGER PRIMARY KEY,
-                    language TEXT DEFAULT 'en',
-                    name TEXT,
-                    phone TEXT,
-                    company TEXT,
-                    is_admin INTEGER DEFAULT 0
-                )''')
-
-    c.execute('''CREATE TABLE IF NOT EXISTS meetings (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT NOT NULL,
-                    location TEXT,
-                    date TEXT,
-                    wifi_network TEXT,
-                    wifi_password TEXT,
-                    latitude REAL,
-                    longitude REAL
-                )''')
-
-    c.execute('''CREATE TABLE IF NOT EXISTS participants (
-                    meeting_id INTEGER,
-                    user_id INTEGER,
-                    PRIMARY KEY (meeting_id, user_id),
-                    FOREIGN KEY (meeting_id) REFERENCES meetings(id)
-                )''')
-
-    c.execute('''CREATE TABLE IF NOT EXISTS agenda (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    meeting_id INTEGER,
-                    title TEXT,
-                    start_time TEXT,
-                    end_time TEXT,
-                    description TEXT,
-                    FOREIGN KEY (meeting_id) REFERENCES meetings(id)
-                )''')
-
-    c.execute('''CREATE TABLE IF NOT EXISTS agenda_alerts (
-                    agenda_id INTEGER,
-                    user_id INTEGER,
-                    PRIMARY KEY (agenda_id, user_id),
-                    FOREIGN KEY (agenda_id) REFERENCES agenda(id)
-                )''')
-
-    c.execute('''CREATE TABLE IF NOT EXISTS questions (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    meeting_id INTEGER,
-                    user_id INTEGER,
-                    question TEXT,
-                    date TEXT DEFAULT (datetime('now')),
-                    FOREIGN KEY (meeting_id) REFERENCES meetings(id)
-                )''')
-
-    c.execute('''CREATE TABLE IF NOT EXISTS photos (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    meeting_id INTEGER,
-                    file_id TEXT,
-                    FOREIGN KEY (meeting_id) REFERENCES meetings(id)
-                )''')
-    try:
-        c.execute("PRAGMA table_info(photos)")
-        columns = [row[1] for row in c.fetchall()]
-        if 'file_id' not in columns:
-            c.execute("ALTER TABLE photos ADD COLUMN file_id TEXT")
-    except Exception:
-        pass
-
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from config import DATABASE_NAME, DB_BUSY_TIMEOUT_MS, DB_STATEMENT_CACHE_SIZE, USER_CACHE_SIZE, USER_CACHE_TTL, METRICS_ENABLED
+from metrics import count_calls, count_statement
+from schema import migrate
+from rows import User, Meeting, Participant, AgendaItem, AlertAgendaItem, Question, Feedback, FeedbackStats, columns
+
+_local = threading.local()
+_MISSING = object()
+
+class LRUCache:
+    """Thread-safe LRU cache with a per-entry TTL and hit/miss counters."""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[1] > now:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                del self._data[key]
+            self.misses += 1
+            return _MISSING
+
+    def generation(self):
+        return self._generation
+
+    def set(self, key, value, generation=None):
+        with self._lock:
+            # an invalidation happened while the value was being loaded
+            if generation is not None and generation != self._generation:
+                return
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key):
+        with self._lock:
+            self._generation += 1
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+            }
+
+_user_cache = LRUCache(USER_CACHE_SIZE, USER_CACHE_TTL)
+
+def _open_connection(path):
+    # isolation_level=None: transactions are opened explicitly by transaction()
+    conn = sqlite3.connect(
+        path,
+        timeout=DB_BUSY_TIMEOUT_MS / 1000,
+        isolation_level=None,
+        cached_statements=DB_STATEMENT_CACHE_SIZE,
+    )
+    conn.execute(f"PRAGMA busy_timeout = {int(DB_BUSY_TIMEOUT_MS)}")
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    if METRICS_ENABLED:
+        conn.set_trace_callback(count_statement)
+    return conn
+
+def get_connection():
+    """Long-lived connection owned by the calling thread."""
+    conn = getattr(_local, 'conn', None)
+    if conn is None or _local.path != DATABASE_NAME:
+        if conn is not None:
+            conn.close()
+        conn = _open_connection(DATABASE_NAME)
+        _local.conn = conn
+        _local.path = DATABASE_NAME
+    return conn
+
+def close_connection():
+    conn = getattr(_local, 'conn', None)
+    if conn is not None:
+        conn.close()
+        _local.conn = None
+
+@contextmanager
+def transaction():
+    """BEGIN IMMEDIATE ... COMMIT on the thread connection; nested use joins the outer transaction."""
+    conn = get_connection()
+    if conn.in_transaction:
+        yield conn
+        return
+    conn.execute("BEGIN IMMEDIATE")
     try:
-        c.execute("PRAGMA table_info(meetings)")
-        columns = [row[1] for row in c.fetchall()]
-        if 'latitude' not in columns:
-            c.execute("ALTER TABLE meetings ADD COLUMN latitude REAL")
-        if 'longitude' not in columns:
-            c.execute("ALTER TABLE meetings ADD COLUMN longitude REAL")
-        if 'deadline' not in columns:
-            c.execute("ALTER TABLE meetings ADD COLUMN deadline TEXT")
-        if 'ended' not in columns:
-            c.execute("ALTER TABLE meetings ADD COLUMN ended INTEGER DEFAULT 0")
-        if 'pdf_file_id' not in columns:
-            c.execute("ALTER TABLE meetings ADD COLUMN pdf_file_id TEXT")
-    except Exception:
-        pass
-
-    try:
-        c.execute("PRAGMA table_info(agenda)")
-        agenda_columns = [row[1] for row in c.fetchall()]
-        if 'title' not in agenda_columns:
-            c.execute("ALTER TABLE agenda ADD COLUMN title TEXT")
-        if 'start_time' not in agenda_columns:
-            c.execute("ALTER TABLE agenda ADD COLUMN start_time TEXT")
-        if 'end_time' not in agenda_columns:
-            c.execute("ALTER TABLE agenda ADD COLUMN end_time TEXT")
-    except Exception:
-        pass
+        yield conn
+    except BaseException:
+        conn.rollback()
+        raise
+    else:
+        conn.commit()
+
+def _fetchone(sql, params=(), row=None):
+    result = get_connection().execute(sql, params).fetchone()
+    return row._make(result) if row is not None and result is not None else result
+
+def _fetchall(sql, params=(), row=None):
+    """Rows as plain tuples, or as `row` (a rows.py namedtuple) when given."""
+    rows = get_connection().execute(sql, params).fetchall()
+    return list(map(row._make, rows)) if row is not None else rows
+
+_USER_COLUMNS = columns(User)
+_MEETING_COLUMNS = columns(Meeting)
+_VIEW_MEETING_COLUMNS = columns(Meeting, 'm')
+
+def _execute(sql, params=()):
+    with transaction() as conn:
+        return conn.execute(sql, params)
 
-    try:
-        c.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_agenda_alerts ON agenda_alerts(agenda_id, user_id)")
-    except Exception:
-        pass
-
-    try:
-        c.execute("DELETE FROM participants WHERE rowid NOT IN (SELECT MIN(rowid) FROM participants GROUP BY meeting_id, user_id)")
-        c.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_participants_unique ON participants(meeting_id, user_id)")
-    except Exception:
-        pass
-
-    conn.commit()
-    conn.close()
+def init_database():
+    """Bring the schema up to date; a current database costs one schema_version read."""
+    applied = migrate(get_connection())
+    if applied:
+        print(f"Применены миграции базы данных: {applied}")
 
 def get_user(user_id):
-    conn = sqlite3.connect(DATABASE_NAME)
-    c = conn.cursor()
-    c.execute("SELECT * FROM users WHERE user_id = ?", (user_id,))
-    user = c.fetchone()
-    conn.close()
+    user = _user_cache.get(user_id)
+    if user is not _MISSING:
+        return user
+    generation = _user_cache.generation()
+    user = _fetchone(f"SELECT {_USER_COLUMNS} FROM users WHERE user_id = ?", (user_id,), User)
+    if user is not None:
+        _user_cache.set(user_id, user, generation)
     return user
 
+def user_cache_stats():
+    return _user_cache.stats()
+
 def create_user(user_id, language='en'):
-    conn = sqlite3.connect(DATABASE_NAME)
-    c = conn.cursor()
-    c.execute("INSERT OR IGNORE INTO users (user_id, language) VALUES (?, ?)", (user_id, language))
-    conn.commit()
-    conn.close()
+    _execute("INSERT OR IGNORE INTO users (user_id, language) VALUES (?, ?)", (user_id, language))
 
 def update_user_language(user_id, language):
-    conn = sqlite3.connect(DATABASE_NAME)
-    c = conn.cursor()
-    c.execute("UPDATE users SET language = ? WHERE user_id = ?", (language, user_id))
-    conn.commit()
-    conn.close()
+    _execute("UPDATE users SET language = ? WHERE user_id = ?", (language, user_id))
+    _user_cache.invalidate(user_id)
 
 def update_user_profile(user_id, name, phone, company):
-    conn = sqlite3.connect(DATABASE_NAME)
-    c = conn.cursor()
-    c.execute("UPDATE users SET name = ?, phone = ?, company = ? WHERE user_id = ?", (name, phone, company, user_id))
-    conn.commit()
-    conn.close()
+    _execute("UPDATE users SET name = ?, phone = ?, company = ? WHERE user_id = ?", (name, phone, company, user_id))
+    _user_cache.invalidate(user_id)
 
 def set_admin(user_id):
-    conn = sqlite3.connect(DATABASE_NAME)
-    c = conn.cursor()
-    c.execute("UPDATE users SET is_admin = 1 WHERE user_id = ?", (user_id,))
-    conn.commit()
-    conn.close()
+    _execute("UPDATE users SET is_admin = 1 WHERE user_id = ?", (user_id,))
+    _user_cache.invalidate(user_id)
 
 def is_admin(user_id):
     user = get_user(user_id)
-    return user[5] == 1 if user else False
+    return user.is_admin == 1 if user else False
 
 def unset_admin(user_id):
-    conn = sqlite3.connect(DATABASE_NAME)
-    c = conn.cursor()
-    c.execute("UPDATE users SET is_admin = 0 WHERE user_id = ?", (user_id,))
-    conn.commit()
-    conn.close()
+    _execute("UPDATE users SET is_admin = 0 WHERE user_id = ?", (user_id,))
+    _user_cache.invalidate(user_id)
 
 def create_meeting(name, location, date, lat=None, lon=None):
-    conn = sqlite3.connect(DATABASE_NAME)
-    c = conn.cursor()
-    c.execute("""INSERT INTO meetings (name, location, date, latitude, longitude) 
-                 VALUES (?, ?, ?, ?, ?)""", (name, location, date, lat, lon))
-    meeting_id = c.lastrowid
-    conn.commit()
-    conn.close()
-    return meeting_id
+    c = _execute("""INSERT INTO meetings (name, location, date, latitude, longitude)
+                    VALUES (?, ?, ?, ?, ?)""", (name, location, date, lat, lon))
+    return c.lastrowid
 
 def update_location_geo(meeting_id, lat, lon):
-    conn = sqlite3.connect(DATABASE_NAME)
-    c = conn.cursor()
-    c.execute("UPDATE meetings SET latitude = ?, longitude = ? WHERE id = ?", (lat, lon, meeting_id))
-    conn.commit()
-    conn.close()
+    _execute("UPDATE meetings SET latitude = ?, longitude = ? WHERE id = ?", (lat, lon, meeting_id))
+
+# deadlines are compared as text, so only 'YYYY-MM-DD HH:MM' values take part
+DEADLINE_GLOB = '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9] [0-9][0-9]:[0-9][0-9]'
 
 def set_meeting_deadline(meeting_id, deadline_iso):
-    conn = sqlite3.connect(DATABASE_NAME)
-    c = conn.cursor()
-    c.execute("UPDATE meetings SET deadline = ?, ended = 0 WHERE id = ?", (deadline_iso, meeting_id))
-    conn.commit()
-    conn.close()
+    _execute("UPDATE meetings SET deadline = ?, ended = 0 WHERE id = ?", (deadline_iso, meeting_id))
 
 def mark_meeting_ended(meeting_id):
-    conn = sqlite3.connect(DATABASE_NAME)
-    c = conn.cursor()
-    c.execute("UPDATE meetings SET ended = 1 WHERE id = ?", (meeting_id,))
-    conn.commit()
-    conn.close()
+    """Finish a running meeting; False if it had already ended."""
+    cur = _execute("UPDATE meetings SET ended = 1 WHERE id = ? AND (ended = 0 OR ended IS NULL)", (meeting_id,))
+    return cur.rowcount == 1
+
+def clear_meeting_deadline(meeting_id):
+    _execute("UPDATE meetings SET deadline = NULL WHERE id = ?", (meeting_id,))
+
+def get_next_deadline():
+    row = _fetchone("SELECT MIN(deadline) FROM meetings WHERE ended = 0 AND deadline GLOB ?", (DEADLINE_GLOB,))
+    return row[0] if row else None
 
 def get_due_meetings(now_iso):
-    conn = sqlite3.connect(DATABASE_NAME)
-    c = conn.cursor()
-    c.execute("SELECT * FROM meetings WHERE ended = 0 AND deadline IS NOT NULL AND deadline <= ?", (now_iso,))
-    rows = c.fetchall()
-    conn.close()
-    return rows
+    return _fetchall(f"SELECT {_MEETING_COLUMNS} FROM meetings WHERE ended = 0 AND deadline GLOB ? AND deadline <= ?",
+                     (DEADLINE_GLOB, now_iso), Meeting)
+
+def get_malformed_deadlines():
+    """(meeting id, deadline) of running meetings whose deadline is not in the layout compared as text."""
+    return _fetchall("SELECT id, deadline FROM meetings WHERE ended = 0 AND deadline IS NOT NULL AND deadline NOT GLOB ?",
+                     (DEADLINE_GLOB,))
+
+def normalize_meeting_deadline(meeting_id, old_deadline, deadline_iso):
+    _execute("UPDATE meetings SET deadline = ? WHERE id = ? AND deadline = ?", (deadline_iso, meeting_id, old_deadline))
 
 def get_all_meetings():
-    conn = sqlite3.connect(DATABASE_NAME)
-    c = conn.cursor()
     try:
-        c.execute("SELECT * FROM meetings WHERE ended = 0 OR ended IS NULL ORDER BY id DESC")
+        return _fetchall(f"SELECT {_MEETING_COLUMNS} FROM meetings WHERE ended = 0 OR ended IS NULL ORDER BY id DESC", row=Meeting)
     except Exception:
-        c.execute("SELECT * FROM meetings ORDER BY id DESC")
-    meetings = c.fetchall()
-    conn.close()
-    return meetings
+        return _fetchall(f"SELECT {_MEETING_COLUMNS} FROM meetings ORDER BY id DESC", row=Meeting)
 
 def get_finished_meetings():
-    conn = sqlite3.connect(DATABASE_NAME)
-    c = conn.cursor()
     try:
-        c.execute("SELECT * FROM meetings WHERE ended = 1 ORDER BY id DESC")
+        return _fetchall(f"SELECT {_MEETING_COLUMNS} FROM meetings WHERE ended = 1 ORDER BY id DESC", row=Meeting)
     except Exception:
-        c.execute("SELECT * FROM meetings ORDER BY id DESC")
-    meetings = c.fetchall()
-    conn.close()
-    return meetings
+        return _fetchall(f"SELECT {_MEETING_COLUMNS} FROM meetings ORDER BY id DESC", row=Meeting)
 
 def get_meeting(meeting_id):
-    conn = sqlite3.connect(DATABASE_NAME)
-    c = conn.cursor()
-    c.execute("SELECT * FROM meetings WHERE id = ?", (meeting_id,))
-    meeting = c.fetchone()
-    conn.close()
-    return meeting
+    return _fetchone(f"SELECT {_MEETING_COLUMNS} FROM meetings WHERE id = ?", (meeting_id,), Meeting)
 
 def update_wifi(meeting_id, network, password):
-    conn = sqlite3.connect(DATABASE_NAME)
-    c = conn.cursor()
-    c.execute("UPDATE meetings SET wifi_network = ?, wifi_password = ? WHERE id = ?", (network, password, meeting_id))
-    conn.commit()
-    conn.close()
+    _execute("UPDATE meetings SET wifi_network = ?, wifi_password = ? WHERE id = ?", (network, password, meeting_id))
 
 def update_pdf(meeting_id, file_id):
-    conn = sqlite3.connect(DATABASE_NAME)
-    c = conn.cursor()
-    c.execute("UPDATE meetings SET pdf_file_id = ? WHERE id = ?", (file_id, meeting_id))
-    conn.commit()
-    conn.close()
+    _execute("UPDATE meetings SET pdf_file_id = ? WHERE id = ?", (file_id, meeting_id))
 
 def get_meeting_pdf(meeting_id):
-    conn = sqlite3.connect(DATABASE_NAME)
-    c = conn.cursor()
-    c.execute("SELECT pdf_file_id FROM meetings WHERE id = ?", (meeting_id,))
-    row = c.fetchone()
-    conn.close()
+    row = _fetchone("SELECT pdf_file_id FROM meetings WHERE id = ?", (meeting_id,))
     return row[0] if row else None
 
 def update_meeting_name(meeting_id, name):
-    conn = sqlite3.connect(DATABASE_NAME)
-    c = conn.cursor()
-    c.execute("UPDATE meetings SET name = ? WHERE id = ?", (name, meeting_id))
-    conn.commit()
-    conn.close()
+    _execute("UPDATE meetings SET name = ? WHERE id = ?", (name, meeting_id))
 
 def update_meeting_date(meeting_id, date):
-    conn = sqlite3.connect(DATABASE_NAME)
-    c = conn.cursor()
-    c.execute("UPDATE meetings SET date = ? WHERE id = ?", (date, meeting_id))
-    conn.commit()
-    conn.close()
+    _execute("UPDATE meetings SET date = ? WHERE id = ?", (date, meeting_id))
 
 def update_meeting_location(meeting_id, location):
-    conn = sqlite3.connect(DATABASE_NAME)
-    c = conn.cursor()
-    c.execute("UPDATE meetings SET location = ? WHERE id = ?", (location, meeting_id))
-    conn.commit()
-    conn.close()
+    _execute("UPDATE meetings SET location = ? WHERE id = ?", (location, meeting_id))
 
 def add_participant(meeting_id, user_id):
-    conn = sqlite3.connect(DATABASE_NAME)
-    c = conn.cursor()
-    c.execute("INSERT OR IGNORE INTO participants (meeting_id, user_id) VALUES (?, ?)", (meeting_id, user_id))
-    conn.commit()
-    conn.close()
-
-def get_participants(meeting_id):
-    conn = sqlite3.connect(DATABASE_NAME)
-    c = conn.cursor()
-    c.execute("""SELECT u.user_id, u.name, u.phone, u.company 
-                 FROM participants p 
-                 JOIN users u ON p.user_id = u.user_id 
-                 WHERE p.meeting_id = ?""", (meeting_id,))
-    participants = c.fetchall()
-    conn.close()
-    return participants
+    _execute("INSERT OR IGNORE INTO participants (meeting_id, user_id) VALUES (?, ?)", (meeting_id, user_id))
+
+def get_meeting_view(meeting_id, user_id, participants_limit=5):
+    """Everything the meeting card needs in one query, or None if the meeting does not exist."""
+    row = _fetchone(f"""
+        SELECT (SELECT COUNT(*) FROM participants p JOIN users u ON p.user_id = u.user_id
+                WHERE p.meeting_id = m.id),
+               (SELECT json_group_array(json_array(u.user_id, u.name, u.phone, u.company))
+                FROM (SELECT p.user_id FROM participants p JOIN users u ON p.user_id = u.user_id
+                      WHERE p.meeting_id = m.id ORDER BY p.user_id LIMIT ?) x
+                JOIN users u ON x.user_id = u.user_id),
+               (SELECT file_id FROM photos WHERE meeting_id = m.id ORDER BY id LIMIT 1),
+               EXISTS (SELECT 1 FROM participants WHERE meeting_id = m.id AND user_id = ?),
+               EXISTS (SELECT 1 FROM agenda WHERE meeting_id = m.id),
+               {_VIEW_MEETING_COLUMNS}
+        FROM meetings m
+        WHERE m.id = ?""", (participants_limit, user_id, meeting_id))
+    if row is None:
+        return None
+    count, preview, first_photo, is_following, has_agenda = row[:5]
+    meeting = Meeting._make(row[5:])
+    return {
+        'meeting': meeting,
+        'participant_count': count,
+        'participants': [Participant._make(p) for p in json.loads(preview or '[]')],
+        'first_photo': first_photo,
+        'is_following': bool(is_following),
+        'has_agenda': bool(has_agenda),
+        'has_people': count > 0,
+        'has_photos': first_photo is not None,
+        'has_wifi': bool(meeting.wifi_network or meeting.wifi_password),
+        'has_map': meeting.latitude is not None and meeting.longitude is not None,
+    }
+
+def _keyset_page(rows, limit, backward, has_cursor):
+    """Trim a LIMIT limit + 1 keyset query to (rows, has_prev, has_next) in display order."""
+    more = len(rows) > limit
+    rows = rows[:limit]
+    if backward:
+        rows.reverse()
+        return rows, more, True
+    return rows, has_cursor, more
+
+def get_participants_page(meeting_id, limit, after=None, before=None):
+    """Participants ordered by user_id, `limit` per page after/before a user_id: (rows, has_prev, has_next)."""
+    if before is not None:
+        rows = _fetchall("""SELECT u.user_id, u.name, u.phone, u.company
+                            FROM participants p
+                            JOIN users u ON p.user_id = u.user_id
+                            WHERE p.meeting_id = ? AND p.user_id < ?
+                            ORDER BY p.user_id DESC LIMIT ?""", (meeting_id, before, limit + 1), Participant)
+        return _keyset_page(rows, limit, True, True)
+    rows = _fetchall("""SELECT u.user_id, u.name, u.phone, u.company
+                        FROM participants p
+                        JOIN users u ON p.user_id = u.user_id
+                        WHERE p.meeting_id = ? AND p.user_id > ?
+                        ORDER BY p.user_id LIMIT ?""", (meeting_id, after or 0, limit + 1), Participant)
+    return _keyset_page(rows, limit, False, after is not None)
 
 def is_participant(meeting_id, user_id):
-    conn = sqlite3.connect(DATABASE_NAME)
-    c = conn.cursor()
-    c.execute("SELECT 1 FROM participants WHERE meeting_id = ? AND user_id = ?", (meeting_id, user_id))
-    res = c.fetchone()
-    conn.close()
+    res = _fetchone("SELECT 1 FROM participants WHERE meeting_id = ? AND user_id = ?", (meeting_id, user_id))
     return res is not None
 
 def remove_participant(meeting_id, user_id):
-    conn = sqlite3.connect(DATABASE_NAME)
-    c = conn.cursor()
-    c.execute("DELETE FROM participants WHERE meeting_id = ? AND user_id = ?", (meeting_id, user_id))
-    conn.commit()
-    conn.close()
+    _execute("DELETE FROM participants WHERE meeting_id = ? AND user_id = ?", (meeting_id, user_id))
 
 def get_participant_user_ids(meeting_id):
-    conn = sqlite3.connect(DATABASE_NAME)
-    c = conn.cursor()
-    c.execute("SELECT user_id FROM participants WHERE meeting_id = ?", (meeting_id,))
-    ids = c.fetchall()
-    conn.close()
+    ids = _fetchall("SELECT user_id FROM participants WHERE meeting_id = ?", (meeting_id,))
     return [row[0] for row in ids]
 
 def add_photo(meeting_id, file_id):
-    conn = sqlite3.connect(DATABASE_NAME)
-    c = conn.cursor()
-    c.execute("INSERT INTO photos (meeting_id, file_id) VALUES (?, ?)", (meeting_id, file_id))
-    conn.commit()
-    conn.close()
-
-def get_photos(meeting_id):
-    conn = sqlite3.connect(DATABASE_NAME)
-    c = conn.cursor()
-    c.execute("SELECT file_id FROM photos WHERE meeting_id = ?", (meeting_id,))
-    photos = c.fetchall()
-    conn.close()
+    _execute("INSERT INTO photos (meeting_id, file_id) VALUES (?, ?)", (meeting_id, file_id))
+
+def get_photos(meeting_id, offset=0, limit=-1):
+    photos = _fetchall("SELECT file_id FROM photos WHERE meeting_id = ? ORDER BY id LIMIT ? OFFSET ?", (meeting_id, limit, offset))
     return [p[0] for p in photos]
 
+def count_photos(meeting_id):
+    return _fetchone("SELECT COUNT(*) FROM photos WHERE meeting_id = ?", (meeting_id,))[0]
+
 def add_question(meeting_id, user_id, question):
-    conn = sqlite3.connect(DATABASE_NAME)
-    c = conn.cursor()
-    c.execute("INSERT INTO questions (meeting_id, user_id, question) VALUES (?, ?, ?)",
-              (meeting_id, user_id, question))
-    conn.commit()
-    conn.close()
-
-def get_questions(meeting_id):
-    conn = sqlite3.connect(DATABASE_NAME)
-    c = conn.cursor()
-    c.execute("SELECT * FROM questions WHERE meeting_id = ? ORDER BY date DESC", (meeting_id,))
-    questions = c.fetchall()
-    conn.close()
-    return questions
+    _execute("INSERT INTO questions (meeting_id, user_id, question) VALUES (?, ?, ?)",
+             (meeting_id, user_id, question))
+
+def get_questions_page(meeting_id, limit, after=None, before=None):
+    """Questions newest first, `limit` per page after/before a question id: (rows, has_prev, has_next)."""
+    if before is not None:
+        rows = _fetchall("""SELECT id, meeting_id, user_id, question, date FROM questions
+                            WHERE meeting_id = ? AND (date, id) > (SELECT date, id FROM questions WHERE id = ?)
+                            ORDER BY date, id LIMIT ?""", (meeting_id, before, limit + 1), Question)
+        return _keyset_page(rows, limit, True, True)
+    if after is not None:
+        rows = _fetchall("""SELECT id, meeting_id, user_id, question, date FROM questions
+                            WHERE meeting_id = ? AND (date, id) < (SELECT date, id FROM questions WHERE id = ?)
+                            ORDER BY date DESC, id DESC LIMIT ?""", (meeting_id, after, limit + 1), Question)
+    else:
+        rows = _fetchall("""SELECT id, meeting_id, user_id, question, date FROM questions
+                            WHERE meeting_id = ?
+                            ORDER BY date DESC, id DESC LIMIT ?""", (meeting_id, limit + 1), Question)
+    return _keyset_page(rows, limit, False, after is not None)
 
 def get_agenda(meeting_id):
-    conn = sqlite3.connect(DATABASE_NAME)
-    c = conn.cursor()
     try:
-        c.execute("SELECT id, meeting_id, title, start_time, end_time, description FROM agenda WHERE meeting_id = ? ORDER BY start_time, id", (meeting_id,))
+        return _fetchall("SELECT id, meeting_id, title, start_time, end_time, description FROM agenda WHERE meeting_id = ? ORDER BY start_time, id", (meeting_id,), AgendaItem)
     except Exception:
-        c.execute("SELECT id, meeting_id, title, start_time, end_time, description FROM agenda WHERE meeting_id = ? ORDER BY id", (meeting_id,))
-    agenda = c.fetchall()
-    conn.close()
-    return agenda
+        return _fetchall("SELECT id, meeting_id, title, start_time, end_time, description FROM agenda WHERE meeting_id = ? ORDER BY id", (meeting_id,), AgendaItem)
 
 def add_agenda_item(meeting_id, time, description):
-    conn = sqlite3.connect(DATABASE_NAME)
-    c = conn.cursor()
-    try:
-        c.execute("INSERT INTO agenda (meeting_id, time, description) VALUES (?, ?, ?)", (meeting_id, time, description))
-    except Exception:
-        c.execute("INSERT INTO agenda (meeting_id, title, start_time, end_time, description) VALUES (?, ?, ?, ?, ?)", (meeting_id, None, time, None, description))
-    conn.commit()
-    conn.close()
+    with transaction() as c:
+        try:
+            c.execute("INSERT INTO agenda (meeting_id, time, description) VALUES (?, ?, ?)", (meeting_id, time, description))
+        except Exception:
+            c.execute("INSERT INTO agenda (meeting_id, title, start_time, end_time, description) VALUES (?, ?, ?, ?, ?)", (meeting_id, None, time, None, description))
 
 def add_agenda_item_extended(meeting_id, title, start_time, end_time, description=None):
-    conn = sqlite3.connect(DATABASE_NAME)
-    c = conn.cursor()
-    c.execute("INSERT INTO agenda (meeting_id, title, start_time, end_time, description) VALUES (?, ?, ?, ?, ?)", (meeting_id, title, start_time, end_time, description or ''))
-    conn.commit()
-    conn.close()
+    _execute("INSERT INTO agenda (meeting_id, title, start_time, end_time, description) VALUES (?, ?, ?, ?, ?)", (meeting_id, title, start_time, end_time, description or ''))
 
 def update_agenda_title(agenda_id, title):
-    conn = sqlite3.connect(DATABASE_NAME)
-    c = conn.cursor()
-    c.execute("UPDATE agenda SET title = ? WHERE id = ?", (title, agenda_id))
-    conn.commit()
-    conn.close()
+    _execute("UPDATE agenda SET title = ? WHERE id = ?", (title, agenda_id))
 
 def update_agenda_start_time(agenda_id, start_time):
-    conn = sqlite3.connect(DATABASE_NAME)
-    c = conn.cursor()
-    c.execute("UPDATE agenda SET start_time = ? WHERE id = ?", (start_time, agenda_id))
-    conn.commit()
-    conn.close()
+    _execute("UPDATE agenda SET start_time = ? WHERE id = ?", (start_time, agenda_id))
 
 def update_agenda_end_time(agenda_id, end_time):
-    conn = sqlite3.connect(DATABASE_NAME)
-    c = conn.cursor()
-    c.execute("UPDATE agenda SET end_time = ? WHERE id = ?", (end_time, agenda_id))
-    conn.commit()
-    conn.close()
+    _execute("UPDATE agenda SET end_time = ? WHERE id = ?", (end_time, agenda_id))
 
 def update_agenda_description(agenda_id, description):
-    conn = sqlite3.connect(DATABASE_NAME)
-    c = conn.cursor()
-    c.execute("UPDATE agenda SET description = ? WHERE id = ?", (description, agenda_id))
-    conn.commit()
-    conn.close()
+    _execute("UPDATE agenda SET description = ? WHERE id = ?", (description, agenda_id))
 
 def delete_agenda_item(agenda_id):
-    conn = sqlite3.connect(DATABASE_NAME)
-    c = conn.cursor()
-    c.execute("DELETE FROM agenda WHERE id = ?", (agenda_id,))
-    conn.commit()
-    conn.close()
+    _execute("DELETE FROM agenda WHERE id = ?", (agenda_id,))
 
 def add_agenda_alert(agenda_id, user_id):
-    conn = sqlite3.connect(DATABASE_NAME)
-    c = conn.cursor()
-    c.execute("INSERT OR IGNORE INTO agenda_alerts (agenda_id, user_id) VALUES (?, ?)", (agenda_id, user_id))
-    conn.commit()
-    conn.close()
+    _execute("INSERT OR IGNORE INTO agenda_alerts (agenda_id, user_id) VALUES (?, ?)", (agenda_id, user_id))
 
 def remove_agenda_alert(agenda_id, user_id):
-    conn = sqlite3.connect(DATABASE_NAME)
-    c = conn.cursor()
-    c.execute("DELETE FROM agenda_alerts WHERE agenda_id = ? AND user_id = ?", (agenda_id, user_id))
-    conn.commit()
-    conn.close()
+    _execute("DELETE FROM agenda_alerts WHERE agenda_id = ? AND user_id = ?", (agenda_id, user_id))
 
 def is_agenda_alerted(agenda_id, user_id):
-    conn = sqlite3.connect(DATABASE_NAME)
-    c = conn.cursor()
-    c.execute("SELECT 1 FROM agenda_alerts WHERE agenda_id = ? AND user_id = ?", (agenda_id, user_id))
-    res = c.fetchone()
-    conn.close()
+    res = _fetchone("SELECT 1 FROM agenda_alerts WHERE agenda_id = ? AND user_id = ?", (agenda_id, user_id))
     return res is not None
 
-def get_agenda_alert_users(agenda_id):
-    conn = sqlite3.connect(DATABASE_NAME)
-    c = conn.cursor()
-    c.execute("""
+def get_agenda_alert_users_page(agenda_id, limit, after=None, before=None):
+    """Alert subscribers of an agenda item by user_id, paged like get_participants_page."""
+    if before is not None:
+        rows = _fetchall("""
+            SELECT u.user_id, u.name, u.phone, u.company
+            FROM agenda_alerts a
+            JOIN users u ON a.user_id = u.user_id
+            WHERE a.agenda_id = ? AND a.user_id < ?
+            ORDER BY a.user_id DESC LIMIT ?
+        """, (agenda_id, before, limit + 1), Participant)
+        return _keyset_page(rows, limit, True, True)
+    rows = _fetchall("""
         SELECT u.user_id, u.name, u.phone, u.company
         FROM agenda_alerts a
         JOIN users u ON a.user_id = u.user_id
-        WHERE a.agenda_id = ?
-    """, (agenda_id,))
-    rows = c.fetchall()
-    conn.close()
-    return rows
+        WHERE a.agenda_id = ? AND a.user_id > ?
+        ORDER BY a.user_id LIMIT ?
+    """, (agenda_id, after or 0, limit + 1), Participant)
+    return _keyset_page(rows, limit, False, after is not None)
+
+def get_alert_agenda_items(agenda_id=None, meeting_id=None):
+    """AlertAgendaItem rows for agenda items of running meetings that have alert subscribers."""
+    sql = """SELECT a.id, a.meeting_id, a.title, a.start_time, m.date, m.name, a.alerted_for
+             FROM agenda a
+             JOIN meetings m ON m.id = a.meeting_id
+             WHERE (m.ended = 0 OR m.ended IS NULL)
+               AND a.start_time IS NOT NULL
+               AND EXISTS (SELECT 1 FROM agenda_alerts s WHERE s.agenda_id = a.id)"""
+    params = []
+    if agenda_id is not None:
+        sql += " AND a.id = ?"
+        params.append(agenda_id)
+    if meeting_id is not None:
+        sql += " AND a.meeting_id = ?"
+        params.append(meeting_id)
+    return _fetchall(sql, params, AlertAgendaItem)
+
+def claim_agenda_alert(agenda_id, alert_key):
+    """Mark the alert for this start time as sent; False if it already was."""
+    cur = _execute("UPDATE agenda SET alerted_for = ? WHERE id = ? AND alerted_for IS NOT ?", (alert_key, agenda_id, alert_key))
+    return cur.rowcount == 1
+
+def get_agenda_alert_recipients(agenda_id):
+    return _fetchall("""SELECT a.user_id, u.language
+                        FROM agenda_alerts a
+                        LEFT JOIN users u ON a.user_id = u.user_id
+                        WHERE a.agenda_id = ?""", (agenda_id,))
 
 def get_all_users():
-    conn = sqlite3.connect(DATABASE_NAME)
-    c = conn.cursor()
-    c.execute("SELECT user_id FROM users")
-    users = c.fetchall()
-    conn.close()
-    return users
+    return [row[0] for row in _fetchall("SELECT user_id FROM users")]
 
 def delete_meeting(meeting_id):
-    conn = sqlite3.connect(DATABASE_NAME)
-    c = conn.cursor()
-    c.execute("DELETE FROM participants WHERE meeting_id = ?", (meeting_id,))
-    c.execute("DELETE FROM photos WHERE meeting_id = ?", (meeting_id,))
-    c.execute("DELETE FROM questions WHERE meeting_id = ?", (meeting_id,))
-    c.execute("DELETE FROM agenda WHERE meeting_id = ?", (meeting_id,))
-    c.execute("DELETE FROM meetings WHERE id = ?", (meeting_id,))
-    conn.commit()
-    conn.close()
-
-def init_feedback_table():
-    conn = sqlite3.connect(DATABASE_NAME)
-    c = conn.cursor()
-    c.execute('''CREATE TABLE IF NOT EXISTS feedback (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    meeting_id INTEGER,
-                    user_id INTEGER,
-                    rating TEXT,
-                    feedback TEXT,
-                    date TEXT DEFAULT (datetime('now')),
-                    FOREIGN KEY (meeting_id) REFERENCES meetings(id)
-                )''')
-    conn.commit()
-    conn.close()
+    """Delete a meeting and everything hanging off it in one statement (meetings_cascade_delete trigger)."""
+    _execute("DELETE FROM meetings WHERE id = ?", (meeting_id,))
+
+def archive_meeting(meeting_id):
+    """Hide a meeting at once; its rows stay until purge_meeting_batch clears them."""
+    with transaction() as c:
+        c.execute("INSERT OR IGNORE INTO deleted_meetings (id, name, date) SELECT id, name, date FROM meetings WHERE id = ?", (meeting_id,))
+        c.execute("DELETE FROM meetings WHERE id = ?", (meeting_id,))
+
+def get_unpurged_meetings():
+    return [row[0] for row in _fetchall("SELECT id FROM deleted_meetings WHERE purged = 0")]
+
+def purge_meeting_batch(meeting_id, limit):
+    """Delete up to `limit` rows per dependent table of an archived meeting; False once nothing is left."""
+    with transaction() as c:
+        deleted = c.execute("""DELETE FROM agenda_alerts WHERE rowid IN (
+                                   SELECT a.rowid FROM agenda g
+                                   JOIN agenda_alerts a ON a.agenda_id = g.id
+                                   WHERE g.meeting_id = ? LIMIT ?)""", (meeting_id, limit)).rowcount
+        deleted += c.execute("DELETE FROM participants WHERE rowid IN (SELECT rowid FROM participants WHERE meeting_id = ? LIMIT ?)", (meeting_id, limit)).rowcount
+        deleted += c.execute("DELETE FROM photos WHERE id IN (SELECT id FROM photos WHERE meeting_id = ? LIMIT ?)", (meeting_id, limit)).rowcount
+        deleted += c.execute("DELETE FROM questions WHERE id IN (SELECT id FROM questions WHERE meeting_id = ? LIMIT ?)", (meeting_id, limit)).rowcount
+        deleted += c.execute("DELETE FROM feedback WHERE id IN (SELECT id FROM feedback WHERE meeting_id = ? LIMIT ?)", (meeting_id, limit)).rowcount
+        if deleted:
+            return True
+        # alerts are gone, so the agenda cascade trigger has nothing left to do
+        c.execute("DELETE FROM agenda WHERE meeting_id = ?", (meeting_id,))
+        c.execute("DELETE FROM feedback_stats WHERE meeting_id = ?", (meeting_id,))
+        c.execute("UPDATE deleted_meetings SET purged = 1 WHERE id = ?", (meeting_id,))
+        return False
 
 def add_feedback(meeting_id, user_id, rating, feedback=None):
-    conn = sqlite3.connect(DATABASE_NAME)
-    c = conn.cursor()
-    c.execute("INSERT INTO feedback (meeting_id, user_id, rating, feedback) VALUES (?, ?, ?, ?)", (meeting_id, user_id, rating, feedback))
-    conn.commit()
-    conn.close()
-
-def get_feedback_for_meeting(meeting_id):
-    conn = sqlite3.connect(DATABASE_NAME)
-    c = conn.cursor()
-    c.execute("SELECT user_id, rating, feedback, date FROM feedback WHERE meeting_id = ? ORDER BY date DESC", (meeting_id,))
-    rows = c.fetchall()
-    conn.close()
-    return rows
+    _execute("INSERT INTO feedback (meeting_id, user_id, rating, feedback) VALUES (?, ?, ?, ?)", (meeting_id, user_id, rating, feedback))
+
+def get_feedback_stats(meeting_id):
+    """FeedbackStats counts, kept up to date by triggers on feedback."""
+    row = _fetchone("SELECT bad, good, neutral, detailed FROM feedback_stats WHERE meeting_id = ?", (meeting_id,), FeedbackStats)
+    return row or FeedbackStats(0, 0, 0, 0)
+
+def get_feedback_comments_page(meeting_id, limit, after=None, before=None):
+    """Feedback with text, newest first, paged by feedback id like get_questions_page: (rows, has_prev, has_next)."""
+    if before is not None:
+        rows = _fetchall("""SELECT id, meeting_id, user_id, rating, feedback, date FROM feedback
+                            WHERE meeting_id = ? AND feedback <> ''
+                              AND (date, id) > (SELECT date, id FROM feedback WHERE id = ?)
+                            ORDER BY date, id LIMIT ?""", (meeting_id, before, limit + 1), Feedback)
+        return _keyset_page(rows, limit, True, True)
+    if after is not None:
+        rows = _fetchall("""SELECT id, meeting_id, user_id, rating, feedback, date FROM feedback
+                            WHERE meeting_id = ? AND feedback <> ''
+                              AND (date, id) < (SELECT date, id FROM feedback WHERE id = ?)
+                            ORDER BY date DESC, id DESC LIMIT ?""", (meeting_id, after, limit + 1), Feedback)
+    else:
+        rows = _fetchall("""SELECT id, meeting_id, user_id, rating, feedback, date FROM feedback
+                            WHERE meeting_id = ? AND feedback <> ''
+                            ORDER BY date DESC, id DESC LIMIT ?""", (meeting_id, limit + 1), Feedback)
+    return _keyset_page(rows, limit, False, after is not None)
+
+def fts_query(text):
+    """User input -> FTS5 MATCH expression: every word must match as a prefix; None if there are no words."""
+    words = re.findall(r'\w+', text or '')
+    if not words:
+        return None
+    return ' '.join(f'"{word}"*' for word in words)
+
+def search_questions(text, limit, meeting_id=None):
+    """Best-matching Question rows via questions_fts."""
+    query = fts_query(text)
+    if query is None:
+        return []
+    return _fetchall("""SELECT q.id, q.meeting_id, q.user_id, q.question, q.date
+                        FROM questions_fts
+                        JOIN questions q ON q.id = questions_fts.rowid
+                        WHERE questions_fts MATCH ? AND (? IS NULL OR q.meeting_id = ?)
+                        ORDER BY questions_fts.rank LIMIT ?""", (query, meeting_id, meeting_id, limit), Question)
+
+def search_feedback(text, limit, meeting_id=None):
+    """Best-matching Feedback rows via feedback_fts."""
+    query = fts_query(text)
+    if query is None:
+        return []
+    return _fetchall("""SELECT f.id, f.meeting_id, f.user_id, f.rating, f.feedback, f.date
+                        FROM feedback_fts
+                        JOIN feedback f ON f.id = feedback_fts.rowid
+                        WHERE feedback_fts MATCH ? AND (? IS NULL OR f.meeting_id = ?)
+                        ORDER BY feedback_fts.rank LIMIT ?""", (query, meeting_id, meeting_id, limit), Feedback)
 
 def clear_wifi(meeting_id):
-    conn = sqlite3.connect(DATABASE_NAME)
-    c = conn.cursor()
-    c.execute("UPDATE meetings SET wifi_network = NULL, wifi_password = NULL WHERE id = ?", (meeting_id,))
-    conn.commit()
-    conn.close()
+    _execute("UPDATE meetings SET wifi_network = NULL, wifi_password = NULL WHERE id = ?", (meeting_id,))
 
 def clear_photos(meeting_id):
-    conn = sqlite3.connect(DATABASE_NAME)
-    c = conn.cursor()
-    c.execute("DELETE FROM photos WHERE meeting_id = ?", (meeting_id,))
-    conn.commit()
-    conn.close()
+    _execute("DELETE FROM photos WHERE meeting_id = ?", (meeting_id,))
 
 def clear_agenda(meeting_id):
-    conn = sqlite3.connect(DATABASE_NAME)
-    c = conn.cursor()
-    c.execute("DELETE FROM agenda WHERE meeting_id = ?", (meeting_id,))
-    conn.commit()
-    conn.close()
+    _execute("DELETE FROM agenda WHERE meeting_id = ?", (meeting_id,))
 
 def clear_geo(meeting_id):
-    conn = sqlite3.connect(DATABASE_NAME)
-    c = conn.cursor()
-    c.execute("UPDATE meetings SET latitude = NULL, longitude = NULL WHERE id = ?", (meeting_id,))
-    conn.commit()
-    conn.close()
+    _execute("UPDATE meetings SET latitude = NULL, longitude = NULL WHERE id = ?", (meeting_id,))
 
 def clear_pdf(meeting_id):
-    conn = sqlite3.connect(DATABASE_NAME)
-    c = conn.cursor()
-    c.execute("UPDATE meetings SET pdf_file_id = NULL WHERE id = ?", (meeting_id,))
-    conn.commit()
-    conn.close()
+    _execute("UPDATE meetings SET pdf_file_id = NULL WHERE id = ?", (meeting_id,))
+
+def create_broadcast(kind, messages, admin_chat_id=None, lang=None):
+    """messages: iterable of (chat_id, text, reply_markup_json)."""
+    with transaction() as c:
+        broadcast_id = c.execute("INSERT INTO broadcasts (kind, admin_chat_id, lang) VALUES (?, ?, ?)",
+                                 (kind, admin_chat_id, lang)).lastrowid
+        c.executemany("INSERT INTO outbox (broadcast_id, chat_id, text, reply_markup) VALUES (?, ?, ?, ?)",
+                      ((broadcast_id, chat_id, text, markup) for chat_id, text, markup in messages))
+    return broadcast_id
+
+def set_broadcast_progress_message(broadcast_id, message_id):
+    _execute("UPDATE broadcasts SET progress_message_id = ? WHERE id = ?", (message_id, broadcast_id))
+
+def get_unfinished_broadcasts():
+    return _fetchall("SELECT id, kind, admin_chat_id, progress_message_id, lang FROM broadcasts WHERE finished = 0")
+
+def finish_broadcast(broadcast_id):
+    _execute("UPDATE broadcasts SET finished = 1 WHERE id = ?", (broadcast_id,))
+
+def get_broadcast_counts(broadcast_id):
+    rows = _fetchall("SELECT status, COUNT(*) FROM outbox WHERE broadcast_id = ? GROUP BY status", (broadcast_id,))
+    counts = {'pending': 0, 'sending': 0, 'sent': 0, 'failed': 0}
+    counts.update(dict(rows))
+    counts['total'] = sum(counts.values())
+    return counts
+
+def claim_outbox(limit, now):
+    """Atomically move up to `limit` due rows from pending to sending."""
+    with transaction() as c:
+        rows = c.execute("""SELECT id, broadcast_id, chat_id, text, reply_markup, attempts
+                            FROM outbox
+                            WHERE status = 'pending' AND next_attempt_at <= ?
+                            ORDER BY next_attempt_at, id
+                            LIMIT ?""", (now, limit)).fetchall()
+        c.executemany("UPDATE outbox SET status = 'sending' WHERE id = ?", ((row[0],) for row in rows))
+    return rows
+
+def next_outbox_due():
+    row = _fetchone("SELECT MIN(next_attempt_at) FROM outbox WHERE status = 'pending'")
+    return row[0] if row else None
+
+def mark_outbox_sent(outbox_id):
+    _execute("UPDATE outbox SET status = 'sent', attempts = attempts + 1, error = NULL WHERE id = ?", (outbox_id,))
+
+def mark_outbox_failed(outbox_id, error):
+    _execute("UPDATE outbox SET status = 'failed', attempts = attempts + 1, error = ? WHERE id = ?", (error, outbox_id))
+
+def reset_inflight_outbox():
+    """Rows left in 'sending' by a crashed process go back to the queue."""
+    _execute("UPDATE outbox SET status = 'pending' WHERE status = 'sending'")
+
+def get_participant_languages(meeting_id):
+    return _fetchall("""SELECT p.user_id, u.language
+                        FROM participants p
+                        LEFT JOIN users u ON p.user_id = u.user_id
+                        WHERE p.meeting_id = ?""", (meeting_id,))
+
+def get_cached_file_ids(paths):
+    """Telegram file_ids already obtained for local file:// media, as {path: file_id}."""
+    paths = list(paths)
+    if not paths:
+        return {}
+    placeholders = ', '.join('?' for _ in paths)
+    rows = _fetchall(f"SELECT path, file_id FROM media_file_ids WHERE path IN ({placeholders})", paths)
+    return dict(rows)
+
+def cache_file_id(path, file_id, kind):
+    _execute("INSERT OR REPLACE INTO media_file_ids (path, file_id, kind) VALUES (?, ?, ?)", (path, file_id, kind))
+
+def get_uncached_local_media(limit=50):
+    return _fetchall("""SELECT file_id, 'photo' FROM photos
+                        WHERE file_id LIKE 'file://%' AND file_id NOT IN (SELECT path FROM media_file_ids)
+                        UNION
+                        SELECT pdf_file_id, 'document' FROM meetings
+                        WHERE pdf_file_id LIKE 'file://%' AND pdf_file_id NOT IN (SELECT path FROM media_file_ids)
+                        LIMIT ?""", (limit,))
+
+def get_referenced_media():
+    """Local file:// media still used by a photo or a meeting PDF."""
+    return {row[0] for row in _fetchall("SELECT path FROM media_refs WHERE refs > 0")}
+
+def forget_media(paths):
+    """Drop counters that reached zero and the cached Telegram file_ids of deleted local files."""
+    with transaction() as c:
+        c.execute("DELETE FROM media_refs WHERE refs <= 0")
+        c.executemany("DELETE FROM media_file_ids WHERE path = ?", [(path,) for path in paths])
+
+def get_user_state(user_id, now):
+    row = _fetchone("SELECT data FROM user_states WHERE user_id = ? AND expires_at > ?", (user_id, now))
+    return json.loads(row[0]) if row else None
+
+def set_user_state(user_id, state, expires_at):
+    _execute("INSERT OR REPLACE INTO user_states (user_id, data, expires_at) VALUES (?, ?, ?)",
+             (user_id, json.dumps(state), expires_at))
+
+def update_user_state(user_id, fields, now, expires_at):
+    """Merge fields into a live state in one transaction; returns the new state or None."""
+    with transaction() as c:
+        row = c.execute("SELECT data FROM user_states WHERE user_id = ? AND expires_at > ?", (user_id, now)).fetchone()
+        if row is None:
+            return None
+        state = json.loads(row[0])
+        state.update(fields)
+        c.execute("UPDATE user_states SET data = ?, expires_at = ? WHERE user_id = ?", (json.dumps(state), expires_at, user_id))
+        return state
+
+def pop_user_state(user_id, now):
+    """Delete a state and return it if it was still live."""
+    with transaction() as c:
+        row = c.execute("DELETE FROM user_states WHERE user_id = ? RETURNING data, expires_at", (user_id,)).fetchone()
+    if row is None or row[1] <= now:
+        return None
+    return json.loads(row[0])
+
+def purge_user_states(now):
+    return _execute("DELETE FROM user_states WHERE expires_at <= ?", (now,)).rowcount
+
+if METRICS_ENABLED:
+    # count the calls handlers make into this module (see metrics.py)
+    count_calls(globals(), skip=('get_connection', 'close_connection', 'transaction'))
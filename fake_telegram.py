@@ -0,0 +1,205 @@
+"""Minimal offline stand-in for the Telegram Bot API.
+
+Start it with ``python fake_telegram.py`` and set ``TELEGRAM_API_URL`` in
+config.py to its address: every API call the bot makes is answered locally and
+recorded. In webhook mode, ``FakeTelegram.push_update`` delivers updates to the
+URL registered with setWebhook, just like Telegram does. ``latency`` and
+``flood_rate`` make it slow and make it answer a share of the sending calls
+with 429 Too Many Requests, for load tests (benchmarks/load_test.py).
+"""
+import itertools
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+import requests
+
+BOT_USER = {'id': 1, 'is_bot': True, 'first_name': 'Fake bot', 'username': 'fake_event_bot'}
+
+
+class _ApiHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self._handle()
+
+    def do_POST(self):
+        self._handle()
+
+    def _handle(self):
+        url = urlsplit(self.path)
+        # /bot<token>/<method>
+        parts = url.path.strip('/').split('/')
+        if len(parts) != 2 or not parts[0].startswith('bot'):
+            self.send_error(404)
+            return
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        params = dict(parse_qsl(url.query))
+        # the sync client sends parameters in the query string, the aiohttp one as a form body
+        if self.headers.get('Content-Type', '').startswith('application/x-www-form-urlencoded'):
+            params.update(parse_qsl(body.decode('utf-8')))
+        ok, result = self.server.fake.call(parts[1], params)
+        if ok:
+            body = {'ok': True, 'result': result}
+        else:
+            body = {'ok': False, 'error_code': result[0], 'description': result[1]}
+            if len(result) > 2:
+                body['parameters'] = result[2]
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(200 if ok else result[0])
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _ApiServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+
+class FakeTelegram:
+    """Records Bot API calls and answers them with plausible results."""
+
+    def __init__(self, host='127.0.0.1', port=8081, latency=0, flood_rate=0, retry_after=1, seed=None):
+        self.server = _ApiServer((host, port), _ApiHandler)
+        self.server.fake = self
+        self.calls = []
+        self.webhook_url = None
+        self.webhook_secret = None
+        # seconds every API call takes, to stand in for the round trip to Telegram
+        self.latency = latency
+        # share of send*/edit*/answer* calls refused with 429 and `retry_after` seconds
+        self.flood_rate = flood_rate
+        self.retry_after = retry_after
+        self.floods = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._message_ids = itertools.count(1)
+        self._update_ids = itertools.count(1)
+        self._file_ids = itertools.count(1)
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, name='fake-telegram', daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def calls_to(self, method):
+        with self._lock:
+            return [params for name, params in self.calls if name == method]
+
+    def call(self, method, params):
+        """Return ``(True, result)`` or ``(False, (error_code, description[, parameters]))``."""
+        with self._lock:
+            self.calls.append((method, params))
+            flood = (self.flood_rate and method.startswith(('send', 'edit', 'answer'))
+                     and self._random.random() < self.flood_rate)
+            if flood:
+                self.floods += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if flood:
+            return False, (429, f'Too Many Requests: retry after {self.retry_after}', {'retry_after': self.retry_after})
+        if method == 'getMe':
+            return True, BOT_USER
+        if method == 'setWebhook':
+            self.webhook_url = params.get('url')
+            self.webhook_secret = params.get('secret_token')
+            return True, True
+        if method == 'deleteWebhook':
+            self.webhook_url = None
+            self.webhook_secret = None
+            return True, True
+        if method == 'getWebhookInfo':
+            return True, {'url': self.webhook_url or '', 'has_custom_certificate': False, 'pending_update_count': 0}
+        if method == 'sendMediaGroup':
+            media = json.loads(params.get('media') or '[]')
+            return True, [self._message(params, 'photo') for _ in media]
+        if method == 'sendPhoto':
+            return True, self._message(params, 'photo')
+        if method == 'sendDocument':
+            return True, self._message(params, 'document')
+        if method == 'sendLocation':
+            return True, self._message(params, 'location')
+        if method in ('sendMessage', 'editMessageText', 'editMessageReplyMarkup'):
+            return True, self._message(params)
+        return True, True
+
+    def _message(self, params, kind=None):
+        message = {
+            'message_id': int(params.get('message_id') or next(self._message_ids)),
+            'date': int(time.time()),
+            'chat': {'id': int(params.get('chat_id') or 0), 'type': 'private'},
+            'from': BOT_USER,
+        }
+        if 'text' in params:
+            message['text'] = params['text']
+        if kind == 'photo':
+            file_id = f'fake-photo-{next(self._file_ids)}'
+            message['photo'] = [{'file_id': file_id, 'file_unique_id': file_id, 'width': 1280, 'height': 960}]
+        elif kind == 'document':
+            file_id = f'fake-document-{next(self._file_ids)}'
+            message['document'] = {'file_id': file_id, 'file_unique_id': file_id}
+        elif kind == 'location':
+            message['location'] = {'latitude': float(params.get('latitude') or 0), 'longitude': float(params.get('longitude') or 0)}
+        return message
+
+    def message_update(self, chat_id, text):
+        user = {'id': chat_id, 'is_bot': False, 'first_name': f'User {chat_id}'}
+        return {
+            'update_id': next(self._update_ids),
+            'message': {
+                'message_id': next(self._message_ids),
+                'date': int(time.time()),
+                'chat': {'id': chat_id, 'type': 'private'},
+                'from': user,
+                'text': text,
+            },
+        }
+
+    def callback_update(self, chat_id, data, message_id=1):
+        user = {'id': chat_id, 'is_bot': False, 'first_name': f'User {chat_id}'}
+        update_id = next(self._update_ids)
+        return {
+            'update_id': update_id,
+            'callback_query': {
+                'id': str(update_id),
+                'from': user,
+                'chat_instance': str(chat_id),
+                'data': data,
+                'message': {
+                    'message_id': message_id,
+                    'date': int(time.time()),
+                    'chat': {'id': chat_id, 'type': 'private'},
+                    'from': BOT_USER,
+                    'text': '...',
+                },
+            },
+        }
+
+    def push_update(self, update, session=None):
+        """POST an update to the registered webhook; returns the HTTP status code."""
+        headers = {}
+        if self.webhook_secret:
+            headers['X-Telegram-Bot-Api-Secret-Token'] = self.webhook_secret
+        response = (session or requests).post(self.webhook_url, json=update, headers=headers, timeout=10)
+        return response.status_code
+
+
+if __name__ == '__main__':
+    fake = FakeTelegram()
+    print(f"Fake Telegram API на {fake.url}")
+    fake.server.serve_forever()
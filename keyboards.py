@@ -55,7 +55,7 @@ def contact_request_keyboard(lang='en'):
 def meetings_keyboard(meetings, lang='en'):
     kb = types.InlineKeyboardMarkup(row_width=1)
     for m in meetings:
-        kb.add(types.InlineKeyboardButton(f"{m[1]}", callback_data=f"meeting_{m[0]}"))
+        kb.add(types.InlineKeyboardButton(f"{m.name}", callback_data=f"meeting_{m.id}"))
     kb.add(types.InlineKeyboardButton(get_text(lang, 'back'), callback_data="back_main"))
     return kb
 
@@ -87,13 +87,46 @@ def back_to_meeting_keyboard(meeting_id, lang='en'):
     kb.add(types.InlineKeyboardButton(get_text(lang, 'back'), callback_data=f"meeting_{meeting_id}"))
     return kb
 
+def page_nav_buttons(callback_prefix, page, pages, lang='en'):
+    buttons = []
+    if page > 0:
+        buttons.append(types.InlineKeyboardButton(get_text(lang, 'prev'), callback_data=f"{callback_prefix}_{page - 1}"))
+    if page + 1 < pages:
+        buttons.append(types.InlineKeyboardButton(get_text(lang, 'next'), callback_data=f"{callback_prefix}_{page + 1}"))
+    return buttons
+
+def keyset_nav_buttons(callback_prefix, key, first, last, has_prev=False, has_next=False, lang='en'):
+    """Prev/next buttons carrying the first/last row key of the page instead of a page number."""
+    buttons = []
+    if has_prev:
+        buttons.append(types.InlineKeyboardButton(get_text(lang, 'prev'), callback_data=f"{callback_prefix}_prev_{key}_{first}"))
+    if has_next:
+        buttons.append(types.InlineKeyboardButton(get_text(lang, 'next'), callback_data=f"{callback_prefix}_next_{key}_{last}"))
+    return buttons
+
+def people_page_keyboard(meeting_id, lang='en', first=None, last=None, has_prev=False, has_next=False):
+    kb = types.InlineKeyboardMarkup(row_width=2)
+    nav = keyset_nav_buttons("people", meeting_id, first, last, has_prev, has_next, lang)
+    if nav:
+        kb.row(*nav)
+    kb.add(types.InlineKeyboardButton(get_text(lang, 'back'), callback_data=f"meeting_{meeting_id}"))
+    return kb
+
+def photos_page_keyboard(meeting_id, lang='en', page=0, pages=1):
+    kb = types.InlineKeyboardMarkup(row_width=2)
+    nav = page_nav_buttons(f"photos_page_{meeting_id}", page, pages, lang)
+    if nav:
+        kb.row(*nav)
+    kb.add(types.InlineKeyboardButton(get_text(lang, 'back'), callback_data=f"meeting_{meeting_id}"))
+    return kb
+
 def user_agenda_list_keyboard(meeting_id, items, lang='en'):
     kb = types.InlineKeyboardMarkup(row_width=1)
     for item in items:
-        agenda_id = item[0]
-        title = item[2] or ''
-        start = item[3] or ''
-        end = item[4] or ''
+        agenda_id = item.id
+        title = item.title or ''
+        start = item.start_time or ''
+        end = item.end_time or ''
         label = f"🕐 {start}–{end} • {title}".strip()
         kb.add(types.InlineKeyboardButton(label, callback_data=f"agenda_item_{agenda_id}_{meeting_id}"))
     kb.add(types.InlineKeyboardButton(get_text(lang, 'back'), callback_data=f"meeting_{meeting_id}"))
@@ -126,7 +159,7 @@ def admin_keyboard(lang='en'):
 def admin_meetings_keyboard(meetings, lang='en'):
     kb = types.InlineKeyboardMarkup(row_width=1)
     for m in meetings:
-        kb.add(types.InlineKeyboardButton(f"{m[1]}", callback_data=f"admin_meeting_{m[0]}"))
+        kb.add(types.InlineKeyboardButton(f"{m.name}", callback_data=f"admin_meeting_{m.id}"))
     kb.add(types.InlineKeyboardButton(get_text(lang, 'back'), callback_data="back_admin"))
     return kb
 
@@ -134,7 +167,7 @@ def admin_notifications_keyboard(meetings, lang='en'):
     kb = types.InlineKeyboardMarkup(row_width=1)
     if meetings:
         for m in meetings:
-            kb.add(types.InlineKeyboardButton(f"{m[1]}", callback_data=f"notify_meeting_{m[0]}"))
+            kb.add(types.InlineKeyboardButton(f"{m.name}", callback_data=f"notify_meeting_{m.id}"))
     else:
         kb.add(types.InlineKeyboardButton(get_text(lang, 'no_meetings'), callback_data="notify_none"))
     kb.add(types.InlineKeyboardButton(get_text(lang, 'send_all_users'), callback_data="notify_all"))
@@ -187,7 +220,7 @@ def admin_questions_meetings_keyboard(meetings, lang='en'):
     kb = types.InlineKeyboardMarkup(row_width=1)
     if meetings:
         for m in meetings:
-            kb.add(types.InlineKeyboardButton(f"{m[1]}", callback_data=f"admin_questions_meeting_{m[0]}"))
+            kb.add(types.InlineKeyboardButton(f"{m.name}", callback_data=f"admin_questions_meeting_{m.id}"))
     else:
         kb.add(types.InlineKeyboardButton(get_text(lang, 'no_meetings'), callback_data="notify_none"))
     kb.add(types.InlineKeyboardButton(get_text(lang, 'back'), callback_data="back_admin"))
@@ -241,8 +274,11 @@ def finish_confirm_keyboard(meeting_id, lang='en'):
     )
     return kb
 
-def admin_feedback_keyboard(meeting_id, lang='en'):
-    kb = types.InlineKeyboardMarkup(row_width=1)
+def admin_feedback_keyboard(meeting_id, lang='en', first=None, last=None, has_prev=False, has_next=False):
+    kb = types.InlineKeyboardMarkup(row_width=2)
+    nav = keyset_nav_buttons("admin_feedback", meeting_id, first, last, has_prev, has_next, lang)
+    if nav:
+        kb.row(*nav)
     kb.add(types.InlineKeyboardButton(get_text(lang, 'back'), callback_data=f"admin_meeting_{meeting_id}"))
     return kb
 
@@ -260,7 +296,7 @@ def admin_wifi_view_keyboard(meeting_id, lang='en', has_wifi=False):
     kb.add(types.InlineKeyboardButton(get_text(lang, 'back'), callback_data=f"admin_meeting_{meeting_id}"))
     return kb
 
-def admin_photos_view_keyboard(meeting_id, lang='en', has_photos=False):
+def admin_photos_view_keyboard(meeting_id, lang='en', has_photos=False, page=0, pages=1):
     kb = types.InlineKeyboardMarkup(row_width=2)
     add_btn = types.InlineKeyboardButton(get_text(lang, 'add'), callback_data=f"admin_photos_add_{meeting_id}")
     delete_btn = types.InlineKeyboardButton(get_text(lang, 'delete'), callback_data=f"admin_photos_clear_{meeting_id}")
@@ -268,6 +304,9 @@ def admin_photos_view_keyboard(meeting_id, lang='en', has_photos=False):
         kb.row(add_btn, delete_btn)
     else:
         kb.add(add_btn)
+    nav = page_nav_buttons(f"admin_photos_page_{meeting_id}", page, pages, lang)
+    if nav:
+        kb.row(*nav)
     kb.add(types.InlineKeyboardButton(get_text(lang, 'back'), callback_data=f"admin_meeting_{meeting_id}"))
     return kb
 
@@ -317,10 +356,10 @@ def admin_agenda_items_list_keyboard(meeting_id, items, lang='en'):
     kb = types.InlineKeyboardMarkup(row_width=1)
     kb.add(types.InlineKeyboardButton(get_text(lang, 'add'), callback_data=f"admin_agenda_add_{meeting_id}"))
     for item in items:
-        agenda_id = item[0]
-        title = item[2] or ''
-        start = item[3] or ''
-        end = item[4] or ''
+        agenda_id = item.id
+        title = item.title or ''
+        start = item.start_time or ''
+        end = item.end_time or ''
         label = f"🕐 {start}–{end} • {title}".strip()
         kb.add(types.InlineKeyboardButton(label, callback_data=f"admin_agenda_item_{agenda_id}_{meeting_id}"))
     kb.add(types.InlineKeyboardButton(get_text(lang, 'back'), callback_data=f"admin_meeting_{meeting_id}"))
@@ -344,8 +383,11 @@ def admin_agenda_item_actions_keyboard(agenda_id, meeting_id, lang='en'):
     kb.add(types.InlineKeyboardButton(get_text(lang, 'back'), callback_data=f"admin_agenda_{meeting_id}"))
     return kb
 
-def admin_agenda_people_back_keyboard(meeting_id, lang='en'):
-    kb = types.InlineKeyboardMarkup(row_width=1)
+def admin_agenda_people_back_keyboard(meeting_id, lang='en', agenda_id=None, first=None, last=None, has_prev=False, has_next=False):
+    kb = types.InlineKeyboardMarkup(row_width=2)
+    nav = keyset_nav_buttons("admin_agenda_item_people", f"{agenda_id}_{meeting_id}", first, last, has_prev, has_next, lang)
+    if nav:
+        kb.row(*nav)
     kb.add(types.InlineKeyboardButton(get_text(lang, 'back'), callback_data=f"admin_agenda_{meeting_id}"))
     return kb
 def admin_agenda_item_edit_keyboard(agenda_id, meeting_id, lang='en'):
@@ -378,18 +420,24 @@ def admin_feedback_finished_meetings_keyboard(meetings, lang='en'):
     kb = types.InlineKeyboardMarkup(row_width=1)
     if meetings:
         for m in meetings:
-            kb.add(types.InlineKeyboardButton(f"{m[1]}", callback_data=f"admin_feedback_view_{m[0]}"))
+            kb.add(types.InlineKeyboardButton(f"{m.name}", callback_data=f"admin_feedback_view_{m.id}"))
     else:
         kb.add(types.InlineKeyboardButton(get_text(lang, 'no_meetings'), callback_data="notify_none"))
     kb.add(types.InlineKeyboardButton(get_text(lang, 'back'), callback_data="back_admin"))
     return kb
 
-def admin_feedback_back_to_list_keyboard(lang='en'):
-    kb = types.InlineKeyboardMarkup(row_width=1)
+def admin_feedback_back_to_list_keyboard(lang='en', meeting_id=None, first=None, last=None, has_prev=False, has_next=False):
+    kb = types.InlineKeyboardMarkup(row_width=2)
+    nav = keyset_nav_buttons("admin_feedback_view", meeting_id, first, last, has_prev, has_next, lang)
+    if nav:
+        kb.row(*nav)
     kb.add(types.InlineKeyboardButton(get_text(lang, 'back'), callback_data="admin_feedback_main"))
     return kb
 
-def admin_questions_back_keyboard(lang='en'):
-    kb = types.InlineKeyboardMarkup(row_width=1)
+def admin_questions_back_keyboard(lang='en', meeting_id=None, first=None, last=None, has_prev=False, has_next=False):
+    kb = types.InlineKeyboardMarkup(row_width=2)
+    nav = keyset_nav_buttons("admin_questions_meeting", meeting_id, first, last, has_prev, has_next, lang)
+    if nav:
+        kb.row(*nav)
     kb.add(types.InlineKeyboardButton(get_text(lang, 'back'), callback_data="admin_questions"))
     return kb
@@ -0,0 +1,143 @@
+import os
+import threading
+import time
+
+from telebot import types
+
+from config import MEDIA_WARMUP_CHAT_ID, MEDIA_WARMUP_INTERVAL
+from database import get_cached_file_ids, cache_file_id, get_uncached_local_media
+from media_store import LOCAL_PREFIX, local_path
+
+# Telegram accepts 2-10 items per media group
+ALBUM_SIZE = 10
+
+
+def is_local(value):
+    return isinstance(value, str) and value.startswith(LOCAL_PREFIX)
+
+
+def _uploaded_file_id(message, kind):
+    if kind == 'photo' and getattr(message, 'photo', None):
+        return message.photo[-1].file_id
+    if kind == 'document' and getattr(message, 'document', None):
+        return message.document.file_id
+    return None
+
+
+def _send_one(bot, chat_id, value, kind, **kwargs):
+    method = bot.send_photo if kind == 'photo' else bot.send_document
+    if not is_local(value):
+        return method(chat_id, value, **kwargs)
+    cached = get_cached_file_ids([value]).get(value)
+    if cached:
+        try:
+            return method(chat_id, cached, **kwargs)
+        except Exception as e:
+            # file_id no longer valid for this bot: upload the bytes again
+            print(f"Сохранённый file_id для {value} не принят, загружаю файл заново: {e}")
+    with open(local_path(value), 'rb') as f:
+        message = method(chat_id, f, **kwargs)
+    file_id = _uploaded_file_id(message, kind)
+    if file_id:
+        cache_file_id(value, file_id, kind)
+    return message
+
+
+def send_media_photo(bot, chat_id, value, **kwargs):
+    """send_photo for a Telegram file_id or a file:// path; local files are uploaded once."""
+    return _send_one(bot, chat_id, value, 'photo', **kwargs)
+
+
+def send_media_document(bot, chat_id, value, **kwargs):
+    """send_document for a Telegram file_id or a file:// path; local files are uploaded once."""
+    return _send_one(bot, chat_id, value, 'document', **kwargs)
+
+
+def send_album(bot, chat_id, photos):
+    """Send up to ALBUM_SIZE photos in one request; falls back to single sends on failure."""
+    cached = get_cached_file_ids(p for p in photos if is_local(p))
+    values = [p for p in photos if not is_local(p) or p in cached or os.path.exists(local_path(p))]
+    if not values:
+        return
+    if len(values) == 1:
+        send_media_photo(bot, chat_id, values[0])
+        return
+    opened = []
+    uploads = {}
+    try:
+        media = []
+        for index, value in enumerate(values):
+            payload = value
+            if is_local(value):
+                payload = cached.get(value)
+                if payload is None:
+                    payload = open(local_path(value), 'rb')
+                    opened.append(payload)
+                    uploads[index] = value
+            media.append(types.InputMediaPhoto(payload))
+        messages = bot.send_media_group(chat_id, media)
+    except Exception as e:
+        print(f"Ошибка отправки альбома в чат {chat_id}, отправляю фото по одному: {e}")
+        messages = None
+    finally:
+        for f in opened:
+            f.close()
+    if messages is None:
+        for value in values:
+            try:
+                send_media_photo(bot, chat_id, value)
+            except Exception as e:
+                print(f"Ошибка отправки фото {value} в чат {chat_id}: {e}")
+        return
+    for index, value in uploads.items():
+        if index < len(messages):
+            file_id = _uploaded_file_id(messages[index], 'photo')
+            if file_id:
+                cache_file_id(value, file_id, 'photo')
+
+
+class MediaWarmer:
+    """Uploads file:// media saved by the web admin to a service chat ahead of time.
+
+    The resulting file_id is cached, so the first attendee who opens the photo
+    or PDF gets a zero-upload send. Disabled while MEDIA_WARMUP_CHAT_ID is None.
+    """
+
+    def __init__(self, bot, chat_id=MEDIA_WARMUP_CHAT_ID, interval=MEDIA_WARMUP_INTERVAL, retry_after=3600):
+        self.bot = bot
+        self.chat_id = chat_id
+        self.interval = interval
+        # value -> time before which a failed upload is not tried again
+        self.retry_after = retry_after
+        self._failed = {}
+
+    def start(self):
+        if self.chat_id is None:
+            return
+        threading.Thread(target=self._loop, name='media-warmer', daemon=True).start()
+
+    def warm_once(self):
+        warmed = 0
+        now = time.time()
+        # expired entries are retried, and removed values (deleted photos) do not pile up
+        self._failed = {value: until for value, until in self._failed.items() if until > now}
+        for value, kind in get_uncached_local_media(limit=len(self._failed) + 50):
+            if value in self._failed:
+                continue
+            try:
+                message = _send_one(self.bot, self.chat_id, value, kind, disable_notification=True)
+                self.bot.delete_message(self.chat_id, message.message_id)
+                warmed += 1
+            except Exception as e:
+                self._failed[value] = time.time() + self.retry_after
+                print(f"Ошибка предзагрузки {value}: {e}")
+            time.sleep(1)
+        return warmed
+
+    def _loop(self):
+        while True:
+            try:
+                self.warm_once()
+            except Exception as e:
+                print(f"Ошибка предзагрузки медиа: {e}")
+            time.sleep(self.interval)
@@ -0,0 +1,122 @@
+"""Content-addressed storage for media uploaded through the web admin.
+
+``store`` writes an upload to ``media/blobs/<ab>/<sha256><ext>``, hashing the
+chunks while they stream to disk, so the same photo or PDF uploaded for several
+meetings is kept once (and uploaded to Telegram once, media.py caches by path).
+
+Triggers (schema.py) count the references to every ``file://`` value in
+``photos.file_id`` and ``meetings.pdf_file_id`` in ``media_refs``.
+``collect`` deletes the files under ``media/`` nothing refers to: photos
+cleared, PDFs replaced, meetings deleted, uploads whose form was never saved.
+A file is only deleted once it has been untouched for `grace` seconds, and
+storing bytes that already exist touches the blob, so an upload that is
+about to be referenced is never collected under it.
+"""
+import hashlib
+import os
+import tempfile
+import time
+
+from config import MEDIA_GC_INTERVAL, MEDIA_GC_GRACE
+from database import get_referenced_media, forget_media
+
+LOCAL_PREFIX = 'file://'
+# file:// values are relative to the project directory, whatever directory the bot or admin runs from
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+MEDIA_DIR = 'media'
+BLOB_DIR = 'blobs'
+# blobs, plus where the web admin saved uploads before the blob store
+COLLECTED_DIRS = (BLOB_DIR, 'photos', 'pdfs')
+
+
+def local_path(value, root=PROJECT_DIR):
+    """Absolute path of a ``file://`` value."""
+    return os.path.join(root, value[len(LOCAL_PREFIX):])
+
+
+def store(chunks, ext='', root=PROJECT_DIR):
+    """Save an upload given as byte chunks; returns its ``file://`` value. Raises ValueError if it is empty."""
+    blob_dir = os.path.join(root, MEDIA_DIR, BLOB_DIR)
+    os.makedirs(blob_dir, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(suffix='.part', dir=blob_dir)
+    try:
+        with os.fdopen(fd, 'wb') as dst:
+            for chunk in chunks:
+                digest.update(chunk)
+                dst.write(chunk)
+                size += len(chunk)
+        if not size:
+            raise ValueError('Uploaded file is empty.')
+        name = digest.hexdigest()
+        rel_path = f"{MEDIA_DIR}/{BLOB_DIR}/{name[:2]}/{name}{ext.lower()}"
+        path = os.path.join(root, rel_path)
+        try:
+            # already stored: the fresh mtime keeps it from the collector
+            os.utime(path)
+        except FileNotFoundError:
+            # new, or just taken by collect(): write it (again)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+            tmp_path = None
+    finally:
+        if tmp_path is not None:
+            os.remove(tmp_path)
+    return LOCAL_PREFIX + rel_path
+
+
+def collect(root=PROJECT_DIR, grace=MEDIA_GC_GRACE):
+    """Delete unreferenced media files untouched for `grace` seconds; returns (files, bytes) removed."""
+    referenced = get_referenced_media()
+    cutoff = time.time() - grace
+    removed = []
+    freed = 0
+    for subdir in COLLECTED_DIRS:
+        for dirpath, _, filenames in os.walk(os.path.join(root, MEDIA_DIR, subdir)):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                value = LOCAL_PREFIX + os.path.relpath(path, root).replace(os.sep, '/')
+                if value in referenced:
+                    continue
+                try:
+                    if os.stat(path).st_mtime > cutoff:
+                        continue
+                    # move it aside, then look again: a store() that touched it in the meantime
+                    # left a fresh mtime (put it back), a later one finds it gone and writes it anew
+                    trash = path + '.deleting'
+                    os.replace(path, trash)
+                    stat = os.stat(trash)
+                    if stat.st_mtime > cutoff:
+                        os.replace(trash, path)
+                        continue
+                    os.remove(trash)
+                except FileNotFoundError:
+                    continue
+                removed.append(value)
+                freed += stat.st_size
+    forget_media(removed)
+    return len(removed), freed
+
+
+class MediaCollector:
+    """Runs ``collect`` on the shared Scheduler every `interval` seconds (disabled while it is None)."""
+
+    def __init__(self, scheduler, interval=MEDIA_GC_INTERVAL, grace=MEDIA_GC_GRACE, root=PROJECT_DIR):
+        self.scheduler = scheduler
+        self.interval = interval
+        self.grace = grace
+        self.root = root
+
+    def load(self):
+        if self.interval is not None:
+            self.scheduler.schedule('media_gc', time.time() + min(60, self.interval), self._fire)
+
+    def _fire(self):
+        try:
+            files, size = collect(self.root, self.grace)
+            if files:
+                print(f"Удалено неиспользуемых медиафайлов: {files} ({size // 1024} КБ)")
+        finally:
+            self.scheduler.schedule('media_gc', time.time() + self.interval, self._fire)
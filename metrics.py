@@ -0,0 +1,237 @@
+"""Per-route handler metrics.
+
+For every update the bot handles, ``MetricsMiddleware`` records wall time, the
+number of database.py function calls, SQLite statements and Bot API requests,
+tagged by route (``meeting_``, ``admin_photos_``, ``/start``, ...). The
+counters are thread-local and only touched while a handler runs on that thread,
+so outside handlers (broadcast workers, scheduler) every hook costs a single
+attribute lookup.
+
+``HandlerMetrics`` keeps cumulative Prometheus counters/histograms, served as
+text by ``MetricsServer``, and a rolling window of recent samples per route for
+the admin ``/stats`` view.
+"""
+import bisect
+import functools
+import inspect
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from telebot.handler_backends import BaseMiddleware
+
+from config import METRICS_WINDOW, METRICS_SAMPLES_PER_ROUTE
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_local = threading.local()
+
+
+class _Counters:
+    __slots__ = ('db_calls', 'statements', 'api_calls', 'last_sql')
+
+    def __init__(self):
+        self.db_calls = 0
+        self.statements = 0
+        self.api_calls = 0
+        self.last_sql = None
+
+
+def count_statement(sql):
+    """SQLite trace callback.
+
+    SQLite reports the start of every trigger program again with the text of
+    the statement that fired it, so a repeat of the previous text is not
+    counted: trigger work belongs to the statement that caused it.
+    """
+    counters = getattr(_local, 'counters', None)
+    if counters is not None and sql != counters.last_sql:
+        counters.statements += 1
+        counters.last_sql = sql
+
+
+def count_api_call():
+    counters = getattr(_local, 'counters', None)
+    if counters is not None:
+        counters.api_calls += 1
+
+
+def count_calls(namespace, skip=()):
+    """Wrap the public functions defined in module `namespace` to count calls made by handlers."""
+    module = namespace['__name__']
+    for name, func in list(namespace.items()):
+        if name.startswith('_') or name in skip or not inspect.isfunction(func) or func.__module__ != module:
+            continue
+        namespace[name] = _counted(func)
+
+
+def _counted(func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        counters = getattr(_local, 'counters', None)
+        if counters is not None:
+            counters.db_calls += 1
+        return func(*args, **kwargs)
+    return wrapper
+
+
+def count_api_requests(apihelper):
+    """Count every request telebot's sync client sends."""
+    make_request = apihelper._make_request
+
+    @functools.wraps(make_request)
+    def counted(*args, **kwargs):
+        count_api_call()
+        return make_request(*args, **kwargs)
+
+    apihelper._make_request = counted
+
+
+class _RouteStats:
+    __slots__ = ('count', 'errors', 'seconds', 'buckets', 'db_calls', 'statements', 'api_calls', 'recent')
+
+    def __init__(self, samples):
+        self.count = 0
+        self.errors = 0
+        self.seconds = 0.0
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.db_calls = 0
+        self.statements = 0
+        self.api_calls = 0
+        # (finished_at, seconds, db_calls, statements, api_calls, failed)
+        self.recent = deque(maxlen=samples)
+
+
+class HandlerMetrics:
+    """Aggregates handler samples per route."""
+
+    def __init__(self, window=METRICS_WINDOW, samples=METRICS_SAMPLES_PER_ROUTE):
+        self.window = window
+        self.samples = samples
+        self._routes = {}
+        self._lock = threading.Lock()
+
+    def record(self, route, seconds, counters, failed=False):
+        now = time.time()
+        with self._lock:
+            stats = self._routes.get(route)
+            if stats is None:
+                stats = self._routes[route] = _RouteStats(self.samples)
+            stats.count += 1
+            stats.errors += failed
+            stats.seconds += seconds
+            stats.buckets[bisect.bisect_left(BUCKETS, seconds)] += 1
+            stats.db_calls += counters.db_calls
+            stats.statements += counters.statements
+            stats.api_calls += counters.api_calls
+            stats.recent.append((now, seconds, counters.db_calls, counters.statements, counters.api_calls, failed))
+
+    def totals(self):
+        """Cumulative sums over all routes."""
+        fields = ('count', 'errors', 'seconds', 'db_calls', 'statements', 'api_calls')
+        with self._lock:
+            return {field: sum(getattr(s, field) for s in self._routes.values()) for field in fields}
+
+    def summary(self, window=None):
+        """Recent per-route figures, slowest total time first:
+        [(route, count, errors, p50, p95, max seconds, db calls, statements, API calls per update)]."""
+        since = time.time() - (window or self.window)
+        with self._lock:
+            recent = {route: [s for s in stats.recent if s[0] >= since] for route, stats in self._routes.items()}
+        rows = []
+        for route, samples in recent.items():
+            if not samples:
+                continue
+            n = len(samples)
+            seconds = sorted(s[1] for s in samples)
+            rows.append((
+                route, n, sum(s[5] for s in samples),
+                seconds[n // 2], seconds[min(n - 1, n * 95 // 100)], seconds[-1],
+                sum(s[2] for s in samples) / n, sum(s[3] for s in samples) / n, sum(s[4] for s in samples) / n,
+            ))
+        rows.sort(key=lambda row: row[1] * row[3], reverse=True)
+        return rows
+
+    def prometheus(self):
+        """Metrics in the Prometheus text exposition format."""
+        with self._lock:
+            routes = [(route, s.count, s.errors, s.seconds, list(s.buckets), s.db_calls, s.statements, s.api_calls)
+                      for route, s in sorted(self._routes.items())]
+        lines = [
+            '# HELP bot_handler_seconds Wall time of update handlers.',
+            '# TYPE bot_handler_seconds histogram',
+        ]
+        for route, count, errors, seconds, buckets, *_ in routes:
+            label = _label(route)
+            cumulative = 0
+            for bound, n in zip(BUCKETS + ('+Inf',), buckets):
+                cumulative += n
+                lines.append(f'bot_handler_seconds_bucket{{route="{label}",le="{bound}"}} {cumulative}')
+            lines.append(f'bot_handler_seconds_sum{{route="{label}"}} {seconds:.6f}')
+            lines.append(f'bot_handler_seconds_count{{route="{label}"}} {count}')
+        for index, name, help_text in (
+            (2, 'bot_handler_errors_total', 'Updates whose handler raised.'),
+            (5, 'bot_handler_db_calls_total', 'database.py function calls made by handlers.'),
+            (6, 'bot_handler_sql_statements_total', 'SQLite statements run by handlers.'),
+            (7, 'bot_handler_api_calls_total', 'Bot API requests made by handlers.'),
+        ):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} counter')
+            for row in routes:
+                lines.append(f'{name}{{route="{_label(row[0])}"}} {row[index]}')
+        return '\n'.join(lines) + '\n'
+
+
+def _label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class MetricsMiddleware(BaseMiddleware):
+    """telebot class middleware feeding `metrics`; `route(update)` names the route of a message or callback."""
+
+    def __init__(self, metrics, route):
+        super().__init__()
+        self.update_types = ['message', 'callback_query']
+        self.metrics = metrics
+        self.route = route
+
+    def pre_process(self, update, data):
+        _local.counters = _Counters()
+        data['metrics_started'] = time.perf_counter()
+
+    def post_process(self, update, data, exception):
+        seconds = time.perf_counter() - data['metrics_started']
+        counters = _local.counters
+        _local.counters = None
+        self.metrics.record(self.route(update), seconds, counters, exception is not None)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = self.server.metrics.prometheus().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MetricsServer(ThreadingHTTPServer):
+    """Serves ``GET /metrics`` for Prometheus."""
+
+    daemon_threads = True
+
+    def __init__(self, address, metrics):
+        super().__init__(address, _MetricsHandler)
+        self.metrics = metrics
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, name='metrics', daemon=True).start()
+        return self
@@ -0,0 +1,286 @@
+"""One policy for every Bot API request: flood waits, retries and a circuit breaker.
+
+``OutboundSender.install(apihelper)`` routes telebot's request function
+through ``call``, so sends and edits from handlers, broadcasts, the media
+warmer and the scheduler all share it:
+
+- 429: the chat is paused for ``retry_after`` (every chat when several chats
+  are flooded at once or the request has no chat) and the request is retried;
+  flood waits do not use up attempts.
+- network errors, timeouts and 5xx: up to ``max_attempts`` tries with
+  full-jitter exponential backoff; repeated failures open the circuit breaker and requests fail fast
+  with ``CircuitOpenError`` until a trial request gets through.
+- anything else (400, 403, ...) is raised at once, as before.
+
+A blocking caller waits at most ``max_wait`` seconds in total. ``later`` runs a
+call on background workers instead (fire-and-forget): the handler returns at
+once, the call may wait out any flood or outage, and failures are logged.
+"""
+import asyncio
+import queue
+import random
+import threading
+import time
+from collections import deque
+
+from requests.exceptions import ConnectionError as RequestsConnectionError, Timeout
+
+from config import (
+    OUTBOUND_MAX_ATTEMPTS,
+    OUTBOUND_BACKOFF_BASE,
+    OUTBOUND_BACKOFF_MAX,
+    OUTBOUND_MAX_WAIT,
+    OUTBOUND_GLOBAL_FLOOD_CHATS,
+    OUTBOUND_BREAKER_FAILURES,
+    OUTBOUND_BREAKER_RESET,
+    OUTBOUND_WORKERS,
+    OUTBOUND_QUEUE_SIZE,
+)
+
+# long polling retries on its own; a getUpdates held back by a flood wait would only delay updates
+PASS_THROUGH = ('getUpdates',)
+
+TRANSIENT_ERRORS = (RequestsConnectionError, Timeout, TimeoutError)
+
+
+class CircuitOpenError(RequestsConnectionError):
+    """The Bot API kept failing; requests are refused until the breaker lets a trial through.
+
+    Only blocking callers see it; background callers (``later``, broadcast
+    workers) wait until the breaker lets a trial through.
+    """
+
+
+def error_status(exc):
+    """HTTP / Bot API error code of a telebot exception (sync or asyncio client), or None."""
+    code = getattr(exc, 'error_code', None)
+    if code is None:
+        code = getattr(getattr(exc, 'result', None), 'status_code', None)
+    return code if isinstance(code, int) else None
+
+
+def retry_after_seconds(exc):
+    """Seconds Telegram asked us to wait (HTTP 429), or None."""
+    if error_status(exc) == 429:
+        params = (getattr(exc, 'result_json', None) or {}).get('parameters') or {}
+        return float(params.get('retry_after') or 1)
+    return None
+
+
+def is_transient_error(exc, transient=TRANSIENT_ERRORS):
+    status = error_status(exc)
+    return isinstance(exc, transient) or (status is not None and status >= 500)
+
+
+class CircuitBreaker:
+    """Opens after `failures` transient errors in a row; after `reset_timeout` one trial request decides."""
+
+    def __init__(self, failures=OUTBOUND_BREAKER_FAILURES, reset_timeout=OUTBOUND_BREAKER_RESET):
+        self.failures = failures
+        self.reset_timeout = reset_timeout
+        self._errors = 0
+        self._open_until = 0.0
+        self._trial = False
+        self._lock = threading.Lock()
+
+    def wait(self):
+        """0 if a request may go now, else seconds until it may try again."""
+        with self._lock:
+            if self._errors < self.failures:
+                return 0
+            now = time.monotonic()
+            if now < self._open_until:
+                return self._open_until - now
+            if self._trial:
+                return 1.0
+            self._trial = True
+            return 0
+
+    def success(self):
+        with self._lock:
+            if self._errors >= self.failures:
+                print("Bot API снова доступен, отправка возобновлена")
+            self._errors = 0
+            self._trial = False
+
+    def failure(self):
+        with self._lock:
+            self._errors += 1
+            self._trial = False
+            if self._errors >= self.failures:
+                if self._errors == self.failures:
+                    print(f"Bot API недоступен ({self._errors} ошибок подряд), отправка приостановлена")
+                self._open_until = time.monotonic() + self.reset_timeout
+
+
+class OutboundSender:
+    """Shared flood pauses, retry policy and breaker; ``later`` workers are started on first use."""
+
+    def __init__(self, max_attempts=OUTBOUND_MAX_ATTEMPTS, backoff_base=OUTBOUND_BACKOFF_BASE,
+                 backoff_max=OUTBOUND_BACKOFF_MAX, max_wait=OUTBOUND_MAX_WAIT,
+                 global_flood_chats=OUTBOUND_GLOBAL_FLOOD_CHATS, workers=OUTBOUND_WORKERS,
+                 queue_size=OUTBOUND_QUEUE_SIZE, breaker=None):
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_wait = max_wait
+        self.global_flood_chats = global_flood_chats
+        self.breaker = breaker or CircuitBreaker()
+        self.workers = workers
+        self.queue_size = queue_size
+        self._paused_until = 0.0
+        self._chat_pauses = {}
+        self._floods = deque()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._queues = None
+
+    def install(self, apihelper):
+        """Route telebot's sync requests through ``call``."""
+        make_request = apihelper._make_request
+
+        def request(token, method_name, method='get', params=None, files=None):
+            if method_name in PASS_THROUGH:
+                return make_request(token, method_name, method, params, files)
+            # _make_request pops timeouts out of params, so every attempt gets a fresh copy
+            return self.call(
+                lambda: make_request(token, method_name, method, dict(params) if params else params, files),
+                chat=(params or {}).get('chat_id'),
+                files=files,
+            )
+
+        apihelper._make_request = request
+
+    def call(self, send, chat=None, files=None):
+        """``send()`` under the flood, retry and breaker policy."""
+        background = getattr(self._local, 'background', False)
+        deadline = None if background else time.monotonic() + self.max_wait
+        failures = 0
+        while True:
+            self._sleep(self._pause(chat), deadline)
+            blocked = self.breaker.wait()
+            if blocked:
+                if not background:
+                    raise CircuitOpenError("Bot API недоступен, запрос не отправлен")
+                time.sleep(blocked)
+                continue
+            try:
+                result = send()
+            except Exception as exc:
+                delay, failures = self._retry_delay(exc, chat, failures)
+                if (delay is None or failures >= self.max_attempts
+                        or (deadline is not None and time.monotonic() + delay > deadline)
+                        or not _rewind(files)):
+                    raise
+                time.sleep(delay)
+            else:
+                self.breaker.success()
+                return result
+
+    async def acall(self, send, chat=None, transient=TRANSIENT_ERRORS):
+        """``await send()`` under the same policy; used by async_runtime, waits as long as needed."""
+        failures = 0
+        while True:
+            pause = self._pause(chat)
+            if pause > 0:
+                await asyncio.sleep(pause)
+            blocked = self.breaker.wait()
+            if blocked:
+                await asyncio.sleep(blocked)
+                continue
+            try:
+                result = await send()
+            except Exception as exc:
+                delay, failures = self._retry_delay(exc, chat, failures, transient)
+                if delay is None or failures >= self.max_attempts:
+                    raise
+                await asyncio.sleep(delay)
+            else:
+                self.breaker.success()
+                return result
+
+    def background(self):
+        """Let calls from the current thread wait out floods and outages without ``max_wait``, like ``later``'s."""
+        self._local.background = True
+
+    def later(self, func, *args, **kwargs):
+        """Fire-and-forget ``func(*args, **kwargs)``; calls for one chat keep their order."""
+        if self._queues is None:
+            self._start()
+        key = kwargs.get('chat_id', args[0] if args else None)
+        self._queues[hash(key) % len(self._queues)].put((func, args, kwargs))
+
+    def _start(self):
+        with self._lock:
+            if self._queues is not None:
+                return
+            queues = [queue.Queue(maxsize=max(1, self.queue_size // self.workers)) for _ in range(self.workers)]
+            for i, q in enumerate(queues):
+                threading.Thread(target=self._worker_loop, args=(q,), name=f'outbound-{i}', daemon=True).start()
+            self._queues = queues
+
+    def _worker_loop(self, q):
+        self.background()
+        while True:
+            func, args, kwargs = q.get()
+            try:
+                func(*args, **kwargs)
+            except Exception as e:
+                print(f"Ошибка фоновой отправки {getattr(func, '__name__', func)}: {e}")
+
+    def _retry_delay(self, exc, chat, failures, transient=TRANSIENT_ERRORS):
+        """(seconds to wait before retrying `exc` or None to raise it, transient failures so far)."""
+        retry_after = retry_after_seconds(exc)
+        if retry_after is not None:
+            # Telegram answered, so it is up; the flood wait pauses the chat (or everyone)
+            self.breaker.success()
+            self._flooded(chat, retry_after)
+            return retry_after, failures
+        if is_transient_error(exc, transient):
+            self.breaker.failure()
+            failures += 1
+            return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (failures - 1))), failures
+        self.breaker.success()
+        return None, failures
+
+    def _flooded(self, chat, retry_after):
+        now = time.monotonic()
+        until = now + retry_after
+        with self._lock:
+            self._floods.append((now, chat))
+            while self._floods and self._floods[0][0] < now - 1:
+                self._floods.popleft()
+            chats = {c for _, c in self._floods}
+            if chat is None or len(chats) >= self.global_flood_chats:
+                self._paused_until = max(self._paused_until, until)
+            else:
+                if len(self._chat_pauses) > 10000:
+                    self._chat_pauses = {c: t for c, t in self._chat_pauses.items() if t > now}
+                self._chat_pauses[chat] = max(self._chat_pauses.get(chat, 0), until)
+
+    def _pause(self, chat):
+        """Seconds left of the global pause and `chat`'s own pause."""
+        now = time.monotonic()
+        until = self._paused_until
+        if chat is not None:
+            until = max(until, self._chat_pauses.get(chat, 0))
+        return until - now
+
+    @staticmethod
+    def _sleep(seconds, deadline):
+        # a blocking caller never waits past its budget; Telegram will answer 429 again if it is still too early
+        if deadline is not None:
+            seconds = min(seconds, deadline - time.monotonic())
+        if seconds > 0:
+            time.sleep(seconds)
+
+
+def _rewind(files):
+    """Seek uploaded file objects back to the start for another attempt; False if one cannot be."""
+    for value in (files or {}).values():
+        stream = value[1] if isinstance(value, tuple) else value
+        if hasattr(stream, 'read'):
+            if not hasattr(stream, 'seek'):
+                return False
+            stream.seek(0)
+    return True
@@ -0,0 +1,105 @@
+import re
+
+_TOKEN_RE = re.compile(r'<[^>]+>|[^_<]+')
+
+_CONVERTERS = {
+    'int': int,
+    'str': str,
+}
+
+
+class Route:
+    __slots__ = ('pattern', 'prefix', 'handler', 'params')
+
+    def __init__(self, pattern, prefix, handler, params):
+        self.pattern = pattern
+        self.prefix = prefix
+        self.handler = handler
+        self.params = params
+
+    def convert(self, values):
+        kwargs = {}
+        for (name, converter), value in zip(self.params, values):
+            kwargs[name] = converter(value)
+        return kwargs
+
+
+class _Node:
+    __slots__ = ('children', 'routes')
+
+    def __init__(self):
+        self.children = {}
+        # number of trailing arguments -> Route
+        self.routes = {}
+
+
+class CallbackRouter:
+    """Routes callback_data such as ``agenda_item_3_7`` to handlers in one pass.
+
+    Patterns are written as ``'agenda_item_<int:agenda_id>_<int:meeting_id>'``:
+    literal words form a trie keyed on the ``_``-separated prefix, placeholders
+    become keyword arguments of the handler. The longest literal prefix wins, so
+    ``admin_pdf_add_5`` never reaches the ``admin_pdf_<int:meeting_id>`` handler.
+    """
+
+    def __init__(self):
+        self._root = _Node()
+        self.routes = []
+
+    def add(self, pattern, handler):
+        literals = []
+        params = []
+        for token in _TOKEN_RE.findall(pattern):
+            if token.startswith('<'):
+                spec = token[1:-1]
+                kind, _, name = spec.rpartition(':')
+                params.append((name, _CONVERTERS[kind or 'str']))
+            elif params:
+                raise ValueError(f"Literal after placeholder in callback pattern {pattern!r}")
+            else:
+                literals.append(token)
+        node = self._root
+        for word in literals:
+            node = node.children.setdefault(word, _Node())
+        if len(params) in node.routes:
+            raise ValueError(f"Callback pattern {pattern!r} clashes with {node.routes[len(params)].pattern!r}")
+        route = Route(pattern, '_'.join(literals), handler, tuple(params))
+        node.routes[len(params)] = route
+        self.routes.append(route)
+        return route
+
+    def route(self, pattern):
+        def decorator(func):
+            self.add(pattern, func)
+            return func
+        return decorator
+
+    def resolve(self, data):
+        """Return ``(route, kwargs)`` for callback data, or ``None``."""
+        if not data:
+            return None
+        parts = data.split('_')
+        node = self._root
+        path = [node]
+        for word in parts:
+            node = node.children.get(word)
+            if node is None:
+                break
+            path.append(node)
+        for depth in range(len(path) - 1, -1, -1):
+            route = path[depth].routes.get(len(parts) - depth)
+            if route is None:
+                continue
+            try:
+                return route, route.convert(parts[depth:])
+            except ValueError:
+                continue
+        return None
+
+    def dispatch(self, call):
+        match = self.resolve(call.data)
+        if match is None:
+            return False
+        route, kwargs = match
+        route.handler(call, **kwargs)
+        return True
@@ -0,0 +1,29 @@
+"""Row types returned by database.py.
+
+namedtuples keep rows as compact as the plain tuples they replace (no per-row
+``__dict__``) and still index and unpack the same way, but give every column
+a name. The field order is the column order of the SELECTs in database.py.
+"""
+from collections import namedtuple
+
+User = namedtuple('User', 'user_id language name phone company is_admin')
+
+Meeting = namedtuple('Meeting', 'id name location date wifi_network wifi_password latitude longitude deadline ended pdf_file_id')
+
+Participant = namedtuple('Participant', 'user_id name phone company')
+
+AgendaItem = namedtuple('AgendaItem', 'id meeting_id title start_time end_time description')
+
+AlertAgendaItem = namedtuple('AlertAgendaItem', 'id meeting_id title start_time meeting_date meeting_name alerted_for')
+
+Question = namedtuple('Question', 'id meeting_id user_id question date')
+
+Feedback = namedtuple('Feedback', 'id meeting_id user_id rating feedback date')
+
+FeedbackStats = namedtuple('FeedbackStats', 'bad good neutral detailed')
+
+
+def columns(row_type, alias=None):
+    """SELECT list for `row_type`, optionally prefixed with a table alias."""
+    prefix = f"{alias}." if alias else ''
+    return ', '.join(prefix + field for field in row_type._fields)
@@ -0,0 +1,279 @@
+import heapq
+import itertools
+import threading
+import time
+from datetime import datetime
+
+from config import AGENDA_ALERT_LEAD, MEETING_PURGE_BATCH
+from database import (
+    get_alert_agenda_items,
+    claim_agenda_alert,
+    get_agenda_alert_recipients,
+    get_next_deadline,
+    get_due_meetings,
+    get_malformed_deadlines,
+    normalize_meeting_deadline,
+    mark_meeting_ended,
+    get_unpurged_meetings,
+    purge_meeting_batch,
+    transaction,
+)
+from texts import get_text
+
+DATE_FORMATS = ('%d.%m.%Y', '%Y-%m-%d', '%d/%m/%Y')
+TIME_FORMATS = ('%H:%M', '%H.%M', '%H:%M:%S')
+
+
+class Scheduler:
+    """One timer thread over a min-heap of ``(due, key)`` entries.
+
+    The thread sleeps until the earliest due time and is woken early only when
+    an entry moves ahead of it. Scheduling an existing key replaces its entry;
+    stale heap entries are skipped when they reach the top.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._entries = {}
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._started = False
+
+    def start(self):
+        if self._started:
+            return
+        self._started = True
+        threading.Thread(target=self._loop, name='scheduler', daemon=True).start()
+
+    def schedule(self, key, due, callback):
+        """Run ``callback()`` at unix time ``due`` (immediately if it has passed)."""
+        with self._cond:
+            seq = next(self._seq)
+            self._entries[key] = (due, seq, callback)
+            heapq.heappush(self._heap, (due, seq, key))
+            if len(self._heap) > 2 * len(self._entries) + 64:
+                self._compact()
+            if self._heap[0][1] == seq:
+                self._cond.notify()
+
+    def cancel(self, key):
+        with self._cond:
+            self._entries.pop(key, None)
+
+    def due(self, key):
+        with self._cond:
+            entry = self._entries.get(key)
+            return entry[0] if entry else None
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _compact(self):
+        self._heap = [(due, seq, key) for key, (due, seq, _) in self._entries.items()]
+        heapq.heapify(self._heap)
+
+    def _is_stale(self, seq, key):
+        entry = self._entries.get(key)
+        return entry is None or entry[1] != seq
+
+    def _next(self):
+        with self._cond:
+            while True:
+                while self._heap and self._is_stale(self._heap[0][1], self._heap[0][2]):
+                    heapq.heappop(self._heap)
+                if not self._heap:
+                    self._cond.wait()
+                    continue
+                due, seq, key = self._heap[0]
+                delay = due - time.time()
+                if delay > 0:
+                    self._cond.wait(delay)
+                    continue
+                heapq.heappop(self._heap)
+                return key, self._entries.pop(key)[2]
+
+    def _loop(self):
+        while True:
+            key, callback = self._next()
+            try:
+                callback()
+            except Exception as e:
+                print(f"Ошибка задачи планировщика {key}: {e}")
+
+
+def parse_date(text):
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime((text or '').strip(), fmt).date()
+        except ValueError:
+            pass
+    return None
+
+
+def parse_time(text):
+    for fmt in TIME_FORMATS:
+        try:
+            return datetime.strptime((text or '').strip(), fmt).time()
+        except ValueError:
+            pass
+    return None
+
+
+def parse_deadline(text):
+    """'YYYY-MM-DD HH:MM' or 'DD.MM.YYYY HH:MM' -> datetime, or None."""
+    day_text, _, time_text = (text or '').strip().partition(' ')
+    day = parse_date(day_text)
+    moment = parse_time(time_text)
+    if day is None or moment is None:
+        return None
+    return datetime.combine(day, moment)
+
+
+def format_deadline(moment):
+    # meetings.deadline is compared as text, so always store this layout
+    return moment.strftime('%Y-%m-%d %H:%M')
+
+
+def agenda_start(meeting_date, start_time):
+    """Unix time an agenda item starts, or None if the free-text date/time cannot be read."""
+    day = parse_date(meeting_date)
+    moment = parse_time(start_time)
+    if day is None or moment is None:
+        return None
+    return datetime.combine(day, moment).timestamp()
+
+
+class AgendaAlerts:
+    """Sends "starting soon" alerts to users subscribed to an agenda item.
+
+    Items are kept in the shared Scheduler keyed by agenda id; call
+    ``refresh`` after any change to an item, its meeting date or its
+    subscribers. The alert is claimed in the database (``agenda.alerted_for``)
+    in the same transaction that queues it in the broadcast outbox, so a
+    restart never sends it twice. Changing the start time re-arms the alert.
+    """
+
+    def __init__(self, scheduler, broadcasts, lead=AGENDA_ALERT_LEAD, resync_interval=600):
+        self.scheduler = scheduler
+        self.broadcasts = broadcasts
+        self.lead = lead
+        self.resync_interval = resync_interval
+
+    def load(self):
+        """Schedule every pending alert; repeats every `resync_interval` to pick up web admin edits."""
+        for row in get_alert_agenda_items():
+            self._schedule(row)
+        self.scheduler.schedule('agenda_resync', time.time() + self.resync_interval, self.load)
+
+    def refresh(self, agenda_id):
+        rows = get_alert_agenda_items(agenda_id=agenda_id)
+        if rows:
+            self._schedule(rows[0])
+        else:
+            self.scheduler.cancel(('agenda', agenda_id))
+
+    def refresh_meeting(self, meeting_id):
+        for row in get_alert_agenda_items(meeting_id=meeting_id):
+            self._schedule(row)
+
+    def _schedule(self, item):
+        agenda_id = item.id
+        key = ('agenda', agenda_id)
+        alert_key = f"{item.meeting_date} {item.start_time}"
+        start = agenda_start(item.meeting_date, item.start_time)
+        if start is None or item.alerted_for == alert_key or start <= time.time():
+            self.scheduler.cancel(key)
+            return
+        self.scheduler.schedule(key, start - self.lead, lambda: self._fire(agenda_id, alert_key))
+
+    def _fire(self, agenda_id, alert_key):
+        rows = get_alert_agenda_items(agenda_id=agenda_id)
+        if not rows:
+            return
+        item = rows[0]
+        if f"{item.meeting_date} {item.start_time}" != alert_key:
+            # edited after being scheduled; refresh() has already re-armed it
+            return
+        with transaction():
+            if not claim_agenda_alert(agenda_id, alert_key):
+                return
+            messages = []
+            for user_id, lang in get_agenda_alert_recipients(agenda_id):
+                text = get_text(lang or 'en', 'agenda_alert_notice', start_time=item.start_time, title=item.title or '', meeting=item.meeting_name or '')
+                messages.append((user_id, text, None))
+            if messages:
+                self.broadcasts.submit('agenda_alert', messages)
+
+
+class DeadlineWatcher:
+    """Finishes meetings whose ``meetings.deadline`` has passed.
+
+    Holds a single Scheduler entry for the nearest deadline (one indexed
+    MIN() query) and calls ``on_finish(meeting_id)`` for every meeting it
+    ends, inside the transaction that ends it, so a survey queued there is
+    never lost. Call ``refresh`` after a deadline changes; it also re-checks
+    every `resync_interval` seconds for deadlines set from the web admin.
+    Deadlines are compared as text, so any not stored as 'YYYY-MM-DD HH:MM'
+    are rewritten in that layout first; unreadable ones are logged and skipped.
+    """
+
+    def __init__(self, scheduler, on_finish, resync_interval=600):
+        self.scheduler = scheduler
+        self.on_finish = on_finish
+        self.resync_interval = resync_interval
+        self._unreadable = set()
+
+    def refresh(self):
+        self._normalize()
+        due = time.time() + self.resync_interval
+        moment = parse_deadline(get_next_deadline())
+        if moment is not None:
+            due = min(due, moment.timestamp())
+        self.scheduler.schedule('deadlines', due, self._fire)
+
+    def _normalize(self):
+        """Rewrite deadlines set outside /deadline in the text-comparable layout; unreadable ones are skipped."""
+        for meeting_id, deadline in get_malformed_deadlines():
+            moment = parse_deadline(deadline)
+            if moment is not None:
+                normalize_meeting_deadline(meeting_id, deadline, format_deadline(moment))
+            elif (meeting_id, deadline) not in self._unreadable:
+                self._unreadable.add((meeting_id, deadline))
+                print(f"Не удалось разобрать дедлайн встречи {meeting_id}: {deadline!r}, пропускаю")
+
+    def _fire(self):
+        try:
+            now_iso = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            for meeting in get_due_meetings(now_iso):
+                # on_finish queues its outbox rows in this transaction, so no meeting ends without them
+                with transaction():
+                    # False when an admin finished it by hand in the meantime
+                    if mark_meeting_ended(meeting.id):
+                        self.on_finish(meeting.id)
+        finally:
+            self.refresh()
+
+
+class MeetingPurger:
+    """Clears the rows of meetings removed with ``archive_meeting``.
+
+    Each run deletes at most `batch` rows per table in one short transaction
+    and re-schedules itself after `pause` seconds, so the bot and the web admin
+    get the write lock between batches even while a huge meeting is purged.
+    """
+
+    def __init__(self, scheduler, batch=MEETING_PURGE_BATCH, pause=0.05):
+        self.scheduler = scheduler
+        self.batch = batch
+        self.pause = pause
+
+    def load(self):
+        for meeting_id in get_unpurged_meetings():
+            self.purge(meeting_id)
+
+    def purge(self, meeting_id, delay=0):
+        self.scheduler.schedule(('purge', meeting_id), time.time() + delay, lambda: self._fire(meeting_id))
+
+    def _fire(self, meeting_id):
+        if purge_meeting_batch(meeting_id, self.batch):
+            self.purge(meeting_id, self.pause)
@@ -0,0 +1,368 @@
+"""Versioned schema migrations for event_bot.db.
+
+Each migration runs once, in its own transaction, and is recorded in the
+``schema_version`` table. Migrations are written to be idempotent so a
+database created by the old ``CREATE TABLE IF NOT EXISTS`` initializer
+upgrades cleanly from version 0. To change the schema, append a new
+migration; never edit one that has shipped.
+"""
+import sqlite3
+
+
+def _columns(conn, table):
+    return {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def _add_columns(conn, table, columns):
+    existing = _columns(conn, table)
+    for name, decl in columns:
+        if name not in existing:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {decl}")
+
+
+def _0001_base_tables(conn):
+    conn.execute('''CREATE TABLE IF NOT EXISTS users (
+                        user_id INTEGER PRIMARY KEY,
+                        language TEXT DEFAULT 'en',
+                        name TEXT,
+                        phone TEXT,
+                        company TEXT,
+                        is_admin INTEGER DEFAULT 0
+                    )''')
+
+    conn.execute('''CREATE TABLE IF NOT EXISTS meetings (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        name TEXT NOT NULL,
+                        location TEXT,
+                        date TEXT,
+                        wifi_network TEXT,
+                        wifi_password TEXT,
+                        latitude REAL,
+                        longitude REAL
+                    )''')
+
+    conn.execute('''CREATE TABLE IF NOT EXISTS participants (
+                        meeting_id INTEGER,
+                        user_id INTEGER,
+                        PRIMARY KEY (meeting_id, user_id),
+                        FOREIGN KEY (meeting_id) REFERENCES meetings(id)
+                    )''')
+
+    conn.execute('''CREATE TABLE IF NOT EXISTS agenda (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        meeting_id INTEGER,
+                        title TEXT,
+                        start_time TEXT,
+                        end_time TEXT,
+                        description TEXT,
+                        FOREIGN KEY (meeting_id) REFERENCES meetings(id)
+                    )''')
+
+    conn.execute('''CREATE TABLE IF NOT EXISTS agenda_alerts (
+                        agenda_id INTEGER,
+                        user_id INTEGER,
+                        PRIMARY KEY (agenda_id, user_id),
+                        FOREIGN KEY (agenda_id) REFERENCES agenda(id)
+                    )''')
+
+    conn.execute('''CREATE TABLE IF NOT EXISTS questions (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        meeting_id INTEGER,
+                        user_id INTEGER,
+                        question TEXT,
+                        date TEXT DEFAULT (datetime('now')),
+                        FOREIGN KEY (meeting_id) REFERENCES meetings(id)
+                    )''')
+
+    conn.execute('''CREATE TABLE IF NOT EXISTS photos (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        meeting_id INTEGER,
+                        file_id TEXT,
+                        FOREIGN KEY (meeting_id) REFERENCES meetings(id)
+                    )''')
+
+    conn.execute('''CREATE TABLE IF NOT EXISTS feedback (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        meeting_id INTEGER,
+                        user_id INTEGER,
+                        rating TEXT,
+                        feedback TEXT,
+                        date TEXT DEFAULT (datetime('now')),
+                        FOREIGN KEY (meeting_id) REFERENCES meetings(id)
+                    )''')
+
+
+def _0002_legacy_columns(conn):
+    _add_columns(conn, 'photos', [('file_id', 'TEXT')])
+    _add_columns(conn, 'meetings', [
+        ('latitude', 'REAL'),
+        ('longitude', 'REAL'),
+        ('deadline', 'TEXT'),
+        ('ended', 'INTEGER DEFAULT 0'),
+        ('pdf_file_id', 'TEXT'),
+    ])
+    _add_columns(conn, 'agenda', [
+        ('title', 'TEXT'),
+        ('start_time', 'TEXT'),
+        ('end_time', 'TEXT'),
+    ])
+
+
+def _0003_unique_participants(conn):
+    # databases from before the composite primary key may hold duplicates
+    conn.execute("DELETE FROM participants WHERE rowid NOT IN (SELECT MIN(rowid) FROM participants GROUP BY meeting_id, user_id)")
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_participants_unique ON participants(meeting_id, user_id)")
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_agenda_alerts ON agenda_alerts(agenda_id, user_id)")
+
+
+def _0004_broadcast_outbox(conn):
+    conn.execute('''CREATE TABLE IF NOT EXISTS broadcasts (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        kind TEXT,
+                        admin_chat_id INTEGER,
+                        progress_message_id INTEGER,
+                        lang TEXT,
+                        finished INTEGER DEFAULT 0,
+                        created_at TEXT DEFAULT (datetime('now'))
+                    )''')
+
+    conn.execute('''CREATE TABLE IF NOT EXISTS outbox (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        broadcast_id INTEGER,
+                        chat_id INTEGER,
+                        text TEXT,
+                        reply_markup TEXT,
+                        status TEXT DEFAULT 'pending',
+                        attempts INTEGER DEFAULT 0,
+                        next_attempt_at REAL DEFAULT 0,
+                        error TEXT,
+                        FOREIGN KEY (broadcast_id) REFERENCES broadcasts(id)
+                    )''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox(status, next_attempt_at)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_outbox_broadcast ON outbox(broadcast_id, status)")
+
+
+def _0005_media_file_ids(conn):
+    conn.execute('''CREATE TABLE IF NOT EXISTS media_file_ids (
+                        path TEXT PRIMARY KEY,
+                        file_id TEXT NOT NULL,
+                        kind TEXT,
+                        created_at TEXT DEFAULT (datetime('now'))
+                    )''')
+
+
+def _0006_user_states(conn):
+    conn.execute('''CREATE TABLE IF NOT EXISTS user_states (
+                        user_id INTEGER PRIMARY KEY,
+                        data TEXT NOT NULL,
+                        expires_at REAL NOT NULL
+                    )''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_user_states_expires ON user_states(expires_at)")
+
+
+def _0007_agenda_alerted_for(conn):
+    _add_columns(conn, 'agenda', [('alerted_for', 'TEXT')])
+
+
+def _0008_lookup_indexes(conn):
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_agenda_meeting ON agenda(meeting_id, start_time)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_photos_meeting ON photos(meeting_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_questions_meeting ON questions(meeting_id, date)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_feedback_meeting ON feedback(meeting_id, date)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_participants_user ON participants(user_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_meetings_deadline ON meetings(ended, deadline)")
+
+
+def _0009_feedback_stats(conn):
+    conn.execute('''CREATE TABLE IF NOT EXISTS feedback_stats (
+                        meeting_id INTEGER PRIMARY KEY,
+                        bad INTEGER NOT NULL DEFAULT 0,
+                        good INTEGER NOT NULL DEFAULT 0,
+                        neutral INTEGER NOT NULL DEFAULT 0,
+                        detailed INTEGER NOT NULL DEFAULT 0
+                    )''')
+    # triggers rather than add_feedback, so rows the web admin edits or deletes are counted too
+    conn.execute('''CREATE TRIGGER IF NOT EXISTS feedback_stats_insert AFTER INSERT ON feedback BEGIN
+                        INSERT OR IGNORE INTO feedback_stats (meeting_id) VALUES (NEW.meeting_id);
+                        UPDATE feedback_stats SET bad = bad + (NEW.rating IS 'bad'),
+                                                  good = good + (NEW.rating IS 'good'),
+                                                  neutral = neutral + (NEW.rating IS 'neutral'),
+                                                  detailed = detailed + (IFNULL(NEW.feedback, '') <> '')
+                        WHERE meeting_id IS NEW.meeting_id;
+                    END''')
+    conn.execute('''CREATE TRIGGER IF NOT EXISTS feedback_stats_delete AFTER DELETE ON feedback BEGIN
+                        UPDATE feedback_stats SET bad = bad - (OLD.rating IS 'bad'),
+                                                  good = good - (OLD.rating IS 'good'),
+                                                  neutral = neutral - (OLD.rating IS 'neutral'),
+                                                  detailed = detailed - (IFNULL(OLD.feedback, '') <> '')
+                        WHERE meeting_id IS OLD.meeting_id;
+                    END''')
+    conn.execute('''CREATE TRIGGER IF NOT EXISTS feedback_stats_update AFTER UPDATE OF meeting_id, rating, feedback ON feedback BEGIN
+                        UPDATE feedback_stats SET bad = bad - (OLD.rating IS 'bad'),
+                                                  good = good - (OLD.rating IS 'good'),
+                                                  neutral = neutral - (OLD.rating IS 'neutral'),
+                                                  detailed = detailed - (IFNULL(OLD.feedback, '') <> '')
+                        WHERE meeting_id IS OLD.meeting_id;
+                        INSERT OR IGNORE INTO feedback_stats (meeting_id) VALUES (NEW.meeting_id);
+                        UPDATE feedback_stats SET bad = bad + (NEW.rating IS 'bad'),
+                                                  good = good + (NEW.rating IS 'good'),
+                                                  neutral = neutral + (NEW.rating IS 'neutral'),
+                                                  detailed = detailed + (IFNULL(NEW.feedback, '') <> '')
+                        WHERE meeting_id IS NEW.meeting_id;
+                    END''')
+    conn.execute("DELETE FROM feedback_stats")
+    conn.execute('''INSERT INTO feedback_stats (meeting_id, bad, good, neutral, detailed)
+                    SELECT meeting_id,
+                           SUM(rating IS 'bad'), SUM(rating IS 'good'), SUM(rating IS 'neutral'),
+                           SUM(IFNULL(feedback, '') <> '')
+                    FROM feedback
+                    WHERE meeting_id IS NOT NULL
+                    GROUP BY meeting_id''')
+    # detailed comments only, so a page of them never walks over rating-only rows
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_feedback_detailed ON feedback(meeting_id, date) WHERE feedback <> ''")
+
+
+def _fts_mirror(conn, table, column):
+    """External-content FTS5 index ``<table>_fts`` over one text column, kept in sync by triggers."""
+    fts = f"{table}_fts"
+    conn.execute(f"""CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+                        {column}, content='{table}', content_rowid='id',
+                        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+                    )""")
+    conn.execute(f"""CREATE TRIGGER IF NOT EXISTS {fts}_insert AFTER INSERT ON {table} BEGIN
+                        INSERT INTO {fts} (rowid, {column}) VALUES (NEW.id, NEW.{column});
+                    END""")
+    conn.execute(f"""CREATE TRIGGER IF NOT EXISTS {fts}_delete AFTER DELETE ON {table} BEGIN
+                        INSERT INTO {fts} ({fts}, rowid, {column}) VALUES ('delete', OLD.id, OLD.{column});
+                    END""")
+    conn.execute(f"""CREATE TRIGGER IF NOT EXISTS {fts}_update AFTER UPDATE OF {column} ON {table} BEGIN
+                        INSERT INTO {fts} ({fts}, rowid, {column}) VALUES ('delete', OLD.id, OLD.{column});
+                        INSERT INTO {fts} (rowid, {column}) VALUES (NEW.id, NEW.{column});
+                    END""")
+    conn.execute(f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')")
+
+
+def _0010_full_text_search(conn):
+    _fts_mirror(conn, 'questions', 'question')
+    _fts_mirror(conn, 'feedback', 'feedback')
+
+
+def _0011_meeting_cascade(conn):
+    # meetings deleted in archive mode: hidden at once, their rows purged later in small batches
+    conn.execute('''CREATE TABLE IF NOT EXISTS deleted_meetings (
+                        id INTEGER PRIMARY KEY,
+                        name TEXT,
+                        date TEXT,
+                        deleted_at TEXT DEFAULT (datetime('now')),
+                        purged INTEGER DEFAULT 0
+                    )''')
+    # triggers instead of ON DELETE CASCADE: SQLite cannot alter the existing foreign keys,
+    # and the web admin deletes meetings without foreign_keys enabled
+    conn.execute('''CREATE TRIGGER IF NOT EXISTS meetings_cascade_delete AFTER DELETE ON meetings
+                    WHEN NOT EXISTS (SELECT 1 FROM deleted_meetings WHERE id = OLD.id) BEGIN
+                        DELETE FROM participants WHERE meeting_id = OLD.id;
+                        DELETE FROM photos WHERE meeting_id = OLD.id;
+                        DELETE FROM questions WHERE meeting_id = OLD.id;
+                        DELETE FROM agenda WHERE meeting_id = OLD.id;
+                        DELETE FROM feedback WHERE meeting_id = OLD.id;
+                        DELETE FROM feedback_stats WHERE meeting_id = OLD.id;
+                    END''')
+    conn.execute('''CREATE TRIGGER IF NOT EXISTS agenda_cascade_delete AFTER DELETE ON agenda BEGIN
+                        DELETE FROM agenda_alerts WHERE agenda_id = OLD.id;
+                    END''')
+    # rows left behind by the old delete_meeting
+    conn.execute("DELETE FROM agenda WHERE meeting_id NOT IN (SELECT id FROM meetings)")
+    conn.execute("DELETE FROM agenda_alerts WHERE agenda_id NOT IN (SELECT id FROM agenda)")
+    conn.execute("DELETE FROM feedback WHERE meeting_id NOT IN (SELECT id FROM meetings)")
+    conn.execute("DELETE FROM feedback_stats WHERE meeting_id NOT IN (SELECT id FROM meetings)")
+
+
+def _media_refs_triggers(conn, table, column):
+    """Count the ``file://`` values of ``table.column`` in ``media_refs``."""
+    conn.execute(f"""CREATE TRIGGER IF NOT EXISTS {table}_media_refs_insert AFTER INSERT ON {table}
+                    WHEN NEW.{column} LIKE 'file://%' BEGIN
+                        INSERT OR IGNORE INTO media_refs (path) VALUES (NEW.{column});
+                        UPDATE media_refs SET refs = refs + 1 WHERE path = NEW.{column};
+                    END""")
+    conn.execute(f"""CREATE TRIGGER IF NOT EXISTS {table}_media_refs_delete AFTER DELETE ON {table}
+                    WHEN OLD.{column} LIKE 'file://%' BEGIN
+                        UPDATE media_refs SET refs = refs - 1 WHERE path = OLD.{column};
+                    END""")
+    conn.execute(f"""CREATE TRIGGER IF NOT EXISTS {table}_media_refs_update AFTER UPDATE OF {column} ON {table}
+                    WHEN OLD.{column} IS NOT NEW.{column} BEGIN
+                        UPDATE media_refs SET refs = refs - 1 WHERE path = OLD.{column};
+                        INSERT OR IGNORE INTO media_refs (path) SELECT NEW.{column} WHERE NEW.{column} LIKE 'file://%';
+                        UPDATE media_refs SET refs = refs + 1 WHERE path = NEW.{column};
+                    END""")
+
+
+def _0012_media_refs(conn):
+    # references to local media from photos and meeting PDFs, so media_store.collect
+    # can tell unused files without reading those tables; kept by triggers like feedback_stats
+    conn.execute('''CREATE TABLE IF NOT EXISTS media_refs (
+                        path TEXT PRIMARY KEY,
+                        refs INTEGER NOT NULL DEFAULT 0
+                    )''')
+    _media_refs_triggers(conn, 'photos', 'file_id')
+    _media_refs_triggers(conn, 'meetings', 'pdf_file_id')
+    conn.execute("DELETE FROM media_refs")
+    conn.execute('''INSERT INTO media_refs (path, refs)
+                    SELECT path, COUNT(*) FROM (
+                        SELECT file_id AS path FROM photos WHERE file_id LIKE 'file://%'
+                        UNION ALL
+                        SELECT pdf_file_id FROM meetings WHERE pdf_file_id LIKE 'file://%'
+                    )
+                    GROUP BY path''')
+
+
+MIGRATIONS = [
+    (1, 'base tables', _0001_base_tables),
+    (2, 'legacy columns', _0002_legacy_columns),
+    (3, 'unique participants', _0003_unique_participants),
+    (4, 'broadcast outbox', _0004_broadcast_outbox),
+    (5, 'media file ids', _0005_media_file_ids),
+    (6, 'user states', _0006_user_states),
+    (7, 'agenda alerted_for', _0007_agenda_alerted_for),
+    (8, 'lookup indexes', _0008_lookup_indexes),
+    (9, 'feedback stats', _0009_feedback_stats),
+    (10, 'full-text search', _0010_full_text_search),
+    (11, 'meeting cascade delete', _0011_meeting_cascade),
+    (12, 'media refs', _0012_media_refs),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def current_version(conn):
+    try:
+        return conn.execute("SELECT MAX(version) FROM schema_version").fetchone()[0] or 0
+    except sqlite3.OperationalError:
+        # no schema_version table yet
+        return 0
+
+
+def migrate(conn):
+    """Apply pending migrations on a connection with isolation_level=None; returns the versions applied."""
+    if current_version(conn) >= LATEST_VERSION:
+        return []
+    applied = []
+    for version, name, apply in MIGRATIONS:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute('''CREATE TABLE IF NOT EXISTS schema_version (
+                                version INTEGER PRIMARY KEY,
+                                name TEXT NOT NULL,
+                                applied_at TEXT DEFAULT (datetime('now'))
+                            )''')
+            # another process may have migrated while we waited for the lock
+            if current_version(conn) >= version:
+                conn.rollback()
+                continue
+            apply(conn)
+            conn.execute("INSERT INTO schema_version (version, name) VALUES (?, ?)", (version, name))
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+        applied.append(version)
+    return applied
@@ -0,0 +1,134 @@
+import threading
+import time
+from collections import OrderedDict
+
+from config import STATE_BACKEND, STATE_TTL, STATE_MAX_USERS
+from database import get_user_state, set_user_state, update_user_state, pop_user_state, purge_user_states
+
+
+class _StateStore:
+    """Dict-like access on top of get/set/update/pop.
+
+    States are plain dicts and are returned as copies: change them with
+    ``update`` (or assign a new dict), never by mutating the returned value.
+    Deleting a missing or expired state is a no-op.
+    """
+
+    def __getitem__(self, user_id):
+        state = self.get(user_id)
+        if state is None:
+            raise KeyError(user_id)
+        return state
+
+    def __setitem__(self, user_id, state):
+        self.set(user_id, state)
+
+    def __delitem__(self, user_id):
+        self.pop(user_id)
+
+    def __contains__(self, user_id):
+        return self.get(user_id) is not None
+
+
+class MemoryStateStore(_StateStore):
+    """Per-process store; a state expires `ttl` seconds after its last write, LRU beyond `maxsize`."""
+
+    def __init__(self, ttl=STATE_TTL, maxsize=STATE_MAX_USERS, purge_interval=300):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.purge_interval = purge_interval
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._last_purge = time.monotonic()
+
+    def _live(self, user_id, now):
+        entry = self._data.get(user_id)
+        if entry is None:
+            return None
+        if entry[1] <= now:
+            del self._data[user_id]
+            return None
+        self._data.move_to_end(user_id)
+        return entry[0]
+
+    def get(self, user_id, default=None):
+        with self._lock:
+            state = self._live(user_id, time.monotonic())
+        return dict(state) if state is not None else default
+
+    def set(self, user_id, state):
+        now = time.monotonic()
+        with self._lock:
+            self._data[user_id] = (dict(state), now + self.ttl)
+            self._data.move_to_end(user_id)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        if now - self._last_purge > self.purge_interval:
+            self.purge()
+
+    def update(self, user_id, **fields):
+        now = time.monotonic()
+        with self._lock:
+            state = self._live(user_id, now)
+            if state is None:
+                return None
+            state = dict(state, **fields)
+            self._data[user_id] = (state, now + self.ttl)
+        return dict(state)
+
+    def pop(self, user_id, default=None):
+        with self._lock:
+            state = self._live(user_id, time.monotonic())
+            self._data.pop(user_id, None)
+        return state if state is not None else default
+
+    def purge(self):
+        now = self._last_purge = time.monotonic()
+        with self._lock:
+            expired = [user_id for user_id, (_, expires_at) in self._data.items() if expires_at <= now]
+            for user_id in expired:
+                del self._data[user_id]
+        return len(expired)
+
+
+class SQLiteStateStore(_StateStore):
+    """States in the ``user_states`` table: shared by every bot process and kept across restarts.
+
+    ``update`` and ``pop`` are single transactions, so two workers never
+    interleave a read-modify-write of the same user's state.
+    """
+
+    def __init__(self, ttl=STATE_TTL, purge_interval=300):
+        self.ttl = ttl
+        self.purge_interval = purge_interval
+        self._last_purge = 0.0
+
+    def get(self, user_id, default=None):
+        state = get_user_state(user_id, time.time())
+        return state if state is not None else default
+
+    def set(self, user_id, state):
+        now = time.time()
+        set_user_state(user_id, state, now + self.ttl)
+        if now - self._last_purge > self.purge_interval:
+            self.purge()
+
+    def update(self, user_id, **fields):
+        now = time.time()
+        return update_user_state(user_id, fields, now, now + self.ttl)
+
+    def pop(self, user_id, default=None):
+        state = pop_user_state(user_id, time.time())
+        return state if state is not None else default
+
+    def purge(self):
+        self._last_purge = time.time()
+        return purge_user_states(self._last_purge)
+
+
+def create_state_store(backend=STATE_BACKEND):
+    if backend == 'sqlite':
+        return SQLiteStateStore()
+    if backend == 'memory':
+        return MemoryStateStore()
+    raise ValueError(f"Unknown STATE_BACKEND {backend!r}")
@@ -161,7 +161,20 @@ TEXTS = {
         'admin_agenda': '📋 Agenda',
         'admin_pdf': '📄 PDF',
         'admin_finish_meeting': '✅ Finish meeting',
-        'admin_delete_meeting': '🗑 Delete meeting'
+        'admin_delete_meeting': '🗑 Delete meeting',
+        'broadcast_progress': '📤 Sending: {sent}/{total}, failed: {failed}',
+        'broadcast_done': '📢 Notification sent.\n✅ Delivered: {sent}\n❌ Failed: {failed}',
+        'agenda_alert_notice': '🔔 Starting at {start_time}: {title}\n📍 {meeting}',
+        'admin_only': '⛔ Admins only. Log in with /admin.',
+        'deadline_usage': 'Usage: /deadline <meeting id> <YYYY-MM-DD HH:MM>\nTurn off: /deadline <meeting id> off',
+        'deadline_scheduled': '⏰ "{meeting}" will finish automatically at {deadline}.',
+        'deadline_cleared': '⏰ Automatic finish for "{meeting}" is off.',
+        'search_usage': 'Usage: /search <words>\nSearches questions and feedback comments of all meetings.',
+        'search_no_results': '🔎 Nothing found for «{query}».',
+        'search_questions': '❓ Questions',
+        'search_feedback': '💬 Feedback',
+        'stats_title': '📊 Handlers, last {minutes} min\nroute ×updates · p50/p95/max ms · per update: db calls · SQL · API',
+        'stats_empty': 'No updates handled in the last {minutes} min.'
     },
     
     'ru': {
@@ -325,7 +338,20 @@ TEXTS = {
         'admin_agenda': '📋 Повестка дня',
         'admin_pdf': '📄 PDF',
         'admin_finish_meeting': '✅ Завершить встречу',
-        'admin_delete_meeting': '🗑 Удалить встречу'
+        'admin_delete_meeting': '🗑 Удалить встречу',
+        'broadcast_progress': '📤 Отправка: {sent}/{total}, ошибок: {failed}',
+        'broadcast_done': '📢 Уведомление отправлено.\n✅ Доставлено: {sent}\n❌ Ошибок: {failed}',
+        'agenda_alert_notice': '🔔 Начало в {start_time}: {title}\n📍 {meeting}',
+        'admin_only': '⛔ Только для администраторов. Войдите через /admin.',
+        'deadline_usage': 'Использование: /deadline <id встречи> <ГГГГ-ММ-ДД ЧЧ:ММ>\nОтключить: /deadline <id встречи> off',
+        'deadline_scheduled': '⏰ Встреча "{meeting}" завершится автоматически {deadline}.',
+        'deadline_cleared': '⏰ Автозавершение встречи "{meeting}" отключено.',
+        'search_usage': 'Использование: /search <слова>\nИщет по вопросам и отзывам всех встреч.',
+        'search_no_results': '🔎 По запросу «{query}» ничего не найдено.',
+        'search_questions': '❓ Вопросы',
+        'search_feedback': '💬 Отзывы',
+        'stats_title': '📊 Обработчики за {minutes} мин\nмаршрут ×обновлений · p50/p95/max мс · на обновление: вызовы БД · SQL · API',
+        'stats_empty': 'За последние {minutes} мин обновлений не было.'
     },
     
     'uz': {
@@ -489,7 +515,20 @@ TEXTS = {
         'admin_agenda': '📋 Kun tartibi',
         'admin_pdf': '📄 PDF',
         'admin_finish_meeting': '✅ Uchrashuvni yakunlash',
-        'admin_delete_meeting': '🗑 Uchrashuvni o‘chirish'
+        'admin_delete_meeting': '🗑 Uchrashuvni o‘chirish',
+        'broadcast_progress': '📤 Yuborilmoqda: {sent}/{total}, xatolar: {failed}',
+        'broadcast_done': '📢 Xabar yuborildi.\n✅ Yetkazildi: {sent}\n❌ Xatolar: {failed}',
+        'agenda_alert_notice': '🔔 {start_time} da boshlanadi: {title}\n📍 {meeting}',
+        'admin_only': '⛔ Faqat administratorlar uchun. /admin orqali kiring.',
+        'deadline_usage': "Foydalanish: /deadline <uchrashuv id> <YYYY-MM-DD HH:MM>\nO'chirish: /deadline <uchrashuv id> off",
+        'deadline_scheduled': '⏰ "{meeting}" {deadline} da avtomatik yakunlanadi.',
+        'deadline_cleared': '⏰ "{meeting}" uchun avtomatik yakunlash o\'chirildi.',
+        'search_usage': "Foydalanish: /search <so'zlar>\nBarcha uchrashuvlarning savollari va fikrlari bo'yicha qidiradi.",
+        'search_no_results': "🔎 «{query}» bo'yicha hech narsa topilmadi.",
+        'search_questions': '❓ Savollar',
+        'search_feedback': '💬 Fikrlar',
+        'stats_title': "📊 Ishlovchilar, oxirgi {minutes} daqiqa\nyo'nalish ×yangilanishlar · p50/p95/max ms · har biriga: DB chaqiruvlar · SQL · API",
+        'stats_empty': "Oxirgi {minutes} daqiqada yangilanishlar bo'lmadi."
     }
 }
 
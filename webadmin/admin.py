@@ -1,11 +1,16 @@
 from django import forms
 from django.contrib import admin
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.widgets import AutocompleteSelect
 from django.core.exceptions import ValidationError
+from django.db.models.expressions import RawSQL
 from django.urls import reverse
 from django.utils.html import format_html
 from django.contrib.auth.models import Group, User
 import os
-import uuid
+
+import media_store
+from database import fts_query
 
 from .models import Meeting, ActiveMeeting, CompletedMeeting, Agenda, Photo, Question, Feedback, BotUser
 
@@ -24,16 +29,7 @@ try:
 except Exception:
     pass
 
-def _ensure_dir(path):
-    try:
-        os.makedirs(path, exist_ok=True)
-    except Exception:
-        pass
-
-def _save_local(uploaded_file, subdir, allowed_exts=None):
-    base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
-    media_dir = os.path.join(base_dir, 'media', subdir)
-    _ensure_dir(media_dir)
+def _save_local(uploaded_file, allowed_exts=None):
     name = (uploaded_file.name or '').lower()
     ext = os.path.splitext(name)[1]
     if allowed_exts and ext.lower() not in allowed_exts:
@@ -41,36 +37,22 @@ def _save_local(uploaded_file, subdir, allowed_exts=None):
         ct = getattr(uploaded_file, 'content_type', '') or ''
         if '.pdf' in allowed_exts and ct != 'application/pdf':
             raise ValidationError('Unsupported file type.')
-    filename = f"{uuid.uuid4().hex}{ext or ''}"
-    full_path = os.path.join(media_dir, filename)
-    total = 0
     try:
         uploaded_file.seek(0)
     except Exception:
         pass
-    with open(full_path, 'wb') as dst:
-        if hasattr(uploaded_file, 'chunks'):
-            for chunk in uploaded_file.chunks():
-                total += len(chunk)
-                dst.write(chunk)
-        else:
-            data = uploaded_file.read()
-            total = len(data)
-            dst.write(data)
-    if total <= 0:
-        try:
-            os.remove(full_path)
-        except Exception:
-            pass
-        raise ValidationError('Uploaded file is empty.')
-    rel_path = os.path.join('media', subdir, filename).replace('\\', '/')
-    return f"file://{rel_path}"
+    chunks = uploaded_file.chunks() if hasattr(uploaded_file, 'chunks') else [uploaded_file.read()]
+    try:
+        # same bytes, same file: re-uploads for other meetings are not stored twice
+        return media_store.store(chunks, ext)
+    except ValueError as e:
+        raise ValidationError(str(e))
 
 def _telegram_send_photo(uploaded_file):
-    return _save_local(uploaded_file, 'photos')
+    return _save_local(uploaded_file)
 
 def _telegram_send_document(uploaded_file):
-    return _save_local(uploaded_file, 'pdfs', allowed_exts={'.pdf'})
+    return _save_local(uploaded_file, allowed_exts={'.pdf'})
 
 class MeetingAdminForm(forms.ModelForm):
     pdf_upload = forms.FileField(required=False)
@@ -92,7 +74,7 @@ class MeetingAdminForm(forms.ModelForm):
         instance = super().save(commit=False)
         pdf_upload = self.cleaned_data.get('pdf_upload')
         if pdf_upload:
-            instance.pdf_file_id = _save_local(pdf_upload, 'pdfs', allowed_exts={'.pdf'})
+            instance.pdf_file_id = _save_local(pdf_upload, allowed_exts={'.pdf'})
         if commit:
             instance.save()
         return instance
@@ -181,25 +163,96 @@ class BotUserAdmin(admin.ModelAdmin):
     # Read only usually for bot users
     readonly_fields = ('user_id', 'name', 'phone', 'company', 'language', 'is_admin')
 
+    def get_queryset(self, request):
+        # one GROUP_CONCAT subquery per page instead of a query per row
+        return super().get_queryset(request).with_subscribed_meetings()
+
+@admin.register(Meeting)
+class MeetingAdmin(BaseMeetingAdmin):
+    """Every meeting; hidden from the index (see Active/Completed), it serves the meeting autocomplete."""
+    ordering = ('-id',)
+
+    def get_model_perms(self, request):
+        return {}
+
+def _meeting_widget(model, admin_site):
+    """Autocomplete select for ``model.meeting``, searching MeetingAdmin.search_fields."""
+    field = forms.ModelChoiceField(
+        queryset=Meeting.objects.all(), required=False,
+        widget=AutocompleteSelect(model._meta.get_field('meeting'), admin_site, attrs={'data-width': '100%'}),
+    )
+    return field.widget
+
+class MeetingFilter(admin.SimpleListFilter):
+    """Meeting picked with the admin autocomplete; a link per meeting does not scale to thousands of them."""
+    title = 'meeting'
+    parameter_name = 'meeting'
+    template = 'admin/meeting_filter.html'
+
+    def lookups(self, request, model_admin):
+        return ()
+
+    def has_output(self):
+        return True
+
+    def queryset(self, request, queryset):
+        value = (self.value() or '').strip()
+        if not value:
+            return queryset
+        if not value.isdigit():
+            raise IncorrectLookupParameters(value)
+        return queryset.filter(meeting_id=int(value))
+
+    def choices(self, changelist):
+        value = (self.value() or '').strip()
+        yield {
+            # renders only the selected meeting; the rest is fetched as the admin types
+            'widget': _meeting_widget(changelist.model, changelist.model_admin.admin_site).render(self.parameter_name, value),
+            'selected': bool(value),
+            # the select submits a plain GET form, so the other filters, search and ordering ride along
+            'hidden': [(name, v) for name, v in changelist.params.items() if name != self.parameter_name],
+            'clear_url': changelist.get_query_string(remove=[self.parameter_name]),
+        }
+
+class MeetingAutocompleteMixin:
+    """Meeting chosen through the autocomplete in forms and in MeetingFilter, joined on the changelist."""
+    autocomplete_fields = ('meeting',)
+
+    @property
+    def media(self):
+        return super().media + _meeting_widget(self.model, self.admin_site).media
+
 @admin.register(Agenda)
-class AgendaAdmin(admin.ModelAdmin):
+class AgendaAdmin(MeetingAutocompleteMixin, admin.ModelAdmin):
     list_display = ('id', 'meeting', 'title', 'start_time', 'end_time')
     search_fields = ('title',)
-    list_filter = ('meeting',)
+    list_filter = (MeetingFilter,)
 
 @admin.register(Photo)
-class PhotoAdmin(admin.ModelAdmin):
+class PhotoAdmin(MeetingAutocompleteMixin, admin.ModelAdmin):
     form = PhotoAdminForm
     list_display = ('id', 'meeting', 'file_id')
     search_fields = ('file_id',)
-    list_filter = ('meeting',)
+    list_filter = (MeetingFilter,)
     fields = ('meeting', 'upload')
 
+class FullTextSearchMixin:
+    """Admin search through an FTS5 mirror table (schema.py) instead of LIKE '%...%' over search_fields."""
+    fts_table = None
+
+    def get_search_results(self, request, queryset, search_term):
+        query = fts_query(search_term)
+        if not self.fts_table or query is None:
+            return super().get_search_results(request, queryset, search_term)
+        matches = RawSQL(f"SELECT rowid FROM {self.fts_table} WHERE {self.fts_table} MATCH %s", (query,))
+        return queryset.filter(pk__in=matches), False
+
 @admin.register(Question)
-class QuestionAdmin(admin.ModelAdmin):
+class QuestionAdmin(MeetingAutocompleteMixin, FullTextSearchMixin, admin.ModelAdmin):
     list_display = ('id', 'meeting', 'user_id', 'question_preview', 'date')
     search_fields = ('question',)
-    list_filter = ('meeting',)
+    fts_table = 'questions_fts'
+    list_filter = (MeetingFilter,)
 
     @admin.display(description='Question')
     def question_preview(self, obj):
@@ -207,10 +260,11 @@ class QuestionAdmin(admin.ModelAdmin):
         return text if len(text) <= 120 else text[:117] + '...'
 
 @admin.register(Feedback)
-class FeedbackAdmin(admin.ModelAdmin):
+class FeedbackAdmin(MeetingAutocompleteMixin, FullTextSearchMixin, admin.ModelAdmin):
     list_display = ('id', 'meeting', 'user_id', 'rating', 'feedback_preview', 'date')
     search_fields = ('feedback',)
-    list_filter = ('meeting', 'rating')
+    fts_table = 'feedback_fts'
+    list_filter = (MeetingFilter, 'rating')
 
     @admin.display(description='Text')
     def feedback_preview(self, obj):
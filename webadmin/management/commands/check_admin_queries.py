@@ -0,0 +1,123 @@
+import os
+import re
+import tempfile
+from collections import Counter
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+import database
+
+# Enough meetings that loading them all (filter sidebar, FK select) shows, and
+# a full changelist page of everything else, every row on a different meeting
+MEETINGS = 10000
+ROWS = 100
+# rows attached to the meeting whose change page is rendered
+MEETING_ROWS = 20
+
+# (URL name, seeded object in the URL, query string, most queries the page may run);
+# a column or widget that queries per row or loads every meeting blows these at once
+PAGES = [
+    ('admin:webadmin_activemeeting_changelist', None, '', 5),
+    ('admin:webadmin_activemeeting_change', 'meeting', '', 6),
+    ('admin:webadmin_activemeeting_add', None, '', 2),
+    ('admin:webadmin_completedmeeting_changelist', None, '', 5),
+    ('admin:webadmin_completedmeeting_change', 'ended_meeting', '', 6),
+    ('admin:webadmin_botuser_changelist', None, '', 5),
+    ('admin:webadmin_botuser_change', 'user', '', 4),
+    ('admin:webadmin_agenda_changelist', None, '', 5),
+    ('admin:webadmin_agenda_changelist', None, 'meeting={meeting}', 6),
+    ('admin:webadmin_agenda_change', 'agenda', '', 5),
+    ('admin:webadmin_agenda_add', None, '', 2),
+    ('admin:webadmin_photo_changelist', None, '', 5),
+    ('admin:webadmin_photo_change', 'photo', '', 5),
+    ('admin:webadmin_photo_add', None, '', 2),
+    ('admin:webadmin_question_changelist', None, '', 5),
+    ('admin:webadmin_question_changelist', None, 'meeting={meeting}&q=question', 6),
+    ('admin:webadmin_question_change', 'question', '', 5),
+    ('admin:webadmin_feedback_changelist', None, '', 6),
+    ('admin:webadmin_feedback_changelist', None, 'meeting={meeting}&rating=good', 7),
+    ('admin:webadmin_feedback_change', 'feedback', '', 5),
+    ('admin:autocomplete', None, 'app_label=webadmin&model_name=agenda&field_name=meeting&term=Meeting 1', 4),
+]
+
+
+def seed(conn):
+    """Fill the database; returns the ids of the objects PAGES refers to."""
+    conn.executemany("INSERT INTO meetings (id, name, date, ended) VALUES (?, ?, '01.01.2030', ?)",
+                     [(i, f'Meeting {i}', i % 2) for i in range(1, MEETINGS + 1)])
+    rows = range(1, ROWS + 1)
+    # meeting 2 (active) also gets MEETING_ROWS of everything for its change page
+    targets = [(i, i) for i in rows] + [(ROWS + i, 2) for i in range(1, MEETING_ROWS + 1)]
+    conn.executemany("INSERT INTO users (user_id, name, phone) VALUES (?, ?, ?)",
+                     [(i, f'User {i}', f'+998{i}') for i in rows])
+    conn.executemany("INSERT INTO participants (meeting_id, user_id) VALUES (?, ?)",
+                     [(meeting_id, user_id) for user_id in rows for meeting_id in range(user_id, user_id + 3)])
+    conn.executemany("INSERT INTO agenda (id, meeting_id, title, start_time) VALUES (?, ?, ?, '10:00')",
+                     [(i, meeting_id, f'Talk {i}') for i, meeting_id in targets])
+    conn.executemany("INSERT INTO photos (id, meeting_id, file_id) VALUES (?, ?, ?)",
+                     [(i, meeting_id, f'file://media/photos/{i}.jpg') for i, meeting_id in targets])
+    conn.executemany("INSERT INTO questions (id, meeting_id, user_id, question) VALUES (?, ?, ?, ?)",
+                     [(i, meeting_id, i % ROWS + 1, f'question {i}') for i, meeting_id in targets])
+    conn.executemany("INSERT INTO feedback (id, meeting_id, user_id, rating, feedback) VALUES (?, ?, ?, ?, ?)",
+                     [(i, meeting_id, i % ROWS + 1, 'good' if i % 2 else 'bad', f'feedback {i}')
+                      for i, meeting_id in targets])
+    return {'meeting': 2, 'ended_meeting': 1, 'user': 1, 'agenda': 1, 'photo': 1, 'question': 1, 'feedback': 1}
+
+
+class Command(BaseCommand):
+    help = 'Render web admin pages on a seeded database; fail when a page runs more queries than its budget.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verbose-queries', action='store_true', help='Print the queries of every page.')
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory(prefix='admin_queries_') as workdir:
+            original = database.DATABASE_NAME, connection.settings_dict['NAME']
+            database.DATABASE_NAME = connection.settings_dict['NAME'] = os.path.join(workdir, 'admin.db')
+            connection.close()
+            try:
+                database.init_database()
+                with database.transaction() as conn:
+                    objects = seed(conn)
+                call_command('migrate', verbosity=0, interactive=False)
+                failures = self.check_pages(objects, options['verbose_queries'])
+            finally:
+                database.close_connection()
+                connection.close()
+                database.DATABASE_NAME, connection.settings_dict['NAME'] = original
+
+        if failures:
+            raise CommandError(f"{len(failures)} admin pages are over their query budget:\n" + '\n'.join(failures))
+        self.stdout.write(self.style.SUCCESS(f"{len(PAGES)} admin pages checked, all within their query budget."))
+
+    def check_pages(self, objects, verbose):
+        admin_user = get_user_model().objects.create_superuser('query-budget', '', 'query-budget')
+        client = Client()
+        client.force_login(admin_user)
+        failures = []
+        for url_name, obj, query_string, budget in PAGES:
+            url = reverse(url_name, args=[objects[obj]] if obj else None)
+            if query_string:
+                url += '?' + query_string.format(**objects)
+            with CaptureQueriesContext(connection) as captured:
+                response = client.get(url)
+            queries = [query['sql'] for query in captured.captured_queries]
+            if response.status_code != 200:
+                failures.append(f"{url}: HTTP {response.status_code}")
+                continue
+            self.stdout.write(f"{url}: {len(queries)} queries (budget {budget})")
+            if verbose:
+                for sql in queries:
+                    self.stdout.write(f"    {sql}")
+            if len(queries) > budget:
+                # the same query for different rows differs only in its literals
+                sql, repeats = Counter(re.sub(r"\b\d+\b|'[^']*'", '?', sql) for sql in queries).most_common(1)[0]
+                failures.append(f"{url}: {len(queries)} queries, budget {budget}; "
+                                f"most repeated ({repeats}x):\n    {sql}")
+        return failures
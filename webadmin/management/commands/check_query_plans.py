@@ -0,0 +1,143 @@
+import ast
+import os
+import sqlite3
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+
+import database
+from webadmin.models import Agenda, BotUser, Feedback, Meeting, Photo, Question
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+
+# Tables that grow with the number of users / meetings; a SCAN over them is a regression
+LARGE_TABLES = {
+    'users', 'participants', 'agenda', 'agenda_alerts', 'photos', 'questions',
+    'feedback', 'outbox', 'user_states',
+}
+
+# Functions that read a whole large table on purpose
+ALLOWED_SCANS = {
+    'get_all_users': 'broadcast to every user',
+    'get_uncached_local_media': 'background warm-up, bounded by LIMIT',
+}
+
+# Functions that try an older schema first and fall back on error
+SCHEMA_FALLBACKS = {'add_agenda_item'}
+
+SQL_CALLS = {'_fetchone', '_fetchall', '_execute', 'execute'}
+SKIP_PREFIXES = ('CREATE', 'ALTER', 'DROP', 'PRAGMA', 'BEGIN', 'COMMIT', 'ROLLBACK')
+
+
+def _string(node, assigned):
+    """Best-effort SQL text of an expression: literals, f-strings and local `sql` variables."""
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        return node.value
+    if isinstance(node, ast.JoinedStr):
+        # f"... IN ({placeholders})" -> one placeholder
+        return ''.join(v.value if isinstance(v, ast.Constant) else '?' for v in node.values)
+    if isinstance(node, ast.Name):
+        parts = [_string(value, assigned) for value in assigned.get(node.id, [])]
+        if parts and all(part is not None for part in parts):
+            return ''.join(parts)
+    return None
+
+
+def extract_queries(path):
+    """[(function name, sql)] for every SQL string passed to an execute helper in `path`."""
+    with open(path, encoding='utf-8') as f:
+        tree = ast.parse(f.read())
+    queries = []
+    for func in ast.walk(tree):
+        if not isinstance(func, ast.FunctionDef):
+            continue
+        assigned = {}
+        for node in ast.walk(func):
+            if isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
+                assigned[node.targets[0].id] = [node.value]
+            elif isinstance(node, ast.AugAssign) and isinstance(node.target, ast.Name):
+                assigned.setdefault(node.target.id, []).append(node.value)
+        for node in ast.walk(func):
+            if not isinstance(node, ast.Call) or not node.args:
+                continue
+            name = node.func.id if isinstance(node.func, ast.Name) else getattr(node.func, 'attr', None)
+            if name not in SQL_CALLS:
+                continue
+            sql = _string(node.args[0], assigned)
+            if sql and not sql.lstrip().upper().startswith(SKIP_PREFIXES):
+                queries.append((func.name, sql.replace('%s', '?')))
+    return queries
+
+
+def orm_queries():
+    """Querysets the web admin runs per meeting / per user."""
+    querysets = {
+        'AgendaInline': Agenda.objects.filter(meeting_id=1),
+        'PhotoInline': Photo.objects.filter(meeting_id=1),
+        'QuestionAdmin(meeting)': Question.objects.filter(meeting_id=1).order_by('-date'),
+        'FeedbackAdmin(meeting)': Feedback.objects.filter(meeting_id=1).order_by('-date'),
+        'ActiveMeetingAdmin': Meeting.objects.filter(ended=0).order_by('-id'),
+        'BotUserAdmin(pk)': BotUser.objects.with_subscribed_meetings().filter(user_id=1),
+    }
+    queries = []
+    for name, queryset in querysets.items():
+        sql, params = queryset.query.sql_with_params()
+        queries.append((name, sql.replace('%s', '?')))
+    return queries
+
+
+def scanned_tables(plan):
+    tables = set()
+    for row in plan:
+        detail = row[-1]
+        if detail.startswith('SCAN '):
+            words = detail.split()
+            # "SCAN t", "SCAN t AS alias", "SCAN t USING COVERING INDEX ..."
+            if words[1] not in ('CONSTANT', 'SUBQUERY'):
+                tables.add(words[1])
+    return tables
+
+
+class Command(BaseCommand):
+    help = 'EXPLAIN QUERY PLAN every query in database.py and webadmin; fail on full scans of large tables.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verbose-plans', action='store_true', help='Print the plan of every query.')
+
+    def handle(self, *args, **options):
+        queries = extract_queries(os.path.join(BASE_DIR, 'database.py'))
+        queries += extract_queries(os.path.join(BASE_DIR, 'webadmin', 'models.py'))
+        queries += orm_queries()
+
+        # plans come from an empty database migrated to the latest schema
+        with tempfile.TemporaryDirectory(prefix='query_plans_') as workdir:
+            original = database.DATABASE_NAME
+            database.DATABASE_NAME = os.path.join(workdir, 'plans.db')
+            try:
+                database.init_database()
+                failures = self.check_plans(database.get_connection(), queries, options['verbose_plans'])
+            finally:
+                database.close_connection()
+                database.DATABASE_NAME = original
+
+        if failures:
+            raise CommandError(f"{len(failures)} queries fall back to a full scan:\n" + '\n'.join(failures))
+        self.stdout.write(self.style.SUCCESS(f"{len(queries)} queries checked, no full scans of large tables."))
+
+    def check_plans(self, conn, queries, verbose):
+        failures = []
+        for name, sql in queries:
+            params = [None] * sql.count('?')
+            try:
+                plan = conn.execute('EXPLAIN QUERY PLAN ' + sql, params).fetchall()
+            except sqlite3.Error as e:
+                if name in SCHEMA_FALLBACKS:
+                    continue
+                failures.append(f"{name}: cannot explain ({e})")
+                continue
+            if verbose:
+                self.stdout.write(f"{name}: {' | '.join(row[-1] for row in plan)}")
+            scans = scanned_tables(plan) & LARGE_TABLES
+            if scans and name not in ALLOWED_SCANS:
+                failures.append(f"{name}: SCAN {', '.join(sorted(scans))}\n    {' '.join(sql.split())}")
+        return failures
@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models.expressions import RawSQL
 
 class Meeting(models.Model):
     id = models.AutoField(primary_key=True)
@@ -33,6 +34,18 @@ class CompletedMeeting(Meeting):
         verbose_name = 'Completed Meeting'
         verbose_name_plural = 'Completed Meetings'
 
+# Names of the meetings a user follows, computed inside the users query itself
+SUBSCRIBED_MEETINGS_SQL = """
+    SELECT GROUP_CONCAT(m.name, ', ')
+    FROM participants p
+    JOIN meetings m ON m.id = p.meeting_id
+    WHERE p.user_id = users.user_id
+"""
+
+class BotUserQuerySet(models.QuerySet):
+    def with_subscribed_meetings(self):
+        return self.annotate(subscribed_meetings=RawSQL(SUBSCRIBED_MEETINGS_SQL, ()))
+
 class BotUser(models.Model):
     user_id = models.IntegerField(primary_key=True)
     language = models.TextField(null=True, blank=True)
@@ -41,6 +54,8 @@ class BotUser(models.Model):
     company = models.TextField(null=True, blank=True)
     is_admin = models.IntegerField(default=0)
 
+    objects = BotUserQuerySet.as_manager()
+
     class Meta:
         managed = False
         db_table = 'users'
@@ -51,16 +66,11 @@ class BotUser(models.Model):
         return self.name or str(self.user_id)
 
     def get_subscribed_meetings(self):
-        from django.db import connection
-        with connection.cursor() as cursor:
-            cursor.execute("""
-                SELECT m.name 
-                FROM meetings m 
-                JOIN participants p ON m.id = p.meeting_id 
-                WHERE p.user_id = %s
-            """, [self.user_id])
-            rows = cursor.fetchall()
-        return ", ".join([r[0] for r in rows])
+        # annotated on admin changelists; a single user loads it on demand
+        if not hasattr(self, 'subscribed_meetings'):
+            self.subscribed_meetings = (BotUser.objects.with_subscribed_meetings().filter(pk=self.pk)
+                                        .values_list('subscribed_meetings', flat=True).first())
+        return self.subscribed_meetings or ''
     get_subscribed_meetings.short_description = 'Subscribed Meetings'
 
 class Agenda(models.Model):
@@ -0,0 +1,142 @@
+import queue
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from telebot import types
+
+from config import (
+    WEBHOOK_URL,
+    WEBHOOK_LISTEN,
+    WEBHOOK_PORT,
+    WEBHOOK_PATH,
+    WEBHOOK_SECRET,
+    WEBHOOK_MAX_CONNECTIONS,
+    WEBHOOK_WORKERS,
+    WEBHOOK_QUEUE_SIZE,
+)
+
+SECRET_HEADER = 'X-Telegram-Bot-Api-Secret-Token'
+
+
+def update_chat_id(update):
+    """Chat an update belongs to; updates without a chat are spread by update_id."""
+    for name in ('message', 'edited_message', 'channel_post', 'edited_channel_post'):
+        message = getattr(update, name, None)
+        if message is not None:
+            return message.chat.id
+    call = update.callback_query
+    if call is not None:
+        return call.message.chat.id if call.message else call.from_user.id
+    return update.update_id
+
+
+class UpdateDispatcher:
+    """Fixed pool of workers with one bounded queue each.
+
+    Updates are sharded by chat id, so one chat is always handled by the same
+    worker in arrival order while different chats run in parallel. ``submit``
+    returns False when the shard's queue stays full for ``put_timeout``
+    seconds; the webhook then answers 503 and Telegram redelivers later.
+    """
+
+    def __init__(self, handler, workers=WEBHOOK_WORKERS, queue_size=WEBHOOK_QUEUE_SIZE, put_timeout=1.0):
+        self.handler = handler
+        self.put_timeout = put_timeout
+        per_worker = max(1, queue_size // workers)
+        self._queues = [queue.Queue(maxsize=per_worker) for _ in range(workers)]
+        self._started = False
+
+    def start(self):
+        if self._started:
+            return
+        self._started = True
+        for i, q in enumerate(self._queues):
+            threading.Thread(target=self._worker_loop, args=(q,), name=f'update-worker-{i}', daemon=True).start()
+
+    def submit(self, update):
+        q = self._queues[hash(update_chat_id(update)) % len(self._queues)]
+        try:
+            q.put(update, timeout=self.put_timeout)
+        except queue.Full:
+            return False
+        return True
+
+    def join(self):
+        """Block until every queued update has been handled."""
+        for q in self._queues:
+            q.join()
+
+    def _worker_loop(self, q):
+        while True:
+            update = q.get()
+            try:
+                self.handler(update)
+            except Exception as e:
+                print(f"Ошибка обработки обновления {update.update_id}: {e}")
+            finally:
+                q.task_done()
+
+
+class _WebhookHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        server = self.server
+        if self.path != server.webhook_path:
+            self._reply(404)
+            return
+        if server.secret and self.headers.get(SECRET_HEADER) != server.secret:
+            self._reply(403)
+            return
+        length = int(self.headers.get('Content-Length') or 0)
+        try:
+            update = types.Update.de_json(self.rfile.read(length).decode('utf-8'))
+        except Exception:
+            self._reply(400)
+            return
+        if not server.dispatcher.submit(update):
+            self._reply(503, {'Retry-After': '1'})
+            return
+        self._reply(200)
+
+    def _reply(self, status, headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class WebhookServer(ThreadingHTTPServer):
+    """HTTP endpoint for Telegram updates. TLS is expected to end at the proxy / load balancer."""
+
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, address, dispatcher, webhook_path=WEBHOOK_PATH, secret=WEBHOOK_SECRET):
+        super().__init__(address, _WebhookHandler)
+        self.dispatcher = dispatcher
+        self.webhook_path = webhook_path
+        self.secret = secret
+
+
+def create_webhook_server(bot, listen=WEBHOOK_LISTEN, port=WEBHOOK_PORT):
+    """Server + started dispatcher that feed updates into ``bot``'s handlers."""
+    # handlers run in our per-chat workers, not in telebot's own thread pool
+    bot.threaded = False
+    dispatcher = UpdateDispatcher(lambda update: bot.process_new_updates([update]))
+    dispatcher.start()
+    return WebhookServer((listen, port), dispatcher)
+
+
+def run_webhook(bot):
+    server = create_webhook_server(bot)
+    bot.remove_webhook()
+    bot.set_webhook(
+        url=WEBHOOK_URL.rstrip('/') + WEBHOOK_PATH,
+        secret_token=WEBHOOK_SECRET,
+        max_connections=WEBHOOK_MAX_CONNECTIONS,
+    )
+    print(f"Webhook слушает {WEBHOOK_LISTEN}:{WEBHOOK_PORT}{WEBHOOK_PATH}")
+    server.serve_forever()